@@ -0,0 +1,38 @@
+"""
+API endpoints for cross-exchange arbitrage opportunities.
+"""
+import asyncio
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_async_db
+from app.models import schemas
+from app.services import arbitrage
+
+router = APIRouter()
+
+
+@router.get("/", response_model=schemas.ArbitrageScan)
+async def get_arbitrage_opportunities(
+    limit: int = Query(20, ge=1, le=arbitrage.MAX_OPPORTUNITIES),
+    min_spread: float = Query(0.0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the widest price gaps across exchanges, after fees, over all tracked coins.
+    
+    Each coin contributes its best buy/sell exchange pair. The scan runs
+    over this worker's in-memory price matrix and is refreshed in the
+    background every ARBITRAGE_SCAN_INTERVAL seconds (see arbitrage).
+    
+    Args:
+        limit: Maximum number of opportunities
+        min_spread: Only include net spreads above this percentage
+        db: Async database session
+        
+    Returns:
+        Opportunities ordered by net spread, widest first
+    """
+    result = await asyncio.to_thread(arbitrage.scan)
+    return await arbitrage.describe(db, result, limit, min_spread)
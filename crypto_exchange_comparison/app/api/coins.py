@@ -1,102 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.database.connection import get_db
+from app.config.settings import settings
+from app.database.connection import get_async_db, get_db
 from app.models import models, schemas
-from app.services import coingecko
+from app.services import cache, coingecko, data_service, price_matrix, response_cache, search_index
 from app.services.cache import invalidate_cache
+from app.services.db import coin_service
+from app.services.db import aio
 
 router = APIRouter()
 
+COIN_LIST = TypeAdapter(List[schemas.Coin])
+
 
 @router.get("/", response_model=List[schemas.Coin])
-async def get_coins(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
+async def get_coins(
+    request: Request,
+    skip: int = 0,
+    limit: int = 1000,
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Get all coins
+    Get all coins, optionally filtered by a case-insensitive search on name or symbol
     """
-    coins = db.query(models.Coin).offset(skip).limit(limit).all()
-    return coins
+    key = response_cache.cache_key(request)
+    cached_response = await response_cache.get(request, key)
+    if cached_response is not None:
+        return cached_response
+
+    coins = await aio.coin_service.get_all(db, limit=limit, offset=skip, query=q)
+    return await response_cache.store(
+        request, key, response_cache.render(COIN_LIST, coins), settings.RESPONSE_CACHE_LIST_TTL,
+        tags=[cache.COIN_LIST_TAG]
+    )
 
 
 @router.get("/search", response_model=List[dict])
 async def search_available_coins(
     query: str = Query(..., min_length=2), 
     limit: int = 20, 
-    db: Session = Depends(get_db)
+    fuzzy: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Search for coins on CoinGecko that aren't already in the database
+
+    With fuzzy=true, coins are matched within a small edit distance of the
+    query (e.g. "etherium" finds Ethereum) and ranked by closeness, then market cap.
     """
     try:
         # Get current coins in database
-        db_coins = db.query(models.Coin.coingecko_id).all()
-        existing_coin_ids = {coin.coingecko_id for coin in db_coins}
+        existing_coin_ids = await aio.coin_service.get_coingecko_ids(db)
         
-        # First get coins with market data (which have price information)
+        # Coins with market data (which have price information) and the full list for broader search
         market_coins = await coingecko.get_coins_with_market_data(per_page=250)
-        
-        # Create a lookup for quick access
-        market_coins_by_id = {coin["id"]: coin for coin in market_coins}
-        
-        # Get the full list of coins for broader search
         all_coins = await coingecko.get_coins()
         
-        # Filter coins that match the query in id, name, or symbol
-        # and aren't already in the database
-        query = query.lower()
-        matching_coins = []
-        
-        for coin in all_coins:
-            # Skip if already in database
-            if coin["id"] in existing_coin_ids:
-                continue
-                
-            if (query in coin["id"].lower() or 
-                query in coin["symbol"].lower() or 
-                query in coin["name"].lower()):
-                
-                # Check if this coin has market data
-                market_data = market_coins_by_id.get(coin["id"])
-                
-                result = {
-                    "id": coin["id"],
-                    "symbol": coin["symbol"],
-                    "name": coin["name"],
-                    "has_market_data": market_data is not None
-                }
-                
-                # Add market data if available
-                if market_data:
-                    result.update({
-                        "current_price": market_data.get("current_price"),
-                        "market_cap": market_data.get("market_cap"),
-                        "image": market_data.get("image"),
-                        "price_change_24h": market_data.get("price_change_percentage_24h")
-                    })
-                
-                matching_coins.append(result)
-        
-        # Sort by best match and whether they have market data
-        def get_sort_key(coin):
-            # Has market data gets highest priority
-            has_market_data = 0 if coin.get("has_market_data") else 1
-            
-            # Exact matches get next priority
-            if coin["id"].lower() == query or coin["symbol"].lower() == query or coin["name"].lower() == query:
-                return (has_market_data, 0)
-                
-            # Starts with query gets next priority  
-            if coin["id"].lower().startswith(query) or coin["symbol"].lower().startswith(query) or coin["name"].lower().startswith(query):
-                return (has_market_data, 1)
-                
-            # Contains query gets lowest priority
-            return (has_market_data, 2)
-            
-        matching_coins.sort(key=get_sort_key)
-        
-        # Limit to top results
-        return matching_coins[:limit]
+        # Served from a prebuilt index, rebuilt only when either list changes
+        index = await search_index.get_coin_index(all_coins, market_coins)
+        if fuzzy:
+            return index.fuzzy_search(query, limit, exclude=existing_coin_ids)
+        return index.search(query, limit, exclude=existing_coin_ids)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -105,22 +74,22 @@ async def search_available_coins(
 
 
 @router.get("/{coin_id}", response_model=schemas.Coin)
-async def get_coin(coin_id: int, db: Session = Depends(get_db)):
+async def get_coin(coin_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get a coin by ID
     """
-    coin = db.query(models.Coin).filter(models.Coin.id == coin_id).first()
+    coin = await aio.coin_service.get_by_id(db, coin_id)
     if not coin:
         raise HTTPException(status_code=404, detail="Coin not found")
     return coin
 
 
 @router.get("/by-coingecko-id/{coingecko_id}", response_model=schemas.Coin)
-async def get_coin_by_coingecko_id(coingecko_id: str, db: Session = Depends(get_db)):
+async def get_coin_by_coingecko_id(coingecko_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get a coin by Coingecko ID
     """
-    coin = db.query(models.Coin).filter(models.Coin.coingecko_id == coingecko_id).first()
+    coin = await aio.coin_service.get_by_coingecko_id(db, coingecko_id)
     if not coin:
         raise HTTPException(status_code=404, detail="Coin not found")
     return coin
@@ -159,6 +128,7 @@ async def create_coin(coin: schemas.CoinCreate, db: Session = Depends(get_db)):
         db.add(db_coin)
         db.commit()
         db.refresh(db_coin)
+        await cache.ainvalidate_tags([cache.COIN_LIST_TAG])
         return db_coin
     except Exception as e:
         db.rollback()
@@ -171,30 +141,17 @@ async def create_coin(coin: schemas.CoinCreate, db: Session = Depends(get_db)):
 @router.get("/sync/top", response_model=List[schemas.Coin])
 async def sync_top_coins_from_coingecko(limit: int = 20, db: Session = Depends(get_db)):
     """
-    Sync top coins from Coingecko API
+    Sync the top coins by market cap from Coingecko API, with their rank, market cap and price
     """
     try:
-        coins_data = await coingecko.get_coins()
+        top_coins = await coingecko.get_top_coins_with_market_data(limit)
         
-        # We'll only sync the first few coins as an example
-        # In a real app, you'd want to use the /coins/markets endpoint to get top coins by market cap
-        top_coins = coins_data[:limit]
-        
-        # Create or update coins
-        added_coins = []
-        for coin_data in top_coins:
-            db_coin = db.query(models.Coin).filter(models.Coin.coingecko_id == coin_data["id"]).first()
-            
-            if not db_coin:
-                db_coin = models.Coin(
-                    coingecko_id=coin_data["id"],
-                    symbol=coin_data["symbol"].upper(),
-                    name=coin_data["name"]
-                )
-                db.add(db_coin)
-                db.commit()
-                db.refresh(db_coin)
-                added_coins.append(db_coin)
+        # Create the coins we don't have yet and refresh the market data of the others in one batch
+        updated_count, added_coins = coin_service.bulk_sync(
+            db, [data_service.coin_row(coin_data) for coin_data in top_coins]
+        )
+        if updated_count or added_coins:
+            await cache.ainvalidate_tags([cache.COIN_LIST_TAG])
         
         return added_coins
     except Exception as e:
@@ -217,6 +174,7 @@ async def update_coin(coin_id: int, coin_update: schemas.CoinUpdate, db: Session
     
     db.commit()
     db.refresh(db_coin)
+    await cache.ainvalidate_tags([cache.COIN_LIST_TAG])
     return db_coin
 
 
@@ -232,6 +190,8 @@ async def delete_coin(coin_id: int, db: Session = Depends(get_db)):
     try:
         db.delete(db_coin)
         db.commit()
+        price_matrix.remove_coin(coin_id)
+        await cache.ainvalidate_tags([cache.COIN_LIST_TAG, cache.coin_tag(db_coin.coingecko_id)])
         return db_coin
     except Exception as e:
         db.rollback()
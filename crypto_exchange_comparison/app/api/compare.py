@@ -1,50 +1,179 @@
 """
 API endpoints for comparing cryptocurrency prices across exchanges.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
-from app.database.connection import get_db
+from app.config.settings import settings
+from app.database.connection import AsyncSessionLocal, SessionLocal, get_async_db, get_db
 from app.models import schemas
-from app.services import cache, comparison_service
-from app.services.db import exchange_service, price_service
+from app.services import cache, comparison_service, response_cache
+from app.services.db import aio
+
+logger = logging.getLogger("compare")
 
 router = APIRouter()
 
+COMPARISON_RESULT = TypeAdapter(schemas.ComparisonResult)
+BATCH_ITEM = TypeAdapter(schemas.BatchCompareItem)
+NO_PRICE_DATA = "No price data for this coin yet"
+
+
+async def _store_results(results: Dict[str, schemas.ComparisonResult]) -> None:
+    """
+    Cache comparison results in one round-trip, as compare_exchanges would.
+    """
+    keys = {coin_id: comparison_service.compare_cache_key(coin_id) for coin_id in results}
+    try:
+        await cache.aset_many_for_revalidation(
+            {keys[coin_id]: result.model_dump() for coin_id, result in results.items()},
+            settings.COMPARE_CACHE_HARD_TTL,
+            tags={keys[coin_id]: [cache.coin_tag(coin_id)] for coin_id in results},
+        )
+    except RedisError as e:
+        logger.warning(f"Could not cache batch comparisons: {str(e)}")
+
+
+async def _compare_batch(coin_ids: List[str], db: AsyncSession) -> AsyncIterator[schemas.BatchCompareItem]:
+    """
+    Yield the comparison of each coin as soon as it is ready.
+    
+    Fresh cached results come first, from one multi-get. The other coins
+    are built from their stored prices with one IN query, and coins without
+    stored prices are fetched from CoinGecko concurrently (if
+    COMPARE_LIVE_FALLBACK is on), each paced by the rate limiter.
+    """
+    keys = {coin_id: comparison_service.compare_cache_key(coin_id) for coin_id in coin_ids}
+    try:
+        entries = await cache.aget_many(keys.values())
+    except RedisError as e:
+        logger.warning(f"Comparison cache unavailable: {str(e)}")
+        entries = {}
+
+    pending = []
+    for coin_id in coin_ids:
+        entry = entries.get(keys[coin_id])
+        age = cache.revalidation_age(entry)
+        if age is not None and age < settings.COMPARE_CACHE_SOFT_TTL:
+            yield schemas.BatchCompareItem(coin_id=coin_id, result=entry["value"])
+        else:
+            pending.append(coin_id)
+    if not pending:
+        return
+
+    results = await comparison_service.compare_many_from_snapshot(pending, db)
+    await _store_results(results)
+    for coin_id, result in results.items():
+        yield schemas.BatchCompareItem(coin_id=coin_id, result=result)
+
+    missing = [coin_id for coin_id in pending if coin_id not in results]
+    if not settings.COMPARE_LIVE_FALLBACK:
+        for coin_id in missing:
+            yield schemas.BatchCompareItem(coin_id=coin_id, error=NO_PRICE_DATA)
+        return
+
+    semaphore = asyncio.Semaphore(settings.PRICE_UPDATE_CONCURRENCY)
+
+    async def compare_live(coin_id: str) -> schemas.BatchCompareItem:
+        async with semaphore:
+            # Each live comparison writes prices, so each gets its own session
+            live_db = SessionLocal()
+            try:
+                result = await comparison_service.compare_exchanges_for_coin(coin_id, live_db)
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                return schemas.BatchCompareItem(coin_id=coin_id, error=f"Error processing comparison: {detail}")
+            finally:
+                live_db.close()
+        await _store_results({coin_id: result})
+        return schemas.BatchCompareItem(coin_id=coin_id, result=result)
+
+    for item in asyncio.as_completed([compare_live(coin_id) for coin_id in missing]):
+        yield await item
+
 
 @router.get("/{coin_id}", response_model=schemas.ComparisonResult)
 async def compare_exchanges(
     coin_id: str, 
-    amount: Optional[float] = None,
-    db: Session = Depends(get_db)
+    request: Request,
+    amount: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_db),
+    async_db: AsyncSession = Depends(get_async_db)
 ):
     """
     Compare prices across exchanges for a specific coin.
     
+    The comparison is read from the stored prices, which scheduled price
+    updates keep fresh. Only a coin without stored prices is fetched from
+    CoinGecko on the request, unless COMPARE_LIVE_FALLBACK is off.
+    
+    Results are cached with stale-while-revalidate: once older than
+    COMPARE_CACHE_SOFT_TTL they are still returned straight away while a
+    background refresh recomputes them. The Age header gives the age of
+    the result in seconds and X-Cache is HIT, STALE or MISS. Fresh results
+    are also kept as rendered bytes with an ETag (see response_cache).
+    
     Args:
         coin_id: CoinGecko ID of the coin
-        amount: Optional amount for calculation
-        db: Database session
+        request: Incoming request
+        amount: Order size in USD to rank exchanges for (LARGE_ORDER_USD if not given)
+        db: Database session, for the live fallback
+        async_db: Async database session, for reading stored prices
         
     Returns:
         ComparisonResult with exchange price data
     """
-    # Check if data is cached
-    cache_key = f"compare:{coin_id}:{amount if amount else 'default'}"
-    cached_data = cache.get_cache(cache_key)
-    if cached_data:
-        return cached_data
-    
+    response_key = response_cache.cache_key(request)
+    cached_response = await response_cache.get(request, response_key)
+    if cached_response is not None:
+        return cached_response
+
+    cache_key = comparison_service.compare_cache_key(coin_id, amount)
+
+    async def compare(read_db: AsyncSession, get_write_db: Callable[[], Session]) -> Dict[str, Any]:
+        result = await comparison_service.compare_from_snapshot(coin_id, read_db, amount)
+        if result is None:
+            if not settings.COMPARE_LIVE_FALLBACK:
+                raise HTTPException(status_code=404, detail="No price data for this coin yet")
+            result = await comparison_service.compare_exchanges_for_coin(coin_id, get_write_db(), amount)
+        return result.model_dump()
+
+    async def compute():
+        return await compare(async_db, lambda: db)
+
+    async def refresh():
+        # Runs after this request has finished, so it needs its own sessions
+        write_db = None
+
+        def get_write_db() -> Session:
+            nonlocal write_db
+            write_db = SessionLocal()
+            return write_db
+
+        try:
+            async with AsyncSessionLocal() as read_db:
+                return await compare(read_db, get_write_db)
+        finally:
+            if write_db is not None:
+                write_db.close()
+
     try:
-        # Get comparison result
-        result = await comparison_service.compare_exchanges_for_coin(coin_id, db)
-        
-        # Cache the result
-        cache.set_cache(cache_key, result.model_dump(), 300)  # Cache for 5 minutes
-        
-        return result
-        
+        result, age, cache_status = await cache.aget_with_revalidation(
+            cache_key,
+            compute,
+            settings.COMPARE_CACHE_SOFT_TTL,
+            settings.COMPARE_CACHE_HARD_TTL,
+            refresh=refresh,
+            tags=[cache.coin_tag(coin_id)],
+        )
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
@@ -53,21 +182,91 @@ async def compare_exchanges(
             detail=f"Error processing comparison: {str(e)}"
         )
 
+    # Rendered bytes are kept only while the result is fresh, so stale results keep being refreshed
+    return await response_cache.store(
+        request,
+        response_key,
+        response_cache.render(COMPARISON_RESULT, result),
+        settings.COMPARE_CACHE_SOFT_TTL - age,
+        tags=[cache.coin_tag(coin_id)],
+        age=age,
+        status=cache_status,
+    )
+
 
 @router.get("/fees/{exchange_id}", response_model=List[Dict[str, Any]])
-async def get_exchange_fees(exchange_id: int, db: Session = Depends(get_db)):
+async def get_exchange_fees(exchange_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get fee structure for an exchange.
     
     Args:
         exchange_id: ID of the exchange
-        db: Database session
+        db: Async database session
         
     Returns:
         List of fee information by coin
     """
-    exchange = exchange_service.get_by_id(db, exchange_id)
+    cache_key = f"fees:{exchange_id}"
+    try:
+        cached_data = await cache.aget_cache(cache_key)
+    except RedisError:
+        cached_data = None
+    if cached_data is not None:
+        return cached_data
+
+    exchange = await aio.exchange_service.get_by_id(db, exchange_id)
     if not exchange:
         raise HTTPException(status_code=404, detail="Exchange not found")
     
-    return price_service.get_fees_by_exchange(db, exchange_id) 
\ No newline at end of file
+    fees = await aio.price_service.get_fees_by_exchange(db, exchange_id)
+    try:
+        # Dropped whenever prices on this exchange are written
+        await cache.aset_cache(cache_key, fees, 300, tags=[cache.exchange_tag(exchange_id)])
+    except RedisError:
+        pass
+    return fees 
+
+
+@router.post("/batch", response_model=schemas.BatchCompareResult)
+async def compare_batch(
+    batch: schemas.BatchCompareRequest,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Compare prices across exchanges for several coins in one request.
+    
+    Cached results are read with one multi-get and the others are built
+    from stored prices with one query (see _compare_batch). With
+    stream=true the response is NDJSON, one {"coin_id", "result", "error"}
+    line per coin, each written as soon as it is ready.
+    
+    Args:
+        batch: Coingecko IDs of the coins
+        stream: Whether to stream the results as NDJSON
+        db: Async database session
+        
+    Returns:
+        Comparison results and errors keyed by Coingecko ID
+    """
+    coin_ids = list(dict.fromkeys(batch.coin_ids))
+
+    if stream:
+        async def lines():
+            async for item in _compare_batch(coin_ids, db):
+                yield BATCH_ITEM.dump_json(item) + b"\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    results = {}
+    errors = {}
+    async for item in _compare_batch(coin_ids, db):
+        if item.result is not None:
+            results[item.coin_id] = item.result
+        else:
+            errors[item.coin_id] = item.error
+    # Keep the requested order
+    return schemas.BatchCompareResult(
+        results={coin_id: results[coin_id] for coin_id in coin_ids if coin_id in results},
+        errors=errors,
+    )
@@ -1,29 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.database.connection import get_db
+from app.config.settings import settings
+from app.database.connection import get_async_db, get_db
 from app.models import models, schemas
-from app.services import coingecko
+from app.services import cache, coingecko, response_cache
+from app.services.db import exchange_service
+from app.services.db import aio
 
 router = APIRouter()
 
+EXCHANGE_LIST = TypeAdapter(List[schemas.Exchange])
+
 
 @router.get("/", response_model=List[schemas.Exchange])
-async def get_exchanges(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_exchanges(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Get all exchanges
+    Get all exchanges, optionally filtered by a case-insensitive search on name
     """
-    exchanges = db.query(models.Exchange).offset(skip).limit(limit).all()
-    return exchanges
+    key = response_cache.cache_key(request)
+    cached_response = await response_cache.get(request, key)
+    if cached_response is not None:
+        return cached_response
+
+    exchanges = await aio.exchange_service.get_all(db, limit=limit, offset=skip, query=q)
+    return await response_cache.store(
+        request, key, response_cache.render(EXCHANGE_LIST, exchanges), settings.RESPONSE_CACHE_LIST_TTL,
+        tags=[cache.EXCHANGE_LIST_TAG]
+    )
 
 
 @router.get("/{exchange_id}", response_model=schemas.Exchange)
-async def get_exchange(exchange_id: int, db: Session = Depends(get_db)):
+async def get_exchange(exchange_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get an exchange by ID
     """
-    exchange = db.query(models.Exchange).filter(models.Exchange.id == exchange_id).first()
+    exchange = await aio.exchange_service.get_by_id(db, exchange_id)
     if not exchange:
         raise HTTPException(status_code=404, detail="Exchange not found")
     return exchange
@@ -38,23 +59,21 @@ async def create_exchange(exchange: schemas.ExchangeCreate, db: Session = Depend
     db.add(db_exchange)
     db.commit()
     db.refresh(db_exchange)
+    await cache.ainvalidate_tags([cache.EXCHANGE_LIST_TAG])
     return db_exchange
 
 
 @router.get("/{exchange_id}/coins", response_model=List[schemas.Coin])
-async def get_exchange_coins(exchange_id: int, db: Session = Depends(get_db)):
+async def get_exchange_coins(exchange_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get all coins listed on an exchange
     """
-    exchange = db.query(models.Exchange).filter(models.Exchange.id == exchange_id).first()
+    exchange = await aio.exchange_service.get_by_id(db, exchange_id)
     if not exchange:
         raise HTTPException(status_code=404, detail="Exchange not found")
     
     # Get coins via price relationship
-    prices = db.query(models.Price).filter(models.Price.exchange_id == exchange_id).all()
-    coins = [price.coin for price in prices]
-    
-    return coins
+    return await aio.exchange_service.get_coins(db, exchange_id)
 
 
 @router.get("/sync/coingecko", response_model=List[schemas.Exchange])
@@ -65,21 +84,18 @@ async def sync_exchanges_from_coingecko(db: Session = Depends(get_db)):
     try:
         exchanges_data = await coingecko.get_exchanges()
         
-        # Create or update exchanges
-        added_exchanges = []
-        for exchange_data in exchanges_data[:20]:  # Limit to top 20 exchanges
-            db_exchange = db.query(models.Exchange).filter(models.Exchange.name == exchange_data["name"]).first()
-            
-            if not db_exchange:
-                db_exchange = models.Exchange(
-                    name=exchange_data["name"],
-                    website=exchange_data.get("url"),
-                    logo_url=exchange_data.get("image")
-                )
-                db.add(db_exchange)
-                db.commit()
-                db.refresh(db_exchange)
-                added_exchanges.append(db_exchange)
+        # Create the exchanges we don't have yet in one batch
+        _, added_exchanges = exchange_service.bulk_sync(db, [
+            {
+                "name": exchange_data["name"],
+                "coingecko_id": exchange_data.get("id"),
+                "website": exchange_data.get("url"),
+                "logo_url": exchange_data.get("image")
+            }
+            for exchange_data in exchanges_data[:20]  # Limit to top 20 exchanges
+        ], update_existing=False)
+        if added_exchanges:
+            await cache.ainvalidate_tags([cache.EXCHANGE_LIST_TAG])
         
         return added_exchanges
     except Exception as e:
@@ -1,5 +1,7 @@
 import os
-from pydantic import BaseSettings
+from typing import List
+
+from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     """Application settings"""
@@ -9,4 +11,55 @@ class Settings(BaseSettings):
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     COINGECKO_API_URL: str = "https://api.coingecko.com/api/v3"
 
-settings = Settings() 
\ No newline at end of file
+    # Shared HTTP client used for all CoinGecko requests
+    HTTP_TIMEOUT: float = 10.0  # Read/write/pool timeout in seconds
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # Seconds an idle connection is kept open
+    HTTP2_ENABLED: bool = True
+
+    # Upstream request budget (CoinGecko's public API allows roughly 30 calls per minute)
+    COINGECKO_RATE_LIMIT_PER_MINUTE: int = 30
+    COINGECKO_RATE_LIMIT_BURST: int = 5
+    COINGECKO_PAGE_CONCURRENCY: int = 4  # Pages of a paginated endpoint fetched at the same time
+
+    # Number of coins whose tickers are fetched at the same time during a price update
+    PRICE_UPDATE_CONCURRENCY: int = 8
+
+    # In-process (L1) cache in front of Redis
+    CACHE_L1_ENABLED: bool = True
+    CACHE_L1_MAX_ENTRIES: int = 1024
+    CACHE_L1_MAX_BYTES: int = 64 * 1024 * 1024  # Measured on the serialized payload
+    CACHE_L1_TTL: int = 30  # Upper bound on how long a worker keeps an entry, in seconds
+
+    # Stale-while-revalidate window for /compare results, in seconds
+    COMPARE_CACHE_SOFT_TTL: int = 60  # Older results are refreshed in the background
+    COMPARE_CACHE_HARD_TTL: int = 300  # Older results are no longer served
+    # /compare is built from stored prices; for coins without any, fetch them from
+    # CoinGecko on the request (True) or answer 404 until price updates have run (False)
+    COMPARE_LIVE_FALLBACK: bool = True
+
+    # Order-size-aware ranking in /compare (see cost_engine)
+    SLIPPAGE_IMPACT: float = 0.1  # Price impact of an order worth a full day's volume
+    LARGE_ORDER_USD: float = 100_000  # Order size ranked for when no amount is given
+    ORDER_SIZE_BUCKETS_USD: List[float] = [1_000, 10_000, 100_000, 1_000_000]
+
+    # Cross-exchange arbitrage scan over the price matrix (see arbitrage)
+    ARBITRAGE_SCAN_INTERVAL: int = 60  # Seconds between background scans
+    ARBITRAGE_MAX_PRICE_AGE: int = 6 * 60 * 60  # Older prices are left out; periodic updates run every 4 hours
+    ARBITRAGE_NOTIONAL_USD: float = 10_000  # Order size the withdrawal fee is spread over
+
+    # Seconds rendered /coins/ and /exchanges/ listings are cached for
+    RESPONSE_CACHE_LIST_TTL: int = 60
+
+    # Early recomputation of cached upstream data (XFetch); a beta of 0 disables it
+    CACHE_XFETCH_BETA: float = 1.0
+    CACHE_TTL_JITTER: float = 0.1  # Fraction by which cache TTLs are randomly spread
+
+    # Encoding of values stored in Redis
+    CACHE_CODEC: str = "orjson"  # orjson, msgpack or json; falls back to json if not installed
+    CACHE_COMPRESSION: str = "zstd"  # zstd, lz4, zlib or none; falls back to zlib if not installed
+    CACHE_COMPRESSION_MIN_BYTES: int = 1024  # Payloads smaller than this are stored uncompressed
+
+settings = Settings()
@@ -1,3 +1,4 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 import requests
 import time
@@ -7,11 +8,32 @@ from app.database.connection import engine, get_db
 def init_db():
     """Initialize the database with tables"""
     Base.metadata.create_all(bind=engine)
+    upgrade_schema()
     
     # Add seed data
     db = next(get_db())
     fetch_and_save_data(db)
     
+def upgrade_schema():
+    """
+    Add the nullable columns and indexes introduced after the tables were
+    created (create_all skips tables that already exist)
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            # Indexes limited to other databases (e.g. the trigram ones) are skipped here too
+            index.create(bind=engine, checkfirst=True)
+    
 def fetch_and_save_data(db: Session):
     """Fetch data from CoinGecko API and save to database"""
     # Check if we already have coins
@@ -41,7 +63,10 @@ def fetch_and_save_data(db: Session):
                 coingecko_id=coin_data["id"],
                 symbol=coin_data["symbol"].upper(),
                 name=coin_data["name"],
-                logo_url=coin_data.get("image")
+                logo_url=coin_data.get("image"),
+                market_cap_rank=coin_data.get("market_cap_rank"),
+                market_cap=coin_data.get("market_cap"),
+                current_price=coin_data.get("current_price")
             )
             coins.append(coin)
         
@@ -77,6 +102,7 @@ def add_exchanges(db: Session):
         for exchange_data in exchanges_data[:20]:
             exchange = Exchange(
                 name=exchange_data["name"],
+                coingecko_id=exchange_data.get("id"),
                 website=exchange_data.get("url"),
                 api_url=None,  # CoinGecko doesn't provide API URLs for exchanges
                 logo_url=exchange_data.get("image")
@@ -3,9 +3,11 @@ from fastapi.middleware.cors import CORSMiddleware
 import asyncio
 
 from app.database.connection import get_db
-from app.api import exchanges, coins, compare
+from app.api import exchanges, coins, compare, arbitrage
 from app.database.init_db import init_db
 from app.tasks import scheduler, cleanup
+from app.services import cache, coingecko, price_matrix
+from app.services.rate_limiter import coingecko_limiter
 from app.services.db import price_service
 
 app = FastAPI(
@@ -27,6 +29,7 @@ app.add_middleware(
 app.include_router(exchanges.router, prefix="/exchanges", tags=["exchanges"])
 app.include_router(coins.router, prefix="/coins", tags=["coins"])
 app.include_router(compare.router, prefix="/compare", tags=["compare"])
+app.include_router(arbitrage.router, prefix="/arbitrage", tags=["arbitrage"])
 app.include_router(cleanup.router, prefix="/maintenance", tags=["maintenance"])
 
 @app.get("/update", tags=["maintenance"])
@@ -49,13 +52,41 @@ async def update_status():
     """
     return scheduler.get_last_update_times()
 
+@app.get("/update/rate-limit", tags=["maintenance"])
+async def rate_limit_status():
+    """
+    Get the remaining CoinGecko request budget shared by all workers.
+    
+    Returns:
+        Dictionary with the per-minute limit, usage and tokens available now
+    """
+    return await coingecko_limiter.get_budget()
+
+@app.get("/cache/stats", tags=["maintenance"])
+async def cache_stats():
+    """
+    Get usage and per-prefix hit, miss and eviction counters of this worker's local cache.
+    
+    Returns:
+        Dictionary with local cache statistics
+    """
+    return cache.get_cache_stats()
+
 async def startup_tasks():
     """
     Initialize the application on startup:
+    - Open the shared CoinGecko HTTP client
+    - Subscribe to cache invalidation messages from other workers
     - Initialize database tables
     - Clean up any duplicate data
+    - Load the stored prices into the in-memory price matrix
     - Schedule initial data updates
+    - Start the periodic data updates and arbitrage scans
     """
+    # Open the pooled HTTP client before anything talks to CoinGecko
+    await coingecko.init_client()
+    cache.start_invalidation_listener()
+    
     # Get database session
     db = next(get_db())
     
@@ -68,6 +99,9 @@ async def startup_tasks():
     cleanup_result = await cleanup_duplicate_prices(db)
     print(f"Cleaned up database duplicates: {cleanup_result}")
     
+    matrix = price_matrix.rebuild(price_service.get_matrix_rows(db))
+    print(f"Price matrix loaded: {matrix.shape[0]} coins x {matrix.shape[1]} exchanges")
+    
     # Schedule initial background updates
     background_tasks = BackgroundTasks()
     scheduler.schedule_updates(background_tasks)
@@ -75,6 +109,9 @@ async def startup_tasks():
     
     # Start a background task to periodically update data
     asyncio.create_task(scheduler.periodic_updates())
+    
+    # Keep an arbitrage scan of the price matrix warm
+    asyncio.create_task(scheduler.periodic_arbitrage_scans())
 
 @app.on_event("startup")
 async def startup_event():
@@ -83,6 +120,15 @@ async def startup_event():
     """
     await startup_tasks()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Shutdown event handler for the FastAPI application.
+    """
+    await coingecko.close_client()
+    await cache.stop_invalidation_listener()
+    await cache.close_async_client()
+
 @app.get("/", tags=["health"])
 async def health_check():
     """
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, UniqueConstraint, DDL, Index, event
 from sqlalchemy.orm import relationship
 import datetime
 from datetime import timezone
@@ -9,12 +9,29 @@ def utcnow():
     """Return timezone-aware UTC datetime"""
     return datetime.datetime.now(timezone.utc)
 
+def trigram_index(name, column):
+    """
+    GIN trigram index for case-insensitive substring search (ILIKE '%q%').
+    Only created on PostgreSQL; other databases scan the table instead.
+    """
+    return Index(
+        name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"}
+    ).ddl_if(dialect="postgresql")
+
+# The trigram operator class comes from the pg_trgm extension
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 class Exchange(Base):
     """Exchange model"""
     __tablename__ = "exchanges"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
+    coingecko_id = Column(String, unique=True, index=True, nullable=True)
     website = Column(String, nullable=True)
     api_url = Column(String, nullable=True)
     logo_url = Column(String, nullable=True)
@@ -26,6 +43,10 @@ class Exchange(Base):
     # Relationships
     prices = relationship("Price", back_populates="exchange")
     
+    __table_args__ = (
+        trigram_index("ix_exchanges_name_trgm", "name"),
+    )
+    
     def __repr__(self):
         return f"<Exchange {self.name}>"
 
@@ -39,16 +60,29 @@ class Coin(Base):
     symbol = Column(String, index=True, nullable=False)
     name = Column(String, nullable=False)
     logo_url = Column(String, nullable=True)
+    # Market data from CoinGecko's /coins/markets, refreshed with the coin list
+    market_cap_rank = Column(Integer, nullable=True, index=True)
+    market_cap = Column(Float, nullable=True)
+    current_price = Column(Float, nullable=True)  # In USD
     created_at = Column(DateTime, default=utcnow)
     updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     
     # Relationships
     prices = relationship("Price", back_populates="coin", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        trigram_index("ix_coins_name_trgm", "name"),
+        trigram_index("ix_coins_symbol_trgm", "symbol"),
+    )
+    
     def __repr__(self):
         return f"<Coin {self.symbol}>"
 
 
+# Listing order of coins: by market cap rank, unranked coins last by name
+COIN_LISTING_ORDER = (Coin.market_cap_rank.is_(None), Coin.market_cap_rank, Coin.name)
+
+
 class Price(Base):
     """Price data model for coin on exchange"""
     __tablename__ = "prices"
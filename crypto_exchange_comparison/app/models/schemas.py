@@ -1,9 +1,10 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
 
 class ExchangeBase(BaseModel):
     name: str
+    coingecko_id: Optional[str] = None
     website: Optional[str] = None
     api_url: Optional[str] = None
     logo_url: Optional[str] = None
@@ -42,6 +43,9 @@ class CoinUpdate(BaseModel):
 
 class Coin(CoinBase):
     id: int
+    market_cap_rank: Optional[int] = None
+    market_cap: Optional[float] = None
+    current_price: Optional[float] = None
     created_at: datetime
     updated_at: datetime
 
@@ -80,12 +84,54 @@ class ExchangePrice(BaseModel):
     withdrawal_fee: Optional[float] = None
     last_updated: datetime
     spread: Optional[float] = None
+    effective_price: Optional[float] = None  # Expected cost per coin for the compared order size
     
     model_config = ConfigDict(from_attributes=True)
 
 
+class OrderSizeQuote(BaseModel):
+    amount_usd: float
+    exchange_name: str
+    effective_price: float
+
+
 class ComparisonResult(BaseModel):
     coin: str
     exchanges: List[ExchangePrice]
     best_price: ExchangePrice
-    best_for_large_orders: Optional[ExchangePrice] = None 
\ No newline at end of file
+    best_for_large_orders: Optional[ExchangePrice] = None
+    amount: Optional[float] = None  # Order size in USD the exchanges were ranked for
+    best_by_order_size: List[OrderSizeQuote] = []
+
+
+class BatchCompareRequest(BaseModel):
+    coin_ids: List[str] = Field(..., min_length=1, max_length=100)
+
+
+class BatchCompareItem(BaseModel):
+    coin_id: str
+    result: Optional[ComparisonResult] = None
+    error: Optional[str] = None
+
+
+class BatchCompareResult(BaseModel):
+    results: Dict[str, ComparisonResult]
+    errors: Dict[str, str] = {}
+
+
+class ArbitrageOpportunity(BaseModel):
+    coin_id: str  # Coingecko ID
+    coin: str
+    buy_exchange: str
+    buy_price: float  # Ask on the buy exchange
+    sell_exchange: str
+    sell_price: float  # Bid on the sell exchange
+    gross_spread_percent: float
+    net_spread_percent: float  # After trading fees on both sides and the withdrawal fee
+
+
+class ArbitrageScan(BaseModel):
+    scanned_at: datetime
+    coins: int
+    exchanges: int
+    opportunities: List[ArbitrageOpportunity]
@@ -0,0 +1,214 @@
+"""
+Cross-exchange arbitrage scan over the price matrix.
+
+For every coin the scan finds the widest executable gap between buying at
+the ask on one exchange and selling at the bid on another, after fees:
+
+    buy cost      = ask * (1 + trading_fee / 100 + withdrawal_fee / ARBITRAGE_NOTIONAL_USD)
+    sell proceeds = bid * (1 - trading_fee / 100)
+
+The withdrawal fee (in USD) is paid on the buy exchange to move the coins
+to the sell exchange. Each side depends on one exchange only, so the best
+of a coin's exchange pairs is its cheapest buy cost against its richest
+sell proceeds, found with one min and one max over the coin x exchange
+arrays for all coins at once. When one exchange is both the cheapest buy
+and the richest sell (e.g. a stale or crossed quote), the pair must span two
+exchanges, so the better of cheapest buy against the richest other sell and
+richest sell against the cheapest other buy is taken. The top
+opportunities across coins are then picked with a heap.
+
+Scans are reused while the matrix is unchanged, so the background job
+(scheduler.periodic_arbitrage_scans) leaves the endpoint a warm result.
+"""
+import heapq
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.models import schemas
+from app.services import price_matrix
+from app.services.db import aio
+
+# Opportunities kept per scan; the endpoint serves up to this many
+MAX_OPPORTUNITIES = 100
+
+SCAN_COLUMNS = ("bid_price", "ask_price", "trading_fee", "withdrawal_fee", "last_updated")
+
+
+def find_opportunities(
+    coin_ids: List[int],
+    exchange_ids: List[int],
+    columns: Dict[str, np.ndarray],
+    limit: int = MAX_OPPORTUNITIES,
+    min_spread: float = 0.0,
+    max_age: Optional[float] = None,
+    now: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Find the best arbitrage opportunity of every coin and keep the widest ones.
+
+    Args:
+        coin_ids: Coin database IDs by matrix row
+        exchange_ids: Exchange database IDs by matrix column
+        columns: SCAN_COLUMNS arrays of shape (coins, exchanges), as returned
+            by PriceMatrix.snapshot()
+        limit: Maximum number of opportunities
+        min_spread: Only keep net spreads above this percentage
+        max_age: Leave out prices older than this many seconds
+        now: Unix time prices are aged against, the current time if not given
+
+    Returns:
+        Opportunities with coin_id, buy_exchange_id, sell_exchange_id,
+        buy_price, sell_price, gross_spread_percent and net_spread_percent,
+        widest net spread first
+    """
+    if not coin_ids or not exchange_ids:
+        return []
+    asks = columns["ask_price"]
+    bids = columns["bid_price"]
+    trading_fees = np.nan_to_num(columns["trading_fee"]) / 100
+    withdrawal_fees = np.nan_to_num(columns["withdrawal_fee"])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        usable = np.ones(asks.shape, dtype=bool)
+        if max_age is not None:
+            now = time.time() if now is None else now
+            # NaN (never updated) compares False
+            usable = columns["last_updated"] >= now - max_age
+        buy = np.where(
+            usable & (asks > 0),
+            asks * (1 + trading_fees + withdrawal_fees / settings.ARBITRAGE_NOTIONAL_USD),
+            np.inf,
+        )
+        sell = np.where(usable & (bids > 0), bids * (1 - trading_fees), -np.inf)
+
+        rows = np.arange(len(coin_ids))
+        cheapest_buy = buy.argmin(axis=1)
+        richest_sell = sell.argmax(axis=1)
+        # Mask the other side's best exchange, so every pair spans two exchanges
+        other_sell = sell.copy()
+        other_sell[rows, cheapest_buy] = -np.inf
+        other_buy = buy.copy()
+        other_buy[rows, richest_sell] = np.inf
+        sell_for_cheapest = other_sell.argmax(axis=1)
+        buy_for_richest = other_buy.argmin(axis=1)
+        net_cheapest = (sell[rows, sell_for_cheapest] - buy[rows, cheapest_buy]) / buy[rows, cheapest_buy] * 100
+        net_richest = (sell[rows, richest_sell] - buy[rows, buy_for_richest]) / buy[rows, buy_for_richest] * 100
+
+        use_cheapest = ~(net_richest > net_cheapest)
+        buy_at = np.where(use_cheapest, cheapest_buy, buy_for_richest)
+        sell_at = np.where(use_cheapest, sell_for_cheapest, richest_sell)
+        net = np.where(use_cheapest, net_cheapest, net_richest)
+
+    candidates = np.flatnonzero(np.isfinite(net) & (net > min_spread) & (buy_at != sell_at))
+    opportunities = []
+    for row in heapq.nlargest(limit, candidates.tolist(), key=net.__getitem__):
+        ask = float(asks[row, buy_at[row]])
+        bid = float(bids[row, sell_at[row]])
+        opportunities.append({
+            "coin_id": coin_ids[row],
+            "buy_exchange_id": exchange_ids[buy_at[row]],
+            "sell_exchange_id": exchange_ids[sell_at[row]],
+            "buy_price": ask,
+            "sell_price": bid,
+            "gross_spread_percent": (bid - ask) / ask * 100,
+            "net_spread_percent": float(net[row]),
+        })
+    return opportunities
+
+
+# (matrix, matrix version, scan) of the last scan
+_last_scan: Optional[Tuple[price_matrix.PriceMatrix, int, Dict[str, Any]]] = None
+
+
+def scan() -> Dict[str, Any]:
+    """
+    Scan this worker's price matrix for the top MAX_OPPORTUNITIES opportunities.
+
+    The last scan is reused while the matrix is unchanged and the scan is
+    younger than ARBITRAGE_SCAN_INTERVAL (prices also age out of scans).
+    CPU-bound; callers on the event loop should run it in a worker thread.
+
+    Returns:
+        Dictionary with scanned_at (Unix time), coins, exchanges and opportunities
+    """
+    global _last_scan
+    now = time.time()
+    matrix = price_matrix.get_matrix()
+    if _last_scan is not None:
+        last_matrix, last_version, last = _last_scan
+        if (last_matrix is matrix and last_version == matrix.version
+                and now - last["scanned_at"] < settings.ARBITRAGE_SCAN_INTERVAL):
+            return last
+
+    version = matrix.version
+    coin_ids, exchange_ids, columns = matrix.snapshot(SCAN_COLUMNS)
+    result = {
+        "scanned_at": now,
+        "coins": len(coin_ids),
+        "exchanges": len(exchange_ids),
+        "opportunities": find_opportunities(
+            coin_ids, exchange_ids, columns, max_age=settings.ARBITRAGE_MAX_PRICE_AGE, now=now
+        ),
+    }
+    _last_scan = (matrix, version, result)
+    return result
+
+
+async def describe(
+    db: AsyncSession,
+    result: Dict[str, Any],
+    limit: int = MAX_OPPORTUNITIES,
+    min_spread: float = 0.0
+) -> schemas.ArbitrageScan:
+    """
+    Turn a scan into its response, with coin and exchange names looked up in one query each.
+
+    Opportunities on coins or exchanges deleted since the scan are left out.
+
+    Args:
+        db: Async database session
+        result: Result of scan()
+        limit: Maximum number of opportunities
+        min_spread: Only include net spreads above this percentage
+
+    Returns:
+        Arbitrage scan DTO
+    """
+    opportunities = [
+        opportunity for opportunity in result["opportunities"]
+        if opportunity["net_spread_percent"] > min_spread
+    ][:limit]
+    coins = await aio.coin_service.get_by_ids(db, list({o["coin_id"] for o in opportunities}))
+    exchange_names = await aio.exchange_service.get_names_by_ids(
+        db, list({o["buy_exchange_id"] for o in opportunities} | {o["sell_exchange_id"] for o in opportunities})
+    )
+
+    described = []
+    for opportunity in opportunities:
+        coin = coins.get(opportunity["coin_id"])
+        buy_exchange = exchange_names.get(opportunity["buy_exchange_id"])
+        sell_exchange = exchange_names.get(opportunity["sell_exchange_id"])
+        if coin is None or buy_exchange is None or sell_exchange is None:
+            continue
+        described.append(schemas.ArbitrageOpportunity(
+            coin_id=coin.coingecko_id,
+            coin=coin.name,
+            buy_exchange=buy_exchange,
+            buy_price=opportunity["buy_price"],
+            sell_exchange=sell_exchange,
+            sell_price=opportunity["sell_price"],
+            gross_spread_percent=opportunity["gross_spread_percent"],
+            net_spread_percent=opportunity["net_spread_percent"],
+        ))
+
+    return schemas.ArbitrageScan(
+        scanned_at=datetime.fromtimestamp(result["scanned_at"], timezone.utc),
+        coins=result["coins"],
+        exchanges=result["exchanges"],
+        opportunities=described,
+    )
@@ -1,42 +1,348 @@
 import os
 import json
-from typing import Any, Optional
-from datetime import datetime
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 import redis
+from redis import asyncio as aioredis
+
+from app.config.settings import settings
+from app.services import cache_codec
+from app.services.cache_codec import DateTimeEncoder  # noqa: F401 - re-exported for existing imports
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 DEFAULT_EXPIRY = 3600  # 1 hour default cache expiry
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Identifies this worker so it can ignore its own invalidation messages
+INSTANCE_ID = uuid.uuid4().hex
+
+logger = logging.getLogger("cache")
 
-# Create Redis connection
+# Create Redis connections: a blocking client for sync code and an asyncio
+# client, backed by its own shared connection pool, for the event loop
 redis_client = redis.from_url(REDIS_URL)
+async_redis_client = aioredis.from_url(REDIS_URL)
+
+# Keys deleted per UNLINK when clearing by pattern
+CLEAR_BATCH_SIZE = 500
+
+# Seconds a worker holds the right to refresh a stale entry
+REVALIDATE_LOCK_TTL = 30
+
+# Tag sets list the keys derived from one entity (see ainvalidate_tags), as
+# sorted sets scored by each key's expiry so expired keys are trimmed on
+# write. They live at least this long, which must cover the expiry of every
+# tagged entry.
+TAG_TTL = DEFAULT_EXPIRY
+
+# Atomically delete every key listed in the given tag sets, and the sets
+# themselves. Returns the deleted keys so local tiers can drop them too.
+INVALIDATE_TAGS_SCRIPT = """
+local keys = {}
+for _, tag_key in ipairs(KEYS) do
+    for _, member in ipairs(redis.call('ZRANGE', tag_key, 0, -1)) do
+        keys[#keys + 1] = member
+    end
+    redis.call('DEL', tag_key)
+end
+for i = 1, #keys, 500 do
+    redis.call('UNLINK', unpack(keys, i, math.min(i + 499, #keys)))
+end
+return keys
+"""
+
+# Delete a lock only if it still holds this worker's token (it may have
+# expired and been taken by another worker meanwhile)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+
+def key_prefix(key: str) -> str:
+    """
+    Get the prefix a cache key is grouped under for statistics (text before the first colon).
+    """
+    return key.split(":", 1)[0]
+
+
+class LocalCache:
+    """
+    Bounded in-process cache in front of Redis.
+
+    Entries expire after their TTL and the least recently used entries are
+    evicted once either the entry count or the total payload size (measured
+    on the serialized form) exceeds its limit. Values are shared between
+    callers, so they must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, default_ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        # The sync helpers are also called from threadpool-run routes
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"l1_hits": 0, "l2_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        )
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Look up a key, returning (found, value).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats[key_prefix(key)]["l1_hits"] += 1
+            return True, value
+
+    def set(self, key: str, value: Any, size: int, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting least recently used entries to stay within limits.
+        """
+        if size > self.max_bytes:
+            return
+        ttl = self.default_ttl if ttl is None else min(ttl, self.default_ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                evicted_key, _ = next(iter(self._entries.items()))
+                self._remove(evicted_key)
+                self._stats[key_prefix(evicted_key)]["evictions"] += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self._stats[key_prefix(key)]["invalidations"] += 1
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._remove(key)
+                self._stats[key_prefix(key)]["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._stats.clear()
+
+    def record(self, key: str, event: str) -> None:
+        """
+        Count a lookup that was answered below the local tier (l2_hits or misses).
+        """
+        with self._lock:
+            self._stats[key_prefix(key)][event] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get entry/byte usage and per-prefix hit, miss and eviction counters.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "prefixes": {prefix: dict(counters) for prefix, counters in self._stats.items()},
+            }
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+local_cache = LocalCache(settings.CACHE_L1_MAX_ENTRIES, settings.CACHE_L1_MAX_BYTES, settings.CACHE_L1_TTL)
+
+
+def publish_invalidation(keys: Optional[list] = None, pattern: Optional[str] = None) -> None:
+    """
+    Tell other workers to drop keys (or every key starting with pattern) from their local cache.
+    """
+    if not settings.CACHE_L1_ENABLED:
+        return
+    message = json.dumps({"origin": INSTANCE_ID, "keys": keys or [], "pattern": pattern})
+    try:
+        redis_client.publish(INVALIDATION_CHANNEL, message)
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish cache invalidation: {str(e)}")
+
+
+async def apublish_invalidation(keys: Optional[list] = None, pattern: Optional[str] = None) -> None:
+    """
+    Async version of publish_invalidation.
+    """
+    if not settings.CACHE_L1_ENABLED:
+        return
+    message = json.dumps({"origin": INSTANCE_ID, "keys": keys or [], "pattern": pattern})
+    try:
+        await async_redis_client.publish(INVALIDATION_CHANNEL, message)
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish cache invalidation: {str(e)}")
+
+
+def handle_invalidation(message: Dict[str, Any]) -> None:
+    """
+    Apply an invalidation message received from another worker.
+    """
+    try:
+        payload = json.loads(message["data"])
+    except (KeyError, TypeError, ValueError):
+        return
+    if payload.get("origin") == INSTANCE_ID:
+        return
+    for key in payload.get("keys") or []:
+        local_cache.delete(key)
+    if payload.get("pattern"):
+        local_cache.delete_prefix(payload["pattern"])
+
+
+_invalidation_task: Optional[asyncio.Task] = None
+LISTENER_RETRY_INTERVAL = 5.0
+
 
-# Custom JSON encoder to handle datetime objects
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+async def _listen_for_invalidations() -> None:
+    """
+    Apply invalidation messages from other workers until cancelled, reconnecting if Redis drops.
+    """
+    while True:
+        pubsub = async_redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    handle_invalidation(message)
+        except Exception as e:
+            # Meanwhile entries still expire after CACHE_L1_TTL
+            logger.warning(f"Cache invalidation listener disconnected: {str(e)}")
+        finally:
+            try:
+                await pubsub.reset()
+            except Exception:
+                pass
+        await asyncio.sleep(LISTENER_RETRY_INTERVAL)
+
+
+def start_invalidation_listener() -> None:
+    """
+    Subscribe to invalidation messages so this worker's local cache stays in step with the others.
+    Must be called from the running event loop.
+    """
+    global _invalidation_task
+    if not settings.CACHE_L1_ENABLED or _invalidation_task is not None:
+        return
+    _invalidation_task = asyncio.get_running_loop().create_task(_listen_for_invalidations())
+
+
+async def stop_invalidation_listener() -> None:
+    """
+    Cancel the invalidation listener task.
+    """
+    global _invalidation_task
+    if _invalidation_task is not None:
+        _invalidation_task.cancel()
+        try:
+            await _invalidation_task
+        except asyncio.CancelledError:
+            pass
+        _invalidation_task = None
+
+
+async def close_async_client() -> None:
+    """
+    Disconnect the asyncio client's pooled connections.
+    """
+    await async_redis_client.close()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Get statistics for the local cache tier
+    """
+    return local_cache.stats()
+
+
+def _local_get(key: str) -> Tuple[bool, Any]:
+    if settings.CACHE_L1_ENABLED:
+        return local_cache.get(key)
+    return False, None
+
+def _decode_and_store(key: str, data: Optional[bytes]) -> Optional[Any]:
+    """
+    Decode a payload read from Redis, filling the local tier and counting the lookup.
+    """
+    if not data:
+        if settings.CACHE_L1_ENABLED:
+            local_cache.record(key, "misses")
+        return None
+    try:
+        value, size = cache_codec.decode(data)
+    except ValueError as e:
+        # Written by a worker with a codec this one lacks; treat as a miss
+        logger.warning(f"Could not decode cached value for {key}: {str(e)}")
+        return None
+    if settings.CACHE_L1_ENABLED:
+        local_cache.record(key, "l2_hits")
+        local_cache.set(key, value, size)
+    return value
+
+def _store_local(key: str, value: Any, size: int, expiry: int) -> None:
+    """
+    Put a value just written to Redis into the local tier as given, without
+    decoding the payload again. Local hits may therefore return richer types
+    (e.g. datetimes) than the JSON a Redis hit decodes to.
+    """
+    if settings.CACHE_L1_ENABLED:
+        local_cache.set(key, value, size, expiry)
 
 def get_cache(key: str) -> Optional[Any]:
     """
-    Get value from cache
+    Get value from cache, checking the local tier before Redis
     """
-    data = redis_client.get(key)
-    if data:
-        return json.loads(data)
-    return None
+    found, value = _local_get(key)
+    if found:
+        return value
+    return _decode_and_store(key, redis_client.get(key))
 
 def set_cache(key: str, value: Any, expiry: int = DEFAULT_EXPIRY) -> None:
     """
     Set value in cache with expiry time
     """
-    redis_client.setex(key, expiry, json.dumps(value, cls=DateTimeEncoder))
+    data, size = cache_codec.encode(value)
+    redis_client.setex(key, expiry, data)
+    _store_local(key, value, size, expiry)
+    publish_invalidation(keys=[key])
 
 def delete_cache(key: str) -> None:
     """
     Delete value from cache
     """
     redis_client.delete(key)
+    if settings.CACHE_L1_ENABLED:
+        local_cache.delete(key)
+        publish_invalidation(keys=[key])
 
 def clear_cache_pattern(pattern: str) -> None:
     """
@@ -44,9 +350,354 @@ def clear_cache_pattern(pattern: str) -> None:
     """
     for key in redis_client.scan_iter(f"{pattern}*"):
         redis_client.delete(key)
+    if settings.CACHE_L1_ENABLED:
+        local_cache.delete_prefix(pattern)
+        publish_invalidation(pattern=pattern)
 
 def invalidate_cache(key_pattern: str) -> None:
     """
     Invalidate cache for a specific key pattern
     """
-    clear_cache_pattern(key_pattern) 
\ No newline at end of file
+    clear_cache_pattern(key_pattern)
+
+
+def tag_key(tag: str) -> str:
+    # Renamed from tag: when tag sets became sorted sets, so old plain sets are never written as sorted ones
+    return f"tagz:{tag}"
+
+def coin_tag(coingecko_id: str) -> str:
+    """
+    Tag for cached views derived from a coin's prices.
+    """
+    return f"coin:{coingecko_id}"
+
+def exchange_tag(exchange_id: int) -> str:
+    """
+    Tag for cached views derived from an exchange's prices.
+    """
+    return f"exchange:{exchange_id}"
+
+# Tags for cached listings of all coins and all exchanges
+COIN_LIST_TAG = "coins"
+EXCHANGE_LIST_TAG = "exchanges"
+
+def add_tags(pipe: Any, key: str, expiry: int, tags: Iterable[str]) -> None:
+    """
+    Queue the commands recording key under tags on a Redis pipeline.
+    
+    Members whose entries have expired are trimmed at the same time, so a
+    tag set only holds live keys however many variants (e.g. per-amount
+    comparisons) are written under one tag.
+    """
+    now = time.time()
+    for tag in tags:
+        pipe.zadd(tag_key(tag), {key: now + expiry})
+        pipe.zremrangebyscore(tag_key(tag), "-inf", now)
+        pipe.expire(tag_key(tag), max(expiry, TAG_TTL))
+
+def price_tags(coingecko_id: str, exchange_ids: Iterable[int]) -> List[str]:
+    """
+    Tags of every cached view affected by writing a coin's prices on the given exchanges.
+    """
+    return [coin_tag(coingecko_id), *(exchange_tag(exchange_id) for exchange_id in exchange_ids)]
+
+async def ainvalidate_tags(tags: Iterable[str]) -> int:
+    """
+    Drop every cached entry carrying any of the tags, in one Redis round-trip
+    and without scanning the keyspace. Redis errors are logged, not raised,
+    so writers never fail because of the cache.
+    
+    Returns:
+        Number of entries dropped
+    """
+    tag_keys = [tag_key(tag) for tag in tags]
+    if not tag_keys:
+        return 0
+    try:
+        script = async_redis_client.register_script(INVALIDATE_TAGS_SCRIPT)
+        deleted = await script(keys=tag_keys)
+    except (redis.RedisError, OSError) as e:
+        logger.warning(f"Could not invalidate cache tags {tag_keys}: {str(e)}")
+        return 0
+
+    keys = [key.decode() if isinstance(key, bytes) else key for key in deleted]
+    if keys and settings.CACHE_L1_ENABLED:
+        for key in keys:
+            local_cache.delete(key)
+        await apublish_invalidation(keys=keys)
+    return len(keys)
+
+async def aget_cache(key: str) -> Optional[Any]:
+    """
+    Async version of get_cache
+    """
+    found, value = _local_get(key)
+    if found:
+        return value
+    return _decode_and_store(key, await async_redis_client.get(key))
+
+async def aset_cache(key: str, value: Any, expiry: int = DEFAULT_EXPIRY, tags: Optional[Iterable[str]] = None) -> None:
+    """
+    Async version of set_cache
+    
+    Args:
+        key: Cache key
+        value: Value to cache
+        expiry: Time to live in seconds (at most TAG_TTL when tagged)
+        tags: Tags (see coin_tag and exchange_tag) the entry is derived from;
+            ainvalidate_tags drops it when any of them changes
+    """
+    data, size = cache_codec.encode(value)
+    if tags:
+        pipe = async_redis_client.pipeline(transaction=False)
+        pipe.setex(key, expiry, data)
+        add_tags(pipe, key, expiry, tags)
+        await pipe.execute()
+    else:
+        await async_redis_client.setex(key, expiry, data)
+    _store_local(key, value, size, expiry)
+    await apublish_invalidation(keys=[key])
+
+async def adelete_cache(key: str) -> None:
+    """
+    Async version of delete_cache
+    """
+    await async_redis_client.delete(key)
+    if settings.CACHE_L1_ENABLED:
+        local_cache.delete(key)
+        await apublish_invalidation(keys=[key])
+
+async def aclear_cache_pattern(pattern: str) -> None:
+    """
+    Async version of clear_cache_pattern. Matching keys are removed in
+    batches with UNLINK rather than one DELETE per key.
+    """
+    batch = []
+    async for key in async_redis_client.scan_iter(match=f"{pattern}*", count=CLEAR_BATCH_SIZE):
+        batch.append(key)
+        if len(batch) >= CLEAR_BATCH_SIZE:
+            await async_redis_client.unlink(*batch)
+            batch = []
+    if batch:
+        await async_redis_client.unlink(*batch)
+    if settings.CACHE_L1_ENABLED:
+        local_cache.delete_prefix(pattern)
+        await apublish_invalidation(pattern=pattern)
+
+async def ainvalidate_cache(key_pattern: str) -> None:
+    """
+    Async version of invalidate_cache
+    """
+    await aclear_cache_pattern(key_pattern)
+
+async def aget_many(keys: Iterable[str]) -> Dict[str, Any]:
+    """
+    Get several values in one round-trip, checking the local tier first.
+    
+    Returns:
+        Dictionary of cached values keyed by cache key; missing keys are left out
+    """
+    results = {}
+    remote_keys = []
+    for key in keys:
+        found, value = _local_get(key)
+        if found:
+            results[key] = value
+        else:
+            remote_keys.append(key)
+
+    if remote_keys:
+        for key, data in zip(remote_keys, await async_redis_client.mget(remote_keys)):
+            value = _decode_and_store(key, data)
+            if value is not None:
+                results[key] = value
+    return results
+
+async def aset_many(
+    values: Dict[str, Any],
+    expiry: int = DEFAULT_EXPIRY,
+    tags: Optional[Dict[str, Iterable[str]]] = None
+) -> None:
+    """
+    Set several values with the same expiry in one pipelined round-trip.
+    
+    Args:
+        values: Values keyed by cache key
+        expiry: Expiry in seconds
+        tags: Tags to store each key under (see aset_cache), keyed by cache key
+    """
+    if not values:
+        return
+    encoded = {key: cache_codec.encode(value) for key, value in values.items()}
+    pipe = async_redis_client.pipeline(transaction=False)
+    for key, (data, _) in encoded.items():
+        pipe.setex(key, expiry, data)
+        if tags and key in tags:
+            add_tags(pipe, key, expiry, tags[key])
+    if settings.CACHE_L1_ENABLED:
+        pipe.publish(INVALIDATION_CHANNEL, json.dumps({"origin": INSTANCE_ID, "keys": list(encoded), "pattern": None}))
+    await pipe.execute()
+    for key, (_, size) in encoded.items():
+        _store_local(key, values[key], size, expiry)
+
+# Background refreshes started by stale reads, keyed by cache key. Holding
+# the tasks also keeps them from being garbage collected mid-run.
+_revalidations: Dict[str, asyncio.Task] = {}
+
+async def _store_with_timestamp(key: str, value: Any, hard_ttl: int, tags: Optional[Iterable[str]]) -> None:
+    await aset_cache(key, {"value": value, "cached_at": time.time()}, hard_ttl, tags=tags)
+
+async def aset_many_for_revalidation(
+    values: Dict[str, Any],
+    hard_ttl: int,
+    tags: Optional[Dict[str, Iterable[str]]] = None
+) -> None:
+    """
+    Store several values as aget_with_revalidation would after computing them, in one round-trip.
+    """
+    now = time.time()
+    await aset_many({key: {"value": value, "cached_at": now} for key, value in values.items()}, hard_ttl, tags)
+
+def revalidation_age(entry: Any) -> Optional[int]:
+    """
+    Age in seconds of an entry stored by aget_with_revalidation, or None if it is not one.
+    """
+    if isinstance(entry, dict) and "cached_at" in entry:
+        return max(0, int(time.time() - entry["cached_at"]))
+    return None
+
+async def _revalidate(
+    key: str,
+    refresh: Callable[[], Awaitable[Any]],
+    hard_ttl: int,
+    tags: Optional[Iterable[str]]
+) -> None:
+    """
+    Recompute a stale entry, unless another worker is already doing so.
+    """
+    lock_key = f"revalidate:lock:{key}"
+    locked = False
+    try:
+        locked = bool(await async_redis_client.set(lock_key, INSTANCE_ID, nx=True, ex=REVALIDATE_LOCK_TTL))
+        if not locked:
+            return
+        await _store_with_timestamp(key, await refresh(), hard_ttl, tags)
+    except Exception as e:
+        # The stale value keeps being served until the hard TTL; the next read retries
+        logger.warning(f"Background refresh of {key} failed: {str(e)}")
+    finally:
+        _revalidations.pop(key, None)
+        if locked:
+            # Released on failure too, so the next stale read can retry at once
+            try:
+                release = async_redis_client.register_script(RELEASE_LOCK_SCRIPT)
+                await release(keys=[lock_key], args=[INSTANCE_ID])
+            except (redis.RedisError, OSError) as e:
+                logger.warning(f"Could not release refresh lock of {key}: {str(e)}")
+
+async def aget_with_revalidation(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    soft_ttl: int,
+    hard_ttl: int,
+    refresh: Optional[Callable[[], Awaitable[Any]]] = None,
+    tags: Optional[Iterable[str]] = None
+) -> Tuple[Any, int, str]:
+    """
+    Get a value with stale-while-revalidate semantics.
+    
+    Entries younger than soft_ttl are served as-is. Older entries are still
+    served immediately, while one background task in the cluster recomputes
+    them. Entries older than hard_ttl are never served (the local tier may
+    outlive the Redis copy), so callers wait for compute again.
+    
+    Args:
+        key: Cache key
+        compute: Coroutine function producing the value on a miss
+        soft_ttl: Age in seconds after which an entry is refreshed in the background
+        hard_ttl: Age in seconds after which an entry is no longer served
+        refresh: Coroutine function used for background refreshes, when it
+            cannot reuse compute (e.g. compute holds a request-scoped session)
+        tags: Tags to store the entry under (see aset_cache)
+        
+    Returns:
+        Tuple of (value, age in seconds, cache status "HIT", "STALE" or "MISS")
+    """
+    entry = await aget_cache(key)
+    age = revalidation_age(entry)
+    if age is not None and age < hard_ttl:
+        if age < soft_ttl:
+            return entry["value"], age, "HIT"
+        if key not in _revalidations:
+            _revalidations[key] = asyncio.create_task(_revalidate(key, refresh or compute, hard_ttl, tags))
+        return entry["value"], age, "STALE"
+
+    value = await compute()
+    await _store_with_timestamp(key, value, hard_ttl, tags)
+    return value, 0, "MISS"
+
+def jittered_ttl(ttl: int) -> int:
+    """
+    Spread a TTL by up to CACHE_TTL_JITTER in either direction, so keys
+    written together do not all expire together.
+    """
+    jitter = settings.CACHE_TTL_JITTER
+    return max(1, round(ttl * random.uniform(1 - jitter, 1 + jitter)))
+
+def _fresh_enough(entry: Any, beta: float) -> bool:
+    """
+    Decide whether an XFetch entry can be served or should be recomputed early.
+    
+    The chance of recomputing grows as the entry nears expiry and with how
+    long it took to compute, so expensive hot keys are refreshed by one
+    early caller instead of by everyone once they expire.
+    """
+    if not (isinstance(entry, dict) and "expires_at" in entry and "delta" in entry):
+        return False
+    if beta <= 0:
+        return True
+    # 1 - random() lies in (0, 1], so the log is defined and never positive
+    return time.time() - entry["delta"] * beta * math.log(1.0 - random.random()) < entry["expires_at"]
+
+async def aget_or_compute(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: int,
+    coalesce: bool = False,
+    beta: Optional[float] = None
+) -> Any:
+    """
+    Get a value, recomputing it with probabilistic early expiration (XFetch).
+    
+    The value is stored together with how long compute took and when the
+    entry expires. Readers close to the expiry may recompute it early;
+    see _fresh_enough. The stored TTL is jittered.
+    
+    Args:
+        key: Cache key
+        compute: Coroutine function producing the value; the result must be JSON serializable
+        ttl: Nominal time to live in seconds
+        coalesce: Whether concurrent recomputations of the key share one call (see singleflight)
+        beta: Early recomputation factor; higher recomputes earlier and 0
+            disables it. Defaults to CACHE_XFETCH_BETA.
+        
+    Returns:
+        Cached or freshly computed value
+    """
+    entry = await aget_cache(key)
+    if _fresh_enough(entry, settings.CACHE_XFETCH_BETA if beta is None else beta):
+        return entry["value"]
+
+    async def compute_and_store():
+        started = time.monotonic()
+        value = await compute()
+        delta = time.monotonic() - started
+        expiry = jittered_ttl(ttl)
+        await aset_cache(key, {"value": value, "delta": delta, "expires_at": time.time() + expiry}, expiry)
+        return value
+
+    if coalesce:
+        # Imported here because singleflight itself builds on this module
+        from app.services import singleflight
+        return await singleflight.coalesce(key, compute_and_store)
+    return await compute_and_store()
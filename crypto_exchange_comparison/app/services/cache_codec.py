@@ -0,0 +1,213 @@
+"""
+Encoding of values stored in the Redis cache.
+
+Every stored payload starts with a four byte header: a marker byte, the
+format version, the codec id and the compression id. Any worker can decode
+any entry whose codec and compression library it has installed, whatever
+its own settings. Entries written before the header existed are plain JSON
+text and are still readable, since JSON never starts with the marker byte.
+"""
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, NamedTuple, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover - depends on the environment
+    lz4 = None
+
+from app.config.settings import settings
+
+logger = logging.getLogger("cache_codec")
+
+MAGIC = 0xCC
+FORMAT_VERSION = 1
+HEADER_SIZE = 4
+ZSTD_LEVEL = 3
+
+
+# Custom JSON encoder to handle datetime objects
+class DateTimeEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return super().default(obj)
+
+
+class Codec(NamedTuple):
+    name: str
+    id: int
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+class Compressor(NamedTuple):
+    name: str
+    id: int
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+CODECS: Dict[str, Codec] = {}
+COMPRESSORS: Dict[str, Compressor] = {}
+_codecs_by_id: Dict[int, Codec] = {}
+_compressors_by_id: Dict[int, Compressor] = {}
+
+
+def register_codec(name: str, codec_id: int, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]) -> None:
+    """
+    Make a serialization format available for encoding and decoding.
+
+    Args:
+        name: Name used in the CACHE_CODEC setting
+        codec_id: Id written to the payload header; must never be reused for another format
+        dumps: Function serializing a value to bytes
+        loads: Function deserializing bytes produced by dumps
+    """
+    codec = Codec(name, codec_id, dumps, loads)
+    CODECS[name] = codec
+    _codecs_by_id[codec_id] = codec
+
+
+def register_compressor(
+    name: str,
+    compression_id: int,
+    compress: Callable[[bytes], bytes],
+    decompress: Callable[[bytes], bytes]
+) -> None:
+    """
+    Make a compression format available for encoding and decoding.
+
+    Args:
+        name: Name used in the CACHE_COMPRESSION setting
+        compression_id: Id written to the payload header; must never be reused for another format
+        compress: Function compressing bytes
+        decompress: Function reversing compress
+    """
+    compressor = Compressor(name, compression_id, compress, decompress)
+    COMPRESSORS[name] = compressor
+    _compressors_by_id[compression_id] = compressor
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, cls=DateTimeEncoder).encode()
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+register_codec("json", 1, _json_dumps, json.loads)
+if orjson is not None:
+    # orjson writes datetimes as ISO 8601, matching DateTimeEncoder
+    register_codec("orjson", 2, lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS), orjson.loads)
+if msgpack is not None:
+    register_codec(
+        "msgpack",
+        3,
+        lambda value: msgpack.packb(value, default=_msgpack_default),
+        lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False),
+    )
+
+register_compressor("none", 0, bytes, bytes)
+register_compressor("zlib", 1, zlib.compress, zlib.decompress)
+if zstandard is not None:
+    # Compressor objects are not thread-safe and sync cache calls run in the threadpool
+    register_compressor(
+        "zstd",
+        2,
+        lambda data: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+if lz4 is not None:
+    register_compressor("lz4", 3, lz4.frame.compress, lz4.frame.decompress)
+
+
+def _configured(registry: Dict[str, Any], name: str, fallback: str, kind: str) -> Any:
+    if name in registry:
+        return registry[name]
+    logger.warning(f"Cache {kind} {name!r} is not available, using {fallback}")
+    return registry[fallback]
+
+
+active_codec: Codec = _configured(CODECS, settings.CACHE_CODEC, "json", "codec")
+active_compressor: Compressor = _configured(COMPRESSORS, settings.CACHE_COMPRESSION, "zlib", "compression")
+
+
+def encode(value: Any) -> Tuple[bytes, int]:
+    """
+    Serialize a value for storage, compressing it if it is large enough.
+
+    Args:
+        value: JSON-compatible value (datetimes are stored as ISO 8601 strings)
+
+    Returns:
+        Tuple of (payload to store, size of the uncompressed serialized value)
+    """
+    codec = active_codec
+    try:
+        raw = codec.dumps(value)
+    except TypeError:
+        # Types the fast codec does not know are still handled by the json codec
+        codec = CODECS["json"]
+        raw = codec.dumps(value)
+
+    compressor = COMPRESSORS["none"]
+    body = raw
+    if active_compressor.id != compressor.id and len(raw) >= settings.CACHE_COMPRESSION_MIN_BYTES:
+        compressed = active_compressor.compress(raw)
+        if len(compressed) < len(raw):
+            compressor = active_compressor
+            body = compressed
+
+    return bytes((MAGIC, FORMAT_VERSION, codec.id, compressor.id)) + body, len(raw)
+
+
+def decode(data: Union[bytes, str]) -> Tuple[Any, int]:
+    """
+    Deserialize a stored payload, whichever codec and compression wrote it.
+
+    Args:
+        data: Payload read from Redis
+
+    Returns:
+        Tuple of (value, size of the uncompressed serialized value)
+
+    Raises:
+        ValueError: If the payload uses a format version, codec or compression this worker does not have
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    if not data or data[0] != MAGIC:
+        # Plain JSON written before the header was introduced
+        return json.loads(data), len(data)
+
+    version, codec_id, compression_id = data[1], data[2], data[3]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported cache payload version {version}")
+    codec = _codecs_by_id.get(codec_id)
+    compressor = _compressors_by_id.get(compression_id)
+    if codec is None or compressor is None:
+        raise ValueError(f"Unsupported cache payload codec {codec_id} or compression {compression_id}")
+
+    raw = compressor.decompress(data[HEADER_SIZE:])
+    return codec.loads(raw), len(raw)
@@ -1,15 +1,98 @@
 import httpx
-from typing import Dict, List, Any, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 import asyncio
+import importlib.util
+import logging
 import random
 import time
+from email.utils import parsedate_to_datetime
 from fastapi import HTTPException, status
 
-from app.services.cache import get_cache, set_cache
+from app.config.settings import settings
+from app.services.cache import aget_or_compute
+from app.services.rate_limiter import coingecko_limiter
 
-COINGECKO_API_URL = "https://api.coingecko.com/api/v3"
+COINGECKO_API_URL = settings.COINGECKO_API_URL
 CACHE_PREFIX = "coingecko"
 MAX_RETRIES = 3
+MARKETS_PAGE_SIZE = 250  # Largest page /coins/markets returns
+TICKERS_PAGE_SIZE = 100  # Fixed page size of /coins/{id}/tickers
+
+logger = logging.getLogger("coingecko")
+
+# Application-scoped client, shared by every request to CoinGecko
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    """
+    Build the pooled HTTP client from application settings.
+    """
+    # HTTP/2 needs the optional h2 package (installed via httpx[http2])
+    http2 = settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+    if settings.HTTP2_ENABLED and not http2:
+        logger.warning("h2 package not installed, falling back to HTTP/1.1 for CoinGecko requests")
+
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def init_client() -> httpx.AsyncClient:
+    """
+    Create the shared HTTP client. Called on application startup.
+    """
+    return get_client()
+
+
+async def close_client() -> None:
+    """
+    Close the shared HTTP client and its pooled connections. Called on application shutdown.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Get the shared HTTP client, creating it lazily for callers running
+    outside the application lifecycle (scripts, one-off tasks).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def get_retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    Parse the Retry-After header of a response, given either in seconds or as an HTTP date.
+    
+    Returns:
+        Seconds to wait, or None if the header is missing or invalid
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
 
 async def make_api_request(url: str, params: Optional[Dict[str, Any]] = None):
     """
@@ -20,25 +103,34 @@ async def make_api_request(url: str, params: Optional[Dict[str, Any]] = None):
     
     while retry_count < MAX_RETRIES:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, timeout=10.0)
+            # Wait for our share of the upstream request budget
+            await coingecko_limiter.acquire()
+            response = await get_client().get(url, params=params)
+            
+            if response.status_code == 429:  # Too Many Requests
+                retry_count += 1
+                if retry_count >= MAX_RETRIES:
+                    raise HTTPException(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        detail=f"CoinGecko API rate limit exceeded after {MAX_RETRIES} retries"
+                    )
                 
-                if response.status_code == 429:  # Too Many Requests
-                    retry_count += 1
-                    if retry_count >= MAX_RETRIES:
-                        raise HTTPException(
-                            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                            detail=f"CoinGecko API rate limit exceeded after {MAX_RETRIES} retries"
-                        )
-                    
-                    # Exponential backoff with jitter
-                    delay = base_delay * (2 ** retry_count) + random.uniform(0, 1)
-                    print(f"Rate limited by CoinGecko, retrying in {delay:.2f} seconds...")
-                    await asyncio.sleep(delay)
+                # Honour Retry-After for every process sharing the budget;
+                # the next acquire() waits until the pause has passed
+                retry_after = get_retry_after(response)
+                if retry_after is not None:
+                    print(f"Rate limited by CoinGecko, pausing requests for {retry_after:.2f} seconds...")
+                    await coingecko_limiter.penalize(retry_after)
                     continue
                 
-                response.raise_for_status()
-                return response.json()
+                # Exponential backoff with jitter
+                delay = base_delay * (2 ** retry_count) + random.uniform(0, 1)
+                print(f"Rate limited by CoinGecko, retrying in {delay:.2f} seconds...")
+                await asyncio.sleep(delay)
+                continue
+            
+            response.raise_for_status()
+            return response.json()
                 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 429:  # Too Many Requests
@@ -68,36 +160,20 @@ async def get_coins() -> List[Dict[str, Any]]:
     """
     Get list of all coins from Coingecko API with cache
     """
-    cache_key = f"{CACHE_PREFIX}:coins"
-    cached_data = get_cache(cache_key)
-    
-    if cached_data:
-        return cached_data
+    async def fetch_coins():
+        return await make_api_request(f"{COINGECKO_API_URL}/coins/list")
     
-    result = await make_api_request(f"{COINGECKO_API_URL}/coins/list")
-    
-    # Cache the result
-    set_cache(cache_key, result, 86400)  # Cache for 24 hours
-    
-    return result
+    return await aget_or_compute(f"{CACHE_PREFIX}:coins", fetch_coins, 86400)  # Cache for 24 hours
 
 
 async def get_exchanges() -> List[Dict[str, Any]]:
     """
     Get list of all exchanges from Coingecko API with cache
     """
-    cache_key = f"{CACHE_PREFIX}:exchanges"
-    cached_data = get_cache(cache_key)
-    
-    if cached_data:
-        return cached_data
-    
-    result = await make_api_request(f"{COINGECKO_API_URL}/exchanges")
-    
-    # Cache the result
-    set_cache(cache_key, result, 86400)  # Cache for 24 hours
+    async def fetch_exchanges():
+        return await make_api_request(f"{COINGECKO_API_URL}/exchanges")
     
-    return result
+    return await aget_or_compute(f"{CACHE_PREFIX}:exchanges", fetch_exchanges, 86400)  # Cache for 24 hours
 
 
 async def get_coin_price(coin_id: str, vs_currencies: str = "usd") -> Dict[str, Dict[str, float]]:
@@ -105,11 +181,6 @@ async def get_coin_price(coin_id: str, vs_currencies: str = "usd") -> Dict[str,
     Get price of a specific coin
     """
     cache_key = f"{CACHE_PREFIX}:price:{coin_id}:{vs_currencies}"
-    cached_data = get_cache(cache_key)
-    
-    if cached_data:
-        return cached_data
-    
     params = {
         "ids": coin_id,
         "vs_currencies": vs_currencies,
@@ -117,30 +188,105 @@ async def get_coin_price(coin_id: str, vs_currencies: str = "usd") -> Dict[str,
         "include_market_cap": "true"
     }
     
-    result = await make_api_request(f"{COINGECKO_API_URL}/simple/price", params)
+    async def fetch_price():
+        return await make_api_request(f"{COINGECKO_API_URL}/simple/price", params)
     
-    # Cache the result
-    set_cache(cache_key, result, 300)  # Cache for 5 minutes
-    
-    return result
+    # Concurrent misses for the same coin share one upstream request
+    return await aget_or_compute(cache_key, fetch_price, 300, coalesce=True)  # Cache for 5 minutes
 
 
 async def get_coin_tickers(coin_id: str) -> Dict[str, Any]:
     """
     Get tickers (exchange data) for a specific coin
+    
+    Only the first page; use iter_coin_tickers to walk every page.
     """
-    cache_key = f"{CACHE_PREFIX}:tickers:{coin_id}"
-    cached_data = get_cache(cache_key)
+    return await get_coin_tickers_page(coin_id, 1)
+
+
+async def get_coin_tickers_page(
+    coin_id: str,
+    page: int,
+    exchange_ids: Optional[List[str]] = None,
+    depth: bool = False
+) -> Dict[str, Any]:
+    """
+    Get one page of tickers for a specific coin with cache
     
-    if cached_data:
-        return cached_data
+    Args:
+        coin_id: CoinGecko ID of the coin
+        page: Page number, starting at 1
+        exchange_ids: Only include tickers from these CoinGecko exchange IDs
+        depth: Include the cost to move the price 2% up and down
+        
+    Returns:
+        Tickers response for the page
+    """
+    exchanges = ",".join(sorted(exchange_ids)) if exchange_ids else ""
+    cache_key = f"{CACHE_PREFIX}:tickers:{coin_id}:{page}:{exchanges}:{int(depth)}"
+    params: Dict[str, Any] = {"page": page}
+    if exchanges:
+        params["exchange_ids"] = exchanges
+    if depth:
+        params["depth"] = "true"
     
-    result = await make_api_request(f"{COINGECKO_API_URL}/coins/{coin_id}/tickers")
+    async def fetch_tickers():
+        return await make_api_request(f"{COINGECKO_API_URL}/coins/{coin_id}/tickers", params)
     
-    # Cache the result
-    set_cache(cache_key, result, 300)  # Cache for 5 minutes
+    # Concurrent misses for the same page share one upstream request
+    return await aget_or_compute(cache_key, fetch_tickers, 300, coalesce=True)  # Cache for 5 minutes
+
+
+async def iter_coin_tickers(
+    coin_id: str,
+    exchange_ids: Optional[List[str]] = None,
+    depth: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield every ticker of a coin, walking all pages of /coins/{id}/tickers
     
-    return result
+    The endpoint does not report a page count, so after the first page the
+    next COINGECKO_PAGE_CONCURRENCY pages are fetched at once, and fetching
+    stops at the first short page. Tickers are yielded as each page arrives,
+    so they come in no particular order.
+    
+    Args:
+        coin_id: CoinGecko ID of the coin
+        exchange_ids: Only include tickers from these CoinGecko exchange IDs
+        depth: Include the cost to move the price 2% up and down
+        
+    Yields:
+        Ticker dictionaries as returned by CoinGecko
+    """
+    async def fetch_page(page: int) -> List[Dict[str, Any]]:
+        return (await get_coin_tickers_page(coin_id, page, exchange_ids, depth)).get("tickers", [])
+    
+    tickers = await fetch_page(1)
+    for ticker in tickers:
+        yield ticker
+    if len(tickers) < TICKERS_PAGE_SIZE:
+        return
+    
+    next_page = 2
+    while True:
+        window = [
+            asyncio.ensure_future(fetch_page(page))
+            for page in range(next_page, next_page + settings.COINGECKO_PAGE_CONCURRENCY)
+        ]
+        next_page += len(window)
+        last_page_seen = False
+        try:
+            for page_result in asyncio.as_completed(window):
+                tickers = await page_result
+                last_page_seen = last_page_seen or len(tickers) < TICKERS_PAGE_SIZE
+                for ticker in tickers:
+                    yield ticker
+        finally:
+            # Also reached when the consumer stops early
+            for task in window:
+                task.cancel()
+        if last_page_seen:
+            return
 
 
 async def get_coins_with_market_data(vs_currency: str = "usd", per_page: int = 250, page: int = 1) -> List[Dict[str, Any]]:
@@ -150,11 +296,6 @@ async def get_coins_with_market_data(vs_currency: str = "usd", per_page: int = 2
     This provides coins with actual price data, market cap, etc.
     """
     cache_key = f"{CACHE_PREFIX}:markets:{vs_currency}:{per_page}:{page}"
-    cached_data = get_cache(cache_key)
-    
-    if cached_data:
-        return cached_data
-    
     params = {
         "vs_currency": vs_currency,
         "per_page": per_page,
@@ -163,9 +304,50 @@ async def get_coins_with_market_data(vs_currency: str = "usd", per_page: int = 2
         "price_change_percentage": "24h"
     }
     
-    result = await make_api_request(f"{COINGECKO_API_URL}/coins/markets", params)
+    async def fetch_markets():
+        return await make_api_request(f"{COINGECKO_API_URL}/coins/markets", params)
+    
+    # Cache for 5 minutes (more frequent updates for price data)
+    return await aget_or_compute(cache_key, fetch_markets, 300)
+
+
+async def fetch_pages(fetch_page: Callable[[int], Awaitable[List[Any]]], pages: int) -> List[List[Any]]:
+    """
+    Fetch pages 1..pages of a paginated endpoint concurrently.
     
-    # Cache the result
-    set_cache(cache_key, result, 300)  # Cache for 5 minutes (more frequent updates for price data)
+    At most COINGECKO_PAGE_CONCURRENCY pages are in flight at once; every
+    request still waits for its share of the rate limit budget.
     
-    return result 
\ No newline at end of file
+    Args:
+        fetch_page: Coroutine function fetching one page by number
+        pages: Number of pages to fetch
+        
+    Returns:
+        The pages, in page order
+    """
+    semaphore = asyncio.Semaphore(settings.COINGECKO_PAGE_CONCURRENCY)
+    
+    async def fetch(page: int) -> List[Any]:
+        async with semaphore:
+            return await fetch_page(page)
+    
+    return await asyncio.gather(*(fetch(page) for page in range(1, pages + 1)))
+
+
+async def get_top_coins_with_market_data(limit: int, vs_currency: str = "usd") -> List[Dict[str, Any]]:
+    """
+    Get the top coins by market cap with market data, fetching /coins/markets pages concurrently
+    
+    Args:
+        limit: Number of coins to return
+        vs_currency: Currency of prices and market caps
+        
+    Returns:
+        Coin market data dictionaries, ordered by market cap rank
+    """
+    per_page = min(limit, MARKETS_PAGE_SIZE)
+    pages = -(-limit // per_page)
+    results = await fetch_pages(
+        lambda page: get_coins_with_market_data(vs_currency, per_page=per_page, page=page), pages
+    )
+    return [coin for page in results for coin in page][:limit]
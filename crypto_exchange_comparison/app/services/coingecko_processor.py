@@ -1,23 +1,22 @@
 """
 Service for processing data from the CoinGecko API.
 """
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 
 from app.services import coingecko
 
 
 async def fetch_top_coins(limit: int = 50) -> List[Dict[str, Any]]:
     """
-    Fetch top coins from CoinGecko API.
+    Fetch the top coins by market cap from CoinGecko API, with their market data.
     
     Args:
         limit: Maximum number of coins to fetch
         
     Returns:
-        List of coin data dictionaries
+        List of coin market data dictionaries, ordered by market cap rank
     """
-    coins_data = await coingecko.get_coins()
-    return coins_data[:limit]
+    return await coingecko.get_top_coins_with_market_data(limit)
 
 
 async def fetch_top_exchanges(limit: int = 20) -> List[Dict[str, Any]]:
@@ -34,68 +33,150 @@ async def fetch_top_exchanges(limit: int = 20) -> List[Dict[str, Any]]:
     return exchanges_data[:limit]
 
 
-async def fetch_coin_tickers(coin_id: str) -> Dict[str, Any]:
+class TickerRecord:
     """
-    Fetch ticker data for a specific coin.
+    The fields of a CoinGecko ticker that prices are built from.
     
-    Args:
-        coin_id: CoinGecko ID of the coin
-        
-    Returns:
-        Dictionary with ticker data
+    Slotted and detached from the raw ticker dict, so a page of tickers can
+    be released as soon as it has been normalized.
     """
-    return await coingecko.get_coin_tickers(coin_id)
+    __slots__ = (
+        "name", "coingecko_exchange_id", "price", "volume", "bid", "ask", "spread", "depth_up_usd", "depth_down_usd"
+    )
+    
+    def __init__(
+        self,
+        name: str,
+        coingecko_exchange_id: Optional[str] = None,
+        price: float = 0,
+        volume: float = 0,
+        bid: Optional[float] = None,
+        ask: Optional[float] = None,
+        spread: Optional[float] = None,
+        depth_up_usd: Optional[float] = None,
+        depth_down_usd: Optional[float] = None
+    ):
+        self.name = name
+        self.coingecko_exchange_id = coingecko_exchange_id
+        self.price = price
+        self.volume = volume
+        self.bid = bid
+        self.ask = ask
+        self.spread = spread
+        self.depth_up_usd = depth_up_usd
+        self.depth_down_usd = depth_down_usd
+    
+    def __repr__(self):
+        return f"<TickerRecord {self.name} {self.price}>"
+
 
+def _build_record(ticker: Dict[str, Any], market: Dict[str, Any], name: str, volume: float) -> TickerRecord:
+    converted_last = ticker.get("converted_last")
+    return TickerRecord(
+        name,
+        market.get("identifier"),
+        converted_last.get("usd", 0) if converted_last else 0,
+        volume,
+        ticker.get("bid"),
+        ticker.get("ask"),
+        ticker.get("bid_ask_spread_percentage"),
+        # Only present when tickers are fetched with depth
+        ticker.get("cost_to_move_up_usd"),
+        ticker.get("cost_to_move_down_usd"),
+    )
 
-def extract_ticker_data(ticker: Dict[str, Any]) -> Dict[str, Any]:
+
+def normalize_ticker(ticker: Dict[str, Any]) -> Optional[TickerRecord]:
     """
-    Extract relevant data from a ticker object.
+    Build a ticker record from a CoinGecko ticker in one pass over its fields.
     
     Args:
         ticker: Ticker data from CoinGecko API
         
     Returns:
-        Dictionary with extracted ticker data
+        Ticker record, or None if the ticker has no exchange name
+    """
+    market = ticker.get("market")
+    name = market.get("name") if market else None
+    if not name:
+        return None
+    converted_volume = ticker.get("converted_volume")
+    return _build_record(ticker, market, name, converted_volume.get("usd", 0) if converted_volume else 0)
+
+
+async def iter_coin_tickers(
+    coin_id: str,
+    exchange_ids: Optional[List[str]] = None,
+    depth: bool = False
+) -> AsyncIterator[TickerRecord]:
     """
-    exchange_name = ticker.get("market", {}).get("name")
-    if not exchange_name:
-        return {}
+    Stream the ticker records of a coin across all ticker pages.
     
-    return {
-        "name": exchange_name,
-        "price": ticker.get("converted_last", {}).get("usd", 0),
-        "volume": ticker.get("converted_volume", {}).get("usd", 0),
-        "bid": ticker.get("bid"),
-        "ask": ticker.get("ask"),
-        "ticker": ticker
-    }
+    Args:
+        coin_id: CoinGecko ID of the coin
+        exchange_ids: Only include tickers from these CoinGecko exchange IDs
+        depth: Include the cost to move the price 2% up and down
+        
+    Yields:
+        Ticker records
+    """
+    async for ticker in coingecko.iter_coin_tickers(coin_id, exchange_ids=exchange_ids, depth=depth):
+        record = normalize_ticker(ticker)
+        if record is not None:
+            yield record
 
 
-def filter_best_tickers(tickers: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+def _keep_best(best: Dict[str, TickerRecord], record: TickerRecord) -> None:
+    """
+    Keep a ticker record if it has the highest volume seen so far for its exchange.
     """
-    Filter tickers to keep only the highest volume ticker for each exchange.
+    current = best.get(record.name)
+    if current is None or record.volume > current.volume:
+        best[record.name] = record
+
+
+def filter_best_tickers(tickers: Iterable[Dict[str, Any]]) -> Dict[str, TickerRecord]:
+    """
+    Normalize tickers, keeping only the highest volume ticker for each exchange.
+    
+    The scan only reads exchange names and volumes; records are built once,
+    for the winning ticker of each exchange.
     
     Args:
-        tickers: List of ticker data
+        tickers: Ticker data from CoinGecko API
         
     Returns:
-        Dictionary of exchange data keyed by exchange name
+        Dictionary of ticker records keyed by exchange name
     """
-    exchange_data = {}
-    
+    winners: Dict[str, Tuple[float, Dict[str, Any], Dict[str, Any]]] = {}
     for ticker in tickers:
-        ticker_data = extract_ticker_data(ticker)
-        if not ticker_data:
+        market = ticker.get("market")
+        name = market.get("name") if market else None
+        if not name:
             continue
-            
-        exchange_name = ticker_data["name"]
-        volume = ticker_data["volume"]
-        
-        # If we've seen this exchange before, only keep the highest volume entry
-        if exchange_name in exchange_data and volume <= exchange_data[exchange_name]["volume"]:
-            continue
-        
-        # Store this exchange data
-        exchange_data[exchange_name] = ticker_data
+        converted_volume = ticker.get("converted_volume")
+        volume = converted_volume.get("usd", 0) if converted_volume else 0
+        current = winners.get(name)
+        if current is None or volume > current[0]:
+            winners[name] = (volume, ticker, market)
+    return {
+        name: _build_record(ticker, market, name, volume)
+        for name, (volume, ticker, market) in winners.items()
+    }
+
+
+async def afilter_best_tickers(tickers: AsyncIterable[TickerRecord]) -> Dict[str, TickerRecord]:
+    """
+    Keep only the highest volume ticker for each exchange from a stream of
+    ticker records, such as iter_coin_tickers().
     
-    return exchange_data 
\ No newline at end of file
+    Args:
+        tickers: Async iterable of ticker records
+        
+    Returns:
+        Dictionary of ticker records keyed by exchange name
+    """
+    best: Dict[str, TickerRecord] = {}
+    async for record in tickers:
+        _keep_best(best, record)
+    return best
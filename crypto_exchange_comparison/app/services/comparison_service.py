@@ -1,13 +1,15 @@
 """
 Service for handling exchange comparison business logic.
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models import models, schemas
-from app.services import coingecko
-from app.services.db import coin_service, exchange_service, price_service
+from app.services import cache, coingecko, singleflight
+from app.services.db import aio, coin_service, exchange_service, price_service
+from app.services.coingecko_processor import TickerRecord
 from app.services.exchange_analyzer import calculate_spread, process_ticker_data, build_comparison_result
 
 
@@ -27,18 +29,18 @@ async def get_or_create_coin(coin_id: str, db: Session) -> models.Coin:
     if coin:
         return coin
         
-    # Fetch from API and create
-    coin_data = await coingecko.get_coin_price(coin_id)
-    return coin_service.create(db, {
+    coin = coin_service.create(db, {
         "coingecko_id": coin_id,
         "symbol": coin_id.upper(),
         "name": coin_id.capitalize()
     })
+    await cache.ainvalidate_tags([cache.COIN_LIST_TAG])
+    return coin
 
 
 async def update_exchange_prices(
     coin: models.Coin,
-    exchange_data: Dict[str, Dict[str, Any]],
+    exchange_data: Dict[str, TickerRecord],
     db: Session
 ) -> List[schemas.ExchangePrice]:
     """
@@ -46,44 +48,50 @@ async def update_exchange_prices(
     
     Args:
         coin: Coin model
-        exchange_data: Dictionary of processed exchange data
+        exchange_data: Ticker records keyed by exchange name
         db: Database session
         
     Returns:
         List of exchange price DTOs
     """
-    exchange_prices = []
+    # Create any exchanges we have not seen yet, then look up all IDs
+    _, created_exchanges = exchange_service.bulk_sync(db, [
+        {"name": exchange_name, "coingecko_id": record.coingecko_exchange_id, "website": record.coingecko_exchange_id}
+        for exchange_name, record in exchange_data.items()
+    ], update_existing=False, commit=False)
+    exchange_ids = exchange_service.resolve_ids(db, {
+        exchange_name: record.coingecko_exchange_id for exchange_name, record in exchange_data.items()
+    })
     
-    for exchange_name, data in exchange_data.items():
-        # Get or create exchange
-        exchange = exchange_service.get_by_name(db, exchange_name)
-        if not exchange:
-            exchange = exchange_service.create(db, {
-                "name": exchange_name,
-                "website": data["ticker"].get("market", {}).get("identifier")
-            })
-        
-        # Calculate spread
-        bid_price = data["bid"]
-        ask_price = data["ask"]
-        spread = calculate_spread(bid_price, ask_price)
-        
-        # Update or create price record
-        price = price_service.update_or_create(
-            db,
-            {"exchange_id": exchange.id, "coin_id": coin.id},
-            {
-                "price_usd": data["price"],
-                "volume_24h": data["volume"],
-                "bid_price": bid_price,
-                "ask_price": ask_price,
-                "last_updated": datetime.now(timezone.utc)
-            }
-        )
+    rows = []
+    now = datetime.now(timezone.utc)
+    
+    for exchange_name, record in exchange_data.items():
+        rows.append({
+            "exchange_id": exchange_ids[exchange_name],
+            "coin_id": coin.id,
+            "price_usd": record.price,
+            "volume_24h": record.volume,
+            "bid_price": record.bid,
+            "ask_price": record.ask,
+            "last_updated": now
+        })
+    
+    # Write all prices in the same transaction, then read them back (with fees) in one query
+    price_service.bulk_upsert(db, rows)
+    tags = cache.price_tags(coin.coingecko_id, exchange_ids.values())
+    if created_exchanges:
+        tags.append(cache.EXCHANGE_LIST_TAG)
+    await cache.ainvalidate_tags(tags)
+    prices = price_service.get_for_coin_by_exchanges(db, coin.id, list(exchange_ids.values()))
+    
+    exchange_prices = []
+    for exchange_name, record in exchange_data.items():
+        price = prices[exchange_ids[exchange_name]]
         
         # Create exchange price DTO
         exchange_price = schemas.ExchangePrice(
-            exchange_name=exchange.name,
+            exchange_name=exchange_name,
             price_usd=price.price_usd,
             volume_24h=price.volume_24h,
             bid_price=price.bid_price,
@@ -91,7 +99,7 @@ async def update_exchange_prices(
             trading_fee=price.trading_fee,
             withdrawal_fee=price.withdrawal_fee,
             last_updated=price.last_updated,
-            spread=spread
+            spread=calculate_spread(record.bid, record.ask)
         )
         exchange_prices.append(exchange_price)
     
@@ -100,7 +108,8 @@ async def update_exchange_prices(
 
 async def compare_exchanges_for_coin(
     coin_id: str,
-    db: Session
+    db: Session,
+    amount: Optional[float] = None
 ) -> schemas.ComparisonResult:
     """
     Compare exchanges for a specific coin.
@@ -108,21 +117,110 @@ async def compare_exchanges_for_coin(
     Args:
         coin_id: Coingecko ID of the coin
         db: Database session
+        amount: Order size in USD to rank exchanges for
         
     Returns:
         Comparison result with price data
     """
-    # Get or create coin
-    coin = await get_or_create_coin(coin_id, db)
+    async def compare():
+        # Get or create coin
+        coin = await get_or_create_coin(coin_id, db)
+        
+        # Get ticker data from Coingecko
+        ticker_data = await coingecko.get_coin_tickers(coin_id)
+        
+        # Process exchange data
+        exchange_data = process_ticker_data(ticker_data)
+        
+        # Update database and build price list
+        exchange_prices = await update_exchange_prices(coin, exchange_data, db)
+        
+        # Build final result
+        return build_comparison_result(coin.name, exchange_prices, amount).model_dump()
     
-    # Get ticker data from Coingecko
-    ticker_data = await coingecko.get_coin_tickers(coin_id)
+    # Concurrent requests for the same coin and amount share one upstream fetch and one DB write
+    result = await singleflight.coalesce(compare_cache_key(coin_id, amount), compare)
+    return schemas.ComparisonResult.model_validate(result) 
+
+
+def compare_cache_key(coin_id: str, amount: Optional[float] = None) -> str:
+    """
+    Cache key of the comparison result for a coin and order amount.
+    """
+    return f"compare:{coin_id}:{amount if amount else 'default'}"
+
+
+def build_from_snapshot(rows: List[Any], amount: Optional[float] = None) -> Optional[schemas.ComparisonResult]:
+    """
+    Build a comparison result from snapshot rows (see aio.price_service.get_snapshot_for_coin).
     
-    # Process exchange data
-    exchange_data = process_ticker_data(ticker_data)
+    Args:
+        rows: Snapshot rows of one coin
+        amount: Order size in USD to rank exchanges for
+        
+    Returns:
+        Comparison result, or None if there are no prices
+    """
+    exchange_prices = [
+        schemas.ExchangePrice(
+            exchange_name=row.exchange_name,
+            price_usd=row.price_usd,
+            volume_24h=row.volume_24h,
+            bid_price=row.bid_price,
+            ask_price=row.ask_price,
+            trading_fee=row.trading_fee,
+            withdrawal_fee=row.withdrawal_fee,
+            last_updated=row.last_updated,
+            spread=calculate_spread(row.bid_price, row.ask_price)
+        )
+        for row in rows
+        if row.exchange_name is not None
+    ]
+    if not exchange_prices:
+        return None
+    return build_comparison_result(rows[0].coin_name, exchange_prices, amount)
+
+
+async def compare_from_snapshot(
+    coin_id: str,
+    db: AsyncSession,
+    amount: Optional[float] = None
+) -> Optional[schemas.ComparisonResult]:
+    """
+    Compare exchanges for a coin from its stored prices only.
     
-    # Update database and build price list
-    exchange_prices = await update_exchange_prices(coin, exchange_data, db)
+    Read-only: nothing is fetched from CoinGecko or written, so latency is
+    bounded by one database query. Keeping the prices fresh is left to the
+    scheduled price updates.
     
-    # Build final result
-    return build_comparison_result(coin.name, exchange_prices) 
\ No newline at end of file
+    Args:
+        coin_id: Coingecko ID of the coin
+        db: Async database session
+        amount: Order size in USD to rank exchanges for
+        
+    Returns:
+        Comparison result, or None if the coin is not stored or has no prices yet
+    """
+    return build_from_snapshot(await aio.price_service.get_snapshot_for_coin(db, coin_id), amount)
+
+
+async def compare_many_from_snapshot(
+    coin_ids: List[str],
+    db: AsyncSession
+) -> Dict[str, schemas.ComparisonResult]:
+    """
+    Compare exchanges for several coins from their stored prices, in one query.
+    
+    Args:
+        coin_ids: Coingecko IDs of the coins
+        db: Async database session
+        
+    Returns:
+        Comparison results keyed by Coingecko ID, for the coins that have stored prices
+    """
+    results = {}
+    for coin_id, rows in (await aio.price_service.get_snapshots_for_coins(db, coin_ids)).items():
+        result = build_from_snapshot(rows)
+        if result is not None:
+            results[coin_id] = result
+    return results
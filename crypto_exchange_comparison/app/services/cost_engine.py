@@ -0,0 +1,113 @@
+"""
+Order-size-aware cost model for buying a coin on each exchange.
+
+The expected cost per coin of a market buy of `amount` USD on an exchange is
+
+    fill = ask * (1 + SLIPPAGE_IMPACT * sqrt(amount / volume_24h))
+    cost = fill * (1 + trading_fee / 100 + withdrawal_fee / amount)
+
+The fill price starts at the ask (the last price if there is no ask) and
+moves with the square root of the order's share of the daily volume, the
+usual market impact model. The trading fee is a percentage of the order
+and the withdrawal fee a flat USD amount spread over it.
+
+All exchanges and order sizes are evaluated at once as NumPy arrays, so
+ranking exchanges for several order sizes costs about the same as for one.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config.settings import settings
+from app.models import schemas
+
+
+def price_arrays(exchange_prices: Sequence[schemas.ExchangePrice]) -> Tuple[np.ndarray, ...]:
+    """
+    Columns of the cost model inputs, one element per exchange.
+
+    Missing fees count as zero and a missing volume as zero volume.
+
+    Args:
+        exchange_prices: List of exchange price DTOs
+
+    Returns:
+        Tuple of (asks, volumes, trading_fees, withdrawal_fees) float arrays
+    """
+    asks = np.fromiter(
+        (price.ask_price or price.price_usd for price in exchange_prices), float, len(exchange_prices)
+    )
+    volumes = np.fromiter((price.volume_24h or 0 for price in exchange_prices), float, len(exchange_prices))
+    trading_fees = np.fromiter((price.trading_fee or 0 for price in exchange_prices), float, len(exchange_prices))
+    withdrawal_fees = np.fromiter(
+        (price.withdrawal_fee or 0 for price in exchange_prices), float, len(exchange_prices)
+    )
+    return asks, volumes, trading_fees, withdrawal_fees
+
+
+def effective_prices(
+    asks: np.ndarray,
+    volumes: np.ndarray,
+    trading_fees: np.ndarray,
+    withdrawal_fees: np.ndarray,
+    amounts: np.ndarray
+) -> np.ndarray:
+    """
+    Expected cost per coin for every order size on every exchange.
+
+    Args:
+        asks: Ask price of each exchange
+        volumes: 24h USD volume of each exchange
+        trading_fees: Trading fee of each exchange, as a percentage
+        withdrawal_fees: Withdrawal fee of each exchange, in USD
+        amounts: Order sizes in USD
+
+    Returns:
+        Array of shape (len(amounts), len(asks)); exchanges without volume
+        cannot absorb an order and exchanges without a price cannot quote
+        one, so both cost inf
+    """
+    amounts = np.asarray(amounts, dtype=float)[:, np.newaxis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        impact = settings.SLIPPAGE_IMPACT * np.sqrt(amounts / volumes)
+        costs = asks * (1 + impact) * (1 + trading_fees / 100 + withdrawal_fees / amounts)
+    costs[:, (volumes <= 0) | ~(asks > 0)] = np.inf
+    return costs
+
+
+def rank_by_amount(
+    exchange_prices: List[schemas.ExchangePrice],
+    amount: float
+) -> Tuple[List[schemas.ExchangePrice], Optional[schemas.ExchangePrice], List[schemas.OrderSizeQuote]]:
+    """
+    Price exchanges for an order size, and find the cheapest one for each order size bucket.
+
+    Args:
+        exchange_prices: List of exchange price DTOs
+        amount: Order size in USD
+
+    Returns:
+        Tuple of (exchange prices with effective_price set, cheapest exchange
+        for the amount or None if no exchange has volume, one quote per
+        ORDER_SIZE_BUCKETS_USD bucket that some exchange can fill)
+    """
+    amounts = np.array([amount, *settings.ORDER_SIZE_BUCKETS_USD], dtype=float)
+    costs = effective_prices(*price_arrays(exchange_prices), amounts)
+    best = np.argmin(costs, axis=1)
+    best_costs = costs[np.arange(len(amounts)), best]
+
+    priced = [
+        price.model_copy(update={"effective_price": float(cost) if np.isfinite(cost) else None})
+        for price, cost in zip(exchange_prices, costs[0])
+    ]
+    best_for_amount = priced[best[0]] if np.isfinite(best_costs[0]) else None
+    quotes = [
+        schemas.OrderSizeQuote(
+            amount_usd=float(bucket),
+            exchange_name=exchange_prices[index].exchange_name,
+            effective_price=float(cost),
+        )
+        for bucket, index, cost in zip(amounts[1:], best[1:], best_costs[1:])
+        if np.isfinite(cost)
+    ]
+    return priced, best_for_amount, quotes
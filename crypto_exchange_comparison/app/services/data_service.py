@@ -4,18 +4,39 @@ Service for handling data updates from external sources.
 import logging
 import asyncio
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Awaitable, Dict, Any, List, Tuple, Optional
 
 from sqlalchemy.orm import Session
 
+from app.config.settings import settings
 from app.models import models
 from app.services.db import coin_service, exchange_service, price_service
-from app.services import coingecko_processor
+from app.services import cache, coingecko_processor
 
 # Configure logging
 logger = logging.getLogger("data_service")
 
 
+def coin_row(coin_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Coin attributes, including market data, from a CoinGecko /coins/markets entry.
+    
+    Args:
+        coin_data: Coin market data from CoinGecko API
+        
+    Returns:
+        Dictionary of coin attributes for coin_service.bulk_sync
+    """
+    return {
+        "coingecko_id": coin_data["id"],
+        "symbol": coin_data["symbol"].upper(),
+        "name": coin_data["name"],
+        "market_cap_rank": coin_data.get("market_cap_rank"),
+        "market_cap": coin_data.get("market_cap"),
+        "current_price": coin_data.get("current_price")
+    }
+
+
 async def update_coins(db: Session) -> Tuple[int, int]:
     """
     Update coin data from CoinGecko API.
@@ -29,32 +50,19 @@ async def update_coins(db: Session) -> Tuple[int, int]:
     logger.info("Starting coin data update")
     
     try:
-        # Fetch top coins from CoinGecko API
+        # Fetch the top coins by market cap, with their market data
         top_coins = await coingecko_processor.fetch_top_coins()
         
-        updated_count = 0
-        created_count = 0
-        
-        for coin_data in top_coins:
-            # Check if coin exists
-            db_coin = coin_service.get_by_coingecko_id(db, coin_data["id"])
-            
-            if db_coin:
-                # Update existing coin
-                coin_service.update(db, db_coin.id, {
-                    "symbol": coin_data["symbol"].upper(),
-                    "name": coin_data["name"],
-                    "updated_at": datetime.now(timezone.utc)
-                })
-                updated_count += 1
-            else:
-                # Create new coin
-                coin_service.create(db, {
-                    "coingecko_id": coin_data["id"],
-                    "symbol": coin_data["symbol"].upper(),
-                    "name": coin_data["name"]
-                })
-                created_count += 1
+        # Diff against the stored coins and write only new or changed rows
+        updated_count, created = coin_service.bulk_sync(
+            db, [coin_row(coin_data) for coin_data in top_coins], commit=False
+        )
+        # Coins that fell out of the ranking would otherwise keep their old rank
+        unranked_count = coin_service.clear_market_ranks(db, [coin_data["id"] for coin_data in top_coins], commit=False)
+        db.commit()
+        created_count = len(created)
+        if updated_count or created_count or unranked_count:
+            await cache.ainvalidate_tags([cache.COIN_LIST_TAG])
         
         logger.info(f"Coin update completed: {updated_count} updated, {created_count} created")
         return updated_count, created_count
@@ -80,29 +88,19 @@ async def update_exchanges(db: Session) -> Tuple[int, int]:
         # Fetch exchanges from CoinGecko API
         top_exchanges = await coingecko_processor.fetch_top_exchanges()
         
-        updated_count = 0
-        created_count = 0
-        
-        for exchange_data in top_exchanges:
-            # Check if exchange exists
-            db_exchange = exchange_service.get_by_name(db, exchange_data["name"])
-            
-            if db_exchange:
-                # Update existing exchange
-                exchange_service.update(db, db_exchange.id, {
-                    "website": exchange_data.get("url"),
-                    "logo_url": exchange_data.get("image"),
-                    "updated_at": datetime.now(timezone.utc)
-                })
-                updated_count += 1
-            else:
-                # Create new exchange
-                exchange_service.create(db, {
-                    "name": exchange_data["name"],
-                    "website": exchange_data.get("url"),
-                    "logo_url": exchange_data.get("image")
-                })
-                created_count += 1
+        # Diff against the stored exchanges and write only new or changed rows
+        updated_count, created = exchange_service.bulk_sync(db, [
+            {
+                "name": exchange_data["name"],
+                "coingecko_id": exchange_data.get("id"),
+                "website": exchange_data.get("url"),
+                "logo_url": exchange_data.get("image")
+            }
+            for exchange_data in top_exchanges
+        ])
+        created_count = len(created)
+        if updated_count or created_count:
+            await cache.ainvalidate_tags([cache.EXCHANGE_LIST_TAG])
         
         logger.info(f"Exchange update completed: {updated_count} updated, {created_count} created")
         return updated_count, created_count
@@ -112,6 +110,79 @@ async def update_exchanges(db: Session) -> Tuple[int, int]:
         raise
 
 
+async def fetch_exchange_data_for_coin(
+    coingecko_id: str,
+    exchange_ids: Optional[List[str]] = None
+) -> Dict[str, coingecko_processor.TickerRecord]:
+    """
+    Fetch ticker data for a coin across all ticker pages and keep the best
+    ticker per exchange.
+    
+    Only talks to the upstream API, never to the database, so it is safe to
+    run for many coins at once.
+    
+    Args:
+        coingecko_id: CoinGecko ID of the coin
+        exchange_ids: Only fetch tickers from these CoinGecko exchange IDs
+        
+    Returns:
+        Dictionary of ticker records keyed by exchange name
+    """
+    # Process exchanges as pages arrive, keeping only highest volume ticker per exchange
+    return await coingecko_processor.afilter_best_tickers(
+        coingecko_processor.iter_coin_tickers(coingecko_id, exchange_ids=exchange_ids)
+    )
+
+
+async def write_prices_for_coin(
+    coin_id: int,
+    coingecko_id: str,
+    exchange_data: Dict[str, coingecko_processor.TickerRecord],
+    db: Session
+) -> int:
+    """
+    Write the fetched exchange prices for a coin to the database and drop
+    the cached views derived from them.
+    
+    Args:
+        coin_id: Database ID of the coin
+        coingecko_id: CoinGecko ID of the coin, which cached views are keyed by
+        exchange_data: Ticker records keyed by exchange name
+        db: Database session
+        
+    Returns:
+        Number of price records updated
+    """
+    rows = []
+    now = datetime.now(timezone.utc)
+    
+    # Look up all tracked exchanges, by CoinGecko ID first
+    exchange_ids = exchange_service.resolve_ids(db, {
+        exchange_name: record.coingecko_exchange_id for exchange_name, record in exchange_data.items()
+    })
+    
+    # Process the filtered exchanges (one per exchange name)
+    for exchange_name, record in exchange_data.items():
+        exchange_id = exchange_ids.get(exchange_name)
+        if exchange_id is None:
+            continue
+        
+        rows.append({
+            "exchange_id": exchange_id,
+            "coin_id": coin_id,
+            "price_usd": record.price,
+            "volume_24h": record.volume,
+            "bid_price": record.bid,
+            "ask_price": record.ask,
+            "last_updated": now
+        })
+    
+    # Write all of the coin's prices in one statement and one transaction
+    written = price_service.bulk_upsert(db, rows)
+    await cache.ainvalidate_tags(cache.price_tags(coingecko_id, [row["exchange_id"] for row in rows]))
+    return written
+
+
 async def update_price_for_coin(
     coin: models.Coin,
     db: Session
@@ -126,67 +197,87 @@ async def update_price_for_coin(
     Returns:
         Number of price records updated
     """
-    update_count = 0
-    
     try:
-        # Fetch ticker data for the coin
-        ticker_data = await coingecko_processor.fetch_coin_tickers(coin.coingecko_id)
-        
-        # Process exchanges, keeping only highest volume ticker per exchange
-        exchange_data = coingecko_processor.filter_best_tickers(ticker_data.get("tickers", []))
-        
-        # Process the filtered exchanges (one per exchange name)
-        for exchange_name, data in exchange_data.items():
-            # Find exchange
-            exchange = exchange_service.get_by_name(db, exchange_name)
-            if not exchange:
-                continue
-            
-            # Update or create price record
-            price_service.update_or_create(
-                db,
-                {"exchange_id": exchange.id, "coin_id": coin.id},
-                {
-                    "price_usd": data["price"],
-                    "volume_24h": data["volume"],
-                    "bid_price": data["bid"],
-                    "ask_price": data["ask"],
-                    "last_updated": datetime.now(timezone.utc)
-                }
-            )
-            
-            update_count += 1
-        
+        exchange_ids = exchange_service.get_ticker_filter(db)
+        exchange_data = await fetch_exchange_data_for_coin(coin.coingecko_id, exchange_ids)
+        return await write_prices_for_coin(coin.id, coin.coingecko_id, exchange_data, db)
     except Exception as e:
         logger.error(f"Error updating prices for {coin.name}: {str(e)}")
-    
-    return update_count
+        return 0
 
 
-async def update_prices(db: Session) -> int:
+async def update_prices(db: Session, concurrency: Optional[int] = None) -> int:
     """
     Update price data for all coins.
     
+    Tickers are fetched for up to `concurrency` coins at once; pacing against
+    the upstream budget is left to the CoinGecko rate limiter. Fetched data is
+    handed to a single writer coroutine so the shared session is never used
+    by two coroutines at the same time.
+    
     Args:
         db: Database session
+        concurrency: Maximum number of coins fetched at the same time
+            (defaults to settings.PRICE_UPDATE_CONCURRENCY)
         
     Returns:
         Number of price records updated
     """
     logger.info("Starting price data update")
+    concurrency = max(1, concurrency or settings.PRICE_UPDATE_CONCURRENCY)
     
     try:
-        # Get all coins from database
-        coins = coin_service.get_all(db)
+        # Get all coins from database, detached from the session so fetchers
+        # never trigger lazy loads while the writer is committing
+        coins = [(coin.id, coin.coingecko_id, coin.name) for coin in coin_service.get_all(db)]
+        # Prices are only written for stored exchanges, so only fetch their tickers
+        exchange_ids = exchange_service.get_ticker_filter(db)
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        
+        async def fetch(coin_id: int, coingecko_id: str, name: str) -> None:
+            async with semaphore:
+                try:
+                    exchange_data = await fetch_exchange_data_for_coin(coingecko_id, exchange_ids)
+                except Exception as e:
+                    logger.error(f"Error fetching prices for {name}: {str(e)}")
+                    return
+            await queue.put((coin_id, coingecko_id, name, exchange_data))
+        
+        async def writer() -> int:
+            written = 0
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return written
+                coin_id, coingecko_id, name, exchange_data = item
+                try:
+                    written += await write_prices_for_coin(coin_id, coingecko_id, exchange_data, db)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Error writing prices for {name}: {str(e)}")
+        
+        writer_task = asyncio.create_task(writer())
         
-        update_count = 0
+        async def alongside_writer(awaitable: Awaitable[Any]) -> None:
+            # The writer only returns once it reads the final None, so if it
+            # finishes first it failed and nothing drains the queue any more
+            task = asyncio.ensure_future(awaitable)
+            try:
+                await asyncio.wait({task, writer_task}, return_when=asyncio.FIRST_COMPLETED)
+                if not task.done():
+                    await writer_task
+                await task
+            finally:
+                task.cancel()
         
-        for coin in coins:
-            coin_updates = await update_price_for_coin(coin, db)
-            update_count += coin_updates
-            
-            # Avoid rate limiting
-            await asyncio.sleep(1)
+        try:
+            await alongside_writer(asyncio.gather(*(fetch(*coin) for coin in coins)))
+            await alongside_writer(queue.put(None))
+            update_count = await writer_task
+        finally:
+            writer_task.cancel()
         
         logger.info(f"Price update completed: {update_count} prices updated")
         return update_count
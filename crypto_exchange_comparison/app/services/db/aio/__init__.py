@@ -0,0 +1,5 @@
+"""
+Async versions of the database services, for use with an AsyncSession on the request path.
+"""
+# Import services to make them available from the module
+from app.services.db.aio import coin_service, exchange_service, price_service
@@ -0,0 +1,148 @@
+"""
+Async service for Coin-related database operations.
+"""
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import models
+from app.services.db.search import contains, starts_with
+from typing import Dict, Any, Optional, List, Set
+
+
+async def get_by_coingecko_id(db: AsyncSession, coingecko_id: str) -> Optional[models.Coin]:
+    """
+    Get a coin by its Coingecko ID.
+    
+    Args:
+        db: Async database session
+        coingecko_id: Coingecko identifier for the coin
+        
+    Returns:
+        Coin model if found, None otherwise
+    """
+    return await db.scalar(select(models.Coin).where(models.Coin.coingecko_id == coingecko_id))
+
+
+async def get_by_id(db: AsyncSession, coin_id: int) -> Optional[models.Coin]:
+    """
+    Get a coin by its database ID.
+    
+    Args:
+        db: Async database session
+        coin_id: Database ID of the coin
+        
+    Returns:
+        Coin model if found, None otherwise
+    """
+    return await db.get(models.Coin, coin_id)
+
+
+async def get_all(
+    db: AsyncSession,
+    limit: int = 100,
+    offset: int = 0,
+    query: Optional[str] = None
+) -> List[models.Coin]:
+    """
+    Get all coins with pagination, optionally only those matching a search.
+    
+    Coins are ordered by market cap rank, unranked coins last by name. With a
+    query, matches are coins whose name or symbol contains it (case-insensitive),
+    with exact symbol matches first, then name prefix matches, then the rest.
+    
+    Args:
+        db: Async database session
+        limit: Maximum number of records to return
+        offset: Number of records to skip
+        query: Text to search names and symbols for
+        
+    Returns:
+        List of coin models
+    """
+    statement = select(models.Coin)
+    if query:
+        statement = statement.where(
+            contains(models.Coin.name, query) | contains(models.Coin.symbol, query)
+        ).order_by(case(
+            (func.lower(models.Coin.symbol) == query.lower(), 0),
+            (starts_with(models.Coin.name, query), 1),
+            else_=2
+        ))
+    result = await db.scalars(statement.order_by(*models.COIN_LISTING_ORDER).offset(offset).limit(limit))
+    return list(result)
+
+
+async def get_by_ids(db: AsyncSession, coin_ids: List[int]) -> Dict[int, models.Coin]:
+    """
+    Get several coins by database ID in one query.
+    
+    Args:
+        db: Async database session
+        coin_ids: Database IDs of the coins
+        
+    Returns:
+        Dictionary of coin models keyed by ID, for the coins that exist
+    """
+    if not coin_ids:
+        return {}
+    result = await db.scalars(select(models.Coin).where(models.Coin.id.in_(coin_ids)))
+    return {coin.id: coin for coin in result}
+
+
+async def get_coingecko_ids(db: AsyncSession) -> Set[str]:
+    """
+    Get the Coingecko IDs of all stored coins.
+    
+    Args:
+        db: Async database session
+        
+    Returns:
+        Set of Coingecko IDs
+    """
+    result = await db.scalars(select(models.Coin.coingecko_id))
+    return set(result)
+
+
+async def create(db: AsyncSession, coin_data: Dict[str, Any]) -> models.Coin:
+    """
+    Create a new coin record.
+    
+    Args:
+        db: Async database session
+        coin_data: Dictionary containing coin attributes
+        
+    Returns:
+        Newly created coin model
+    """
+    coin = models.Coin(
+        coingecko_id=coin_data["coingecko_id"],
+        symbol=coin_data["symbol"],
+        name=coin_data["name"]
+    )
+    db.add(coin)
+    await db.commit()
+    await db.refresh(coin)
+    return coin
+
+
+async def update(db: AsyncSession, coin_id: int, coin_data: Dict[str, Any]) -> Optional[models.Coin]:
+    """
+    Update an existing coin record.
+    
+    Args:
+        db: Async database session
+        coin_id: ID of the coin to update
+        coin_data: Dictionary containing coin attributes to update
+        
+    Returns:
+        Updated coin model if found, None otherwise
+    """
+    coin = await get_by_id(db, coin_id)
+    if not coin:
+        return None
+        
+    for key, value in coin_data.items():
+        setattr(coin, key, value)
+        
+    await db.commit()
+    await db.refresh(coin)
+    return coin
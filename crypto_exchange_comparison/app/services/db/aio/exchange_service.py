@@ -0,0 +1,169 @@
+"""
+Async service for Exchange-related database operations.
+"""
+from sqlalchemy import case, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import models
+from app.services.db.search import contains, starts_with
+from typing import Dict, Any, Optional, List
+
+
+async def get_by_name(db: AsyncSession, name: str) -> Optional[models.Exchange]:
+    """
+    Get an exchange by its name.
+    
+    Args:
+        db: Async database session
+        name: Name of the exchange
+        
+    Returns:
+        Exchange model if found, None otherwise
+    """
+    return await db.scalar(select(models.Exchange).where(models.Exchange.name == name))
+
+
+async def get_by_id(db: AsyncSession, exchange_id: int) -> Optional[models.Exchange]:
+    """
+    Get an exchange by its database ID.
+    
+    Args:
+        db: Async database session
+        exchange_id: Database ID of the exchange
+        
+    Returns:
+        Exchange model if found, None otherwise
+    """
+    return await db.get(models.Exchange, exchange_id)
+
+
+async def get_ids_by_names(db: AsyncSession, names: List[str]) -> Dict[str, int]:
+    """
+    Get the database IDs of several exchanges by name in one query.
+    
+    Args:
+        db: Async database session
+        names: Names of the exchanges
+        
+    Returns:
+        Dictionary of exchange IDs keyed by name, for the exchanges that exist
+    """
+    if not names:
+        return {}
+    result = await db.execute(
+        select(models.Exchange.id, models.Exchange.name).where(models.Exchange.name.in_(names))
+    )
+    return {row.name: row.id for row in result}
+
+
+async def get_names_by_ids(db: AsyncSession, exchange_ids: List[int]) -> Dict[int, str]:
+    """
+    Get the names of several exchanges by database ID in one query.
+    
+    Args:
+        db: Async database session
+        exchange_ids: Database IDs of the exchanges
+        
+    Returns:
+        Dictionary of exchange names keyed by ID, for the exchanges that exist
+    """
+    if not exchange_ids:
+        return {}
+    result = await db.execute(
+        select(models.Exchange.id, models.Exchange.name).where(models.Exchange.id.in_(exchange_ids))
+    )
+    return {row.id: row.name for row in result}
+
+
+async def get_all(
+    db: AsyncSession,
+    limit: int = 100,
+    offset: int = 0,
+    query: Optional[str] = None
+) -> List[models.Exchange]:
+    """
+    Get all exchanges with pagination, optionally only those matching a search.
+    
+    Matches are exchanges whose name contains the query (case-insensitive),
+    with name prefix matches first, then the rest by name.
+    
+    Args:
+        db: Async database session
+        limit: Maximum number of records to return
+        offset: Number of records to skip
+        query: Text to search names for
+        
+    Returns:
+        List of exchange models
+    """
+    statement = select(models.Exchange)
+    if query:
+        statement = statement.where(contains(models.Exchange.name, query)).order_by(
+            case((starts_with(models.Exchange.name, query), 0), else_=1)
+        )
+    result = await db.scalars(statement.order_by(models.Exchange.name).offset(offset).limit(limit))
+    return list(result)
+
+
+async def get_coins(db: AsyncSession, exchange_id: int) -> List[models.Coin]:
+    """
+    Get all coins that have a price record on an exchange.
+    
+    Args:
+        db: Async database session
+        exchange_id: ID of the exchange
+        
+    Returns:
+        List of coin models
+    """
+    result = await db.scalars(
+        select(models.Coin)
+        .join(models.Price, models.Price.coin_id == models.Coin.id)
+        .where(models.Price.exchange_id == exchange_id)
+    )
+    return list(result)
+
+
+async def create(db: AsyncSession, exchange_data: Dict[str, Any]) -> models.Exchange:
+    """
+    Create a new exchange record.
+    
+    Args:
+        db: Async database session
+        exchange_data: Dictionary containing exchange attributes
+        
+    Returns:
+        Newly created exchange model
+    """
+    exchange = models.Exchange(
+        name=exchange_data["name"],
+        website=exchange_data.get("website"),
+        logo_url=exchange_data.get("logo_url")
+    )
+    db.add(exchange)
+    await db.commit()
+    await db.refresh(exchange)
+    return exchange
+
+
+async def update(db: AsyncSession, exchange_id: int, exchange_data: Dict[str, Any]) -> Optional[models.Exchange]:
+    """
+    Update an existing exchange record.
+    
+    Args:
+        db: Async database session
+        exchange_id: ID of the exchange to update
+        exchange_data: Dictionary containing exchange attributes to update
+        
+    Returns:
+        Updated exchange model if found, None otherwise
+    """
+    exchange = await get_by_id(db, exchange_id)
+    if not exchange:
+        return None
+        
+    for key, value in exchange_data.items():
+        setattr(exchange, key, value)
+        
+    await db.commit()
+    await db.refresh(exchange)
+    return exchange
@@ -0,0 +1,166 @@
+"""
+Async service for Price-related database operations.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import models
+from typing import Dict, Any, Optional, List
+
+
+# Columns of a compare snapshot row: coin and exchange names with the price
+SNAPSHOT_COLUMNS = (
+    models.Coin.name.label("coin_name"),
+    models.Exchange.name.label("exchange_name"),
+    models.Price.price_usd,
+    models.Price.volume_24h,
+    models.Price.bid_price,
+    models.Price.ask_price,
+    models.Price.trading_fee,
+    models.Price.withdrawal_fee,
+    models.Price.last_updated,
+)
+
+
+async def get_by_id(db: AsyncSession, price_id: int) -> Optional[models.Price]:
+    """
+    Get a price record by its database ID.
+    
+    Args:
+        db: Async database session
+        price_id: Database ID of the price record
+        
+    Returns:
+        Price model if found, None otherwise
+    """
+    return await db.get(models.Price, price_id)
+
+
+async def get_all_for_coin(
+    db: AsyncSession,
+    coin_id: int,
+    limit: int = 100,
+    offset: int = 0
+) -> List[models.Price]:
+    """
+    Get all price records for a specific coin with pagination.
+    
+    Args:
+        db: Async database session
+        coin_id: ID of the coin
+        limit: Maximum number of records to return
+        offset: Number of records to skip
+        
+    Returns:
+        List of price models
+    """
+    result = await db.scalars(
+        select(models.Price)
+        .where(models.Price.coin_id == coin_id)
+        .order_by(models.Price.price_usd)
+        .offset(offset)
+        .limit(limit)
+    )
+    return list(result)
+
+
+async def get_for_coin_by_exchanges(
+    db: AsyncSession,
+    coin_id: int,
+    exchange_ids: List[int]
+) -> Dict[int, models.Price]:
+    """
+    Get the price records of a coin on several exchanges in one query.
+    
+    Args:
+        db: Async database session
+        coin_id: ID of the coin
+        exchange_ids: IDs of the exchanges
+        
+    Returns:
+        Dictionary of price models keyed by exchange ID
+    """
+    if not exchange_ids:
+        return {}
+    result = await db.scalars(select(models.Price).where(
+        models.Price.coin_id == coin_id,
+        models.Price.exchange_id.in_(exchange_ids)
+    ))
+    return {price.exchange_id: price for price in result}
+
+
+async def get_snapshot_for_coin(db: AsyncSession, coingecko_id: str) -> List[Any]:
+    """
+    Get a coin's stored prices on every exchange, with the coin and exchange names, in one query.
+    
+    Args:
+        db: Async database session
+        coingecko_id: Coingecko ID of the coin
+        
+    Returns:
+        Rows with coin_name, exchange_name and the price columns; empty if the
+        coin is not stored, a single row with exchange_name None if it has no prices
+    """
+    result = await db.execute(
+        select(*SNAPSHOT_COLUMNS)
+        .select_from(models.Coin)
+        .outerjoin(models.Price, models.Price.coin_id == models.Coin.id)
+        .outerjoin(models.Exchange, models.Exchange.id == models.Price.exchange_id)
+        .where(models.Coin.coingecko_id == coingecko_id)
+    )
+    return list(result)
+
+
+async def get_snapshots_for_coins(db: AsyncSession, coingecko_ids: List[str]) -> Dict[str, List[Any]]:
+    """
+    Get the stored prices of several coins in one query (see get_snapshot_for_coin).
+    
+    Args:
+        db: Async database session
+        coingecko_ids: Coingecko IDs of the coins
+        
+    Returns:
+        Rows keyed by Coingecko ID, for the coins that are stored
+    """
+    if not coingecko_ids:
+        return {}
+    result = await db.execute(
+        select(models.Coin.coingecko_id, *SNAPSHOT_COLUMNS)
+        .select_from(models.Coin)
+        .outerjoin(models.Price, models.Price.coin_id == models.Coin.id)
+        .outerjoin(models.Exchange, models.Exchange.id == models.Price.exchange_id)
+        .where(models.Coin.coingecko_id.in_(coingecko_ids))
+    )
+    snapshots: Dict[str, List[Any]] = {}
+    for row in result:
+        snapshots.setdefault(row.coingecko_id, []).append(row)
+    return snapshots
+
+
+async def get_fees_by_exchange(db: AsyncSession, exchange_id: int) -> List[Dict[str, Any]]:
+    """
+    Get all fee information for a specific exchange.
+    
+    Args:
+        db: Async database session
+        exchange_id: ID of the exchange
+        
+    Returns:
+        List of dictionaries containing fee information
+    """
+    result = await db.execute(
+        select(models.Coin.symbol, models.Price.trading_fee, models.Price.withdrawal_fee)
+        .join(models.Coin, models.Price.coin_id == models.Coin.id)
+        .where(
+            models.Price.exchange_id == exchange_id,
+            models.Price.trading_fee.isnot(None)
+        )
+    )
+    
+    return [
+        {
+            "coin": row.symbol,
+            "trading_fee": row.trading_fee,
+            "withdrawal_fee": row.withdrawal_fee
+        }
+        for row in result
+    ]
@@ -0,0 +1,88 @@
+"""
+Set-based helpers for syncing many records in a few statements, and for
+committing writes without reloading them.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+
+def sync_by_key(
+    db: Session,
+    model: Any,
+    key: str,
+    rows: List[Dict[str, Any]],
+    update_existing: bool = True,
+    commit: bool = True
+) -> Tuple[int, List[Any]]:
+    """
+    Insert new records and update changed ones, matching rows on a unique key.
+
+    Existing records are loaded in one query and diffed in memory. New rows
+    are inserted in one batch and changed rows updated in one batch, all in
+    the same transaction. Unchanged rows are not written at all.
+
+    Args:
+        db: Database session
+        model: Model class to sync
+        key: Name of the unique column rows are matched on
+        rows: Dictionaries of column values; each must contain the key.
+            Later rows win when the same key appears twice.
+        update_existing: Whether to update records that already exist
+        commit: Whether to commit the transaction
+
+    Returns:
+        Tuple of (updated_count, newly created models)
+    """
+    rows_by_key = {row[key]: row for row in rows}
+    if not rows_by_key:
+        return 0, []
+
+    key_column = getattr(model, key)
+    fields = sorted({field for row in rows_by_key.values() for field in row if field != key})
+    existing = db.execute(
+        select(model.id, key_column, *[getattr(model, field) for field in fields])
+        .where(key_column.in_(list(rows_by_key)))
+    ).all()
+
+    now = datetime.now(timezone.utc)
+    changed = []
+    for record in existing:
+        row = rows_by_key.pop(getattr(record, key))
+        if not update_existing:
+            continue
+        changes = {field: row[field] for field in fields if field in row and row[field] != getattr(record, field)}
+        if changes:
+            changed.append({"id": record.id, **changes, "updated_at": now})
+
+    new_rows = list(rows_by_key.values())
+    if new_rows:
+        db.execute(insert(model), new_rows)
+    if changed:
+        # ORM bulk UPDATE by primary key, executed as one batch
+        db.execute(update(model), changed)
+
+    if commit:
+        db.commit()
+
+    created = []
+    if new_rows:
+        created = db.query(model).filter(key_column.in_([row[key] for row in new_rows])).all()
+    return len(changed), created
+
+
+def commit_keeping_loaded(db: Session) -> None:
+    """
+    Commit without expiring the session's objects, so records just written
+    can be returned without reloading them from the database.
+
+    Args:
+        db: Database session
+    """
+    expire_on_commit, db.expire_on_commit = db.expire_on_commit, False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
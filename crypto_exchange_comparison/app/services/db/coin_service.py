@@ -3,7 +3,8 @@ Service for Coin-related database operations.
 """
 from sqlalchemy.orm import Session
 from app.models import models
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+from app.services.db.bulk import commit_keeping_loaded, sync_by_key
 
 
 def get_by_coingecko_id(db: Session, coingecko_id: str) -> Optional[models.Coin]:
@@ -31,12 +32,13 @@ def get_by_id(db: Session, coin_id: int) -> Optional[models.Coin]:
     Returns:
         Coin model if found, None otherwise
     """
-    return db.query(models.Coin).filter(models.Coin.id == coin_id).first()
+    # Session.get answers from the identity map without a query when the row is already loaded
+    return db.get(models.Coin, coin_id)
 
 
 def get_all(db: Session, limit: int = 100, offset: int = 0) -> List[models.Coin]:
     """
-    Get all coins with pagination.
+    Get all coins with pagination, by market cap rank (unranked coins last, by name).
     
     Args:
         db: Database session
@@ -46,7 +48,7 @@ def get_all(db: Session, limit: int = 100, offset: int = 0) -> List[models.Coin]
     Returns:
         List of coin models
     """
-    return db.query(models.Coin).order_by(models.Coin.name).offset(offset).limit(limit).all()
+    return db.query(models.Coin).order_by(*models.COIN_LISTING_ORDER).offset(offset).limit(limit).all()
 
 
 def create(db: Session, coin_data: Dict[str, Any]) -> models.Coin:
@@ -90,6 +92,47 @@ def update(db: Session, coin_id: int, coin_data: Dict[str, Any]) -> Optional[mod
     for key, value in coin_data.items():
         setattr(coin, key, value)
         
-    db.commit()
-    db.refresh(coin)
-    return coin 
\ No newline at end of file
+    commit_keeping_loaded(db)
+    return coin
+
+
+def bulk_sync(
+    db: Session,
+    coins_data: List[Dict[str, Any]],
+    update_existing: bool = True,
+    commit: bool = True
+) -> Tuple[int, List[models.Coin]]:
+    """
+    Create and update many coins in one transaction, matched on coingecko_id.
+    
+    Args:
+        db: Database session
+        coins_data: Dictionaries containing coin attributes, each with a coingecko_id
+        update_existing: Whether to update coins that already exist
+        commit: Whether to commit the transaction
+        
+    Returns:
+        Tuple of (updated_count, newly created coin models)
+    """
+    return sync_by_key(db, models.Coin, "coingecko_id", coins_data, update_existing, commit)
+
+
+def clear_market_ranks(db: Session, ranked_coingecko_ids: List[str], commit: bool = True) -> int:
+    """
+    Clear the market cap rank of coins that dropped out of a freshly fetched ranking.
+    
+    Args:
+        db: Database session
+        ranked_coingecko_ids: Coingecko IDs of the coins in the new ranking
+        commit: Whether to commit the transaction
+        
+    Returns:
+        Number of coins whose rank was cleared
+    """
+    cleared = db.query(models.Coin).filter(
+        models.Coin.market_cap_rank.isnot(None),
+        models.Coin.coingecko_id.notin_(ranked_coingecko_ids)
+    ).update({models.Coin.market_cap_rank: None}, synchronize_session=False)
+    if commit:
+        db.commit()
+    return cleared
@@ -3,7 +3,8 @@ Service for Exchange-related database operations.
 """
 from sqlalchemy.orm import Session
 from app.models import models
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+from app.services.db.bulk import commit_keeping_loaded, sync_by_key
 
 
 def get_by_name(db: Session, name: str) -> Optional[models.Exchange]:
@@ -20,6 +21,50 @@ def get_by_name(db: Session, name: str) -> Optional[models.Exchange]:
     return db.query(models.Exchange).filter(models.Exchange.name == name).first()
 
 
+def get_ids_by_names(db: Session, names: List[str]) -> Dict[str, int]:
+    """
+    Get the database IDs of several exchanges by name in one query.
+    
+    Args:
+        db: Database session
+        names: Names of the exchanges
+        
+    Returns:
+        Dictionary of exchange IDs keyed by name, for the exchanges that exist
+    """
+    if not names:
+        return {}
+    rows = db.query(models.Exchange.id, models.Exchange.name).filter(models.Exchange.name.in_(names)).all()
+    return {row.name: row.id for row in rows}
+
+
+def resolve_ids(db: Session, exchanges: Dict[str, Optional[str]]) -> Dict[str, int]:
+    """
+    Get the database IDs of several exchanges, matched on CoinGecko ID first and on name otherwise.
+    
+    Ticker market names can differ from the names stored from the
+    /exchanges endpoint, while the CoinGecko ID is the same.
+    
+    Args:
+        db: Database session
+        exchanges: CoinGecko exchange IDs (or None) keyed by name
+        
+    Returns:
+        Dictionary of exchange IDs keyed by the given names, for the exchanges that exist
+    """
+    coingecko_ids = [coingecko_id for coingecko_id in exchanges.values() if coingecko_id]
+    by_coingecko_id = {}
+    if coingecko_ids:
+        rows = db.query(models.Exchange.id, models.Exchange.coingecko_id).filter(
+            models.Exchange.coingecko_id.in_(coingecko_ids)
+        ).all()
+        by_coingecko_id = {row.coingecko_id: row.id for row in rows}
+    
+    ids = {name: by_coingecko_id[coingecko_id] for name, coingecko_id in exchanges.items() if coingecko_id in by_coingecko_id}
+    ids.update(get_ids_by_names(db, [name for name in exchanges if name not in ids]))
+    return ids
+
+
 def get_by_id(db: Session, exchange_id: int) -> Optional[models.Exchange]:
     """
     Get an exchange by its database ID.
@@ -31,7 +76,8 @@ def get_by_id(db: Session, exchange_id: int) -> Optional[models.Exchange]:
     Returns:
         Exchange model if found, None otherwise
     """
-    return db.query(models.Exchange).filter(models.Exchange.id == exchange_id).first()
+    # Session.get answers from the identity map without a query when the row is already loaded
+    return db.get(models.Exchange, exchange_id)
 
 
 def get_all(db: Session, limit: int = 100, offset: int = 0) -> List[models.Exchange]:
@@ -90,6 +136,56 @@ def update(db: Session, exchange_id: int, exchange_data: Dict[str, Any]) -> Opti
     for key, value in exchange_data.items():
         setattr(exchange, key, value)
         
-    db.commit()
-    db.refresh(exchange)
-    return exchange 
\ No newline at end of file
+    commit_keeping_loaded(db)
+    return exchange
+
+
+def get_ticker_filter(db: Session) -> Optional[List[str]]:
+    """
+    Get the CoinGecko IDs of all stored exchanges, to limit ticker fetches to them.
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        List of CoinGecko exchange IDs, or None if some exchange has no
+        CoinGecko ID and tickers cannot be filtered without losing it
+    """
+    ids = [row.coingecko_id for row in db.query(models.Exchange.coingecko_id)]
+    if not ids or None in ids:
+        return None
+    return ids
+
+
+def bulk_sync(
+    db: Session,
+    exchanges_data: List[Dict[str, Any]],
+    update_existing: bool = True,
+    commit: bool = True
+) -> Tuple[int, List[models.Exchange]]:
+    """
+    Create and update many exchanges in one transaction, matched on name.
+    
+    A row whose CoinGecko ID already belongs to a stored exchange is matched
+    to that exchange (under its stored name), so an exchange listed under
+    another name is not inserted twice.
+    
+    Args:
+        db: Database session
+        exchanges_data: Dictionaries containing exchange attributes, each with a name
+        update_existing: Whether to update exchanges that already exist
+        commit: Whether to commit the transaction
+        
+    Returns:
+        Tuple of (updated_count, newly created exchange models)
+    """
+    coingecko_ids = [row["coingecko_id"] for row in exchanges_data if row.get("coingecko_id")]
+    if coingecko_ids:
+        stored_names = dict(db.query(models.Exchange.coingecko_id, models.Exchange.name).filter(
+            models.Exchange.coingecko_id.in_(coingecko_ids)
+        ).all())
+        exchanges_data = [
+            {**row, "name": stored_names[row["coingecko_id"]]} if row.get("coingecko_id") in stored_names else row
+            for row in exchanges_data
+        ]
+    return sync_by_key(db, models.Exchange, "name", exchanges_data, update_existing, commit)
@@ -2,10 +2,15 @@
 Service for Price-related database operations.
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
+from sqlalchemy.dialects import postgresql, sqlite
 from app.models import models
+from app.services import price_matrix
 from typing import Dict, Any, Optional, List, Tuple
 
+# Rows per INSERT ... ON CONFLICT statement in bulk_upsert
+BULK_UPSERT_BATCH_SIZE = 500
+
 
 def get_by_exchange_and_coin(
     db: Session, 
@@ -66,6 +71,31 @@ def get_all_for_coin(
     ).order_by(models.Price.price_usd).offset(offset).limit(limit).all()
 
 
+def get_for_coin_by_exchanges(
+    db: Session,
+    coin_id: int,
+    exchange_ids: List[int]
+) -> Dict[int, models.Price]:
+    """
+    Get the price records of a coin on several exchanges in one query.
+    
+    Args:
+        db: Database session
+        coin_id: ID of the coin
+        exchange_ids: IDs of the exchanges
+        
+    Returns:
+        Dictionary of price models keyed by exchange ID
+    """
+    if not exchange_ids:
+        return {}
+    prices = db.query(models.Price).filter(
+        models.Price.coin_id == coin_id,
+        models.Price.exchange_id.in_(exchange_ids)
+    ).all()
+    return {price.exchange_id: price for price in prices}
+
+
 def create(db: Session, price_data: Dict[str, Any]) -> models.Price:
     """
     Create a new price record.
@@ -148,6 +178,107 @@ def update_or_create(
         return create(db, price_data)
 
 
+def upsert_statements(
+    dialect: str,
+    rows: List[Dict[str, Any]],
+    batch_size: int = BULK_UPSERT_BATCH_SIZE
+) -> Optional[List[Any]]:
+    """
+    Build INSERT ... ON CONFLICT DO UPDATE statements for price rows.
+    
+    Args:
+        dialect: Name of the database dialect
+        rows: Price dictionaries, all with the same keys
+        batch_size: Maximum number of rows per statement
+        
+    Returns:
+        List of statements, or None if the dialect has no native upsert
+    """
+    if dialect == "postgresql":
+        insert = postgresql.insert
+        conflict_target = {"constraint": "_exchange_coin_uc"}
+    elif dialect == "sqlite":
+        # SQLite cannot name the constraint, so target its columns instead
+        insert = sqlite.insert
+        conflict_target = {"index_elements": ["exchange_id", "coin_id"]}
+    else:
+        return None
+    
+    statements = []
+    update_columns = [key for key in rows[0] if key not in ("exchange_id", "coin_id")]
+    for start in range(0, len(rows), batch_size):
+        stmt = insert(models.Price).values(rows[start:start + batch_size])
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(
+                **conflict_target,
+                set_={column: stmt.excluded[column] for column in update_columns}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(**conflict_target)
+        statements.append(stmt)
+    return statements
+
+
+def bulk_upsert(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    batch_size: int = BULK_UPSERT_BATCH_SIZE,
+    commit: bool = True
+) -> int:
+    """
+    Insert or update many price records in one statement per batch.
+    
+    Conflicts on the exchange/coin unique constraint update the columns given
+    in the rows; columns not given (e.g. fees) keep their stored values.
+    Uses INSERT ... ON CONFLICT DO UPDATE on PostgreSQL and SQLite and falls
+    back to update_or_create per row on other databases. Committed rows are
+    also written to the in-memory price matrix; callers passing commit=False
+    apply them with price_matrix.apply() once they have committed.
+    
+    Args:
+        db: Database session
+        rows: Price dictionaries, each with exchange_id, coin_id and the
+            attributes to write. All rows must have the same keys.
+        batch_size: Maximum number of rows per statement
+        commit: Whether to commit once all batches are written
+        
+    Returns:
+        Number of rows written
+    """
+    if not rows:
+        return 0
+    
+    statements = upsert_statements(db.get_bind().dialect.name, rows, batch_size)
+    if statements is None:
+        for row in rows:
+            filter_data = {"exchange_id": row["exchange_id"], "coin_id": row["coin_id"]}
+            update_or_create(db, filter_data, {k: v for k, v in row.items() if k not in filter_data})
+        price_matrix.apply(rows)
+        return len(rows)
+    
+    for stmt in statements:
+        db.execute(stmt)
+    
+    if commit:
+        db.commit()
+        price_matrix.apply(rows)
+    return len(rows)
+
+
+def get_matrix_rows(db: Session) -> List[Any]:
+    """
+    Get every stored price with the columns kept in the price matrix.
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        Rows with exchange_id, coin_id and the price_matrix.COLUMNS
+    """
+    columns = [getattr(models.Price, column) for column in ("exchange_id", "coin_id", *price_matrix.COLUMNS)]
+    return list(db.execute(select(*columns)).mappings())
+
+
 def get_fees_by_exchange(db: Session, exchange_id: int) -> List[Dict[str, Any]]:
     """
     Get all fee information for a specific exchange.
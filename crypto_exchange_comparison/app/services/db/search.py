@@ -0,0 +1,42 @@
+"""
+Helpers for text search in database queries.
+"""
+from typing import Any
+
+LIKE_ESCAPE = "\\"
+
+
+def _escape(text: str) -> str:
+    return text.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace("%", LIKE_ESCAPE + "%").replace("_", LIKE_ESCAPE + "_")
+
+
+def contains(column: Any, text: str) -> Any:
+    """
+    Case-insensitive substring filter on a column.
+
+    Renders as ILIKE '%text%' on PostgreSQL, which the pg_trgm GIN indexes on
+    searchable columns serve, and as lower(column) LIKE lower('%text%')
+    elsewhere. LIKE wildcards in the text are matched literally.
+    
+    Args:
+        column: Column to filter on
+        text: Text to search for
+        
+    Returns:
+        Filter expression
+    """
+    return column.ilike(f"%{_escape(text)}%", escape=LIKE_ESCAPE)
+
+
+def starts_with(column: Any, text: str) -> Any:
+    """
+    Case-insensitive prefix filter on a column, escaped like contains().
+    
+    Args:
+        column: Column to filter on
+        text: Prefix to search for
+        
+    Returns:
+        Filter expression
+    """
+    return column.ilike(f"{_escape(text)}%", escape=LIKE_ESCAPE)
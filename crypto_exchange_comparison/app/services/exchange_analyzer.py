@@ -3,7 +3,10 @@ Service for analyzing and sorting exchange data.
 """
 from typing import Dict, Any, List, Optional
 
+from app.config.settings import settings
 from app.models import schemas
+from app.services import cost_engine
+from app.services.coingecko_processor import TickerRecord, filter_best_tickers
 
 
 def calculate_spread(bid_price: Optional[float], ask_price: Optional[float]) -> Optional[float]:
@@ -22,7 +25,7 @@ def calculate_spread(bid_price: Optional[float], ask_price: Optional[float]) ->
     return None
 
 
-def process_ticker_data(ticker_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+def process_ticker_data(ticker_data: Dict[str, Any]) -> Dict[str, TickerRecord]:
     """
     Process ticker data from CoinGecko to extract exchange information.
     
@@ -30,34 +33,10 @@ def process_ticker_data(ticker_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]
         ticker_data: Raw ticker data from CoinGecko API
         
     Returns:
-        Dictionary of exchange data keyed by exchange name
+        Dictionary of ticker records keyed by exchange name, the highest
+        volume ticker of each exchange
     """
-    exchange_data = {}
-    
-    for ticker in ticker_data.get("tickers", []):
-        exchange_name = ticker.get("market", {}).get("name")
-        if not exchange_name:
-            continue
-        
-        # Get exchange volume for this ticker
-        volume = ticker.get("converted_volume", {}).get("usd", 0)
-        
-        # If we've seen this exchange before, only keep the highest volume entry
-        if exchange_name in exchange_data and volume <= exchange_data[exchange_name]["volume"]:
-            continue
-        
-        # Store this exchange data
-        exchange_data[exchange_name] = {
-            "name": exchange_name,
-            "price": ticker.get("converted_last", {}).get("usd", 0),
-            "volume": volume,
-            "bid": ticker.get("bid"),
-            "ask": ticker.get("ask"),
-            "spread": ticker.get("bid_ask_spread_percentage"),
-            "ticker": ticker
-        }
-    
-    return exchange_data
+    return filter_best_tickers(ticker_data.get("tickers", []))
 
 
 def sort_exchanges_by_price(
@@ -99,24 +78,36 @@ def find_best_volume_exchange(
 
 def build_comparison_result(
     coin_name: str,
-    exchange_prices: List[schemas.ExchangePrice]
+    exchange_prices: List[schemas.ExchangePrice],
+    amount: Optional[float] = None
 ) -> schemas.ComparisonResult:
     """
     Build the final comparison result object.
     
+    Exchanges are priced for the order size with cost_engine, and
+    best_for_large_orders is the one with the lowest expected cost per
+    coin (the highest volume one if none has volume data).
+    
     Args:
         coin_name: Name of the coin
         exchange_prices: List of exchange price DTOs
+        amount: Order size in USD, LARGE_ORDER_USD if not given
         
     Returns:
         Comparison result DTO
     """
+    amount = amount or settings.LARGE_ORDER_USD
+    best_for_amount = None
+    quotes = []
+    if exchange_prices:
+        exchange_prices, best_for_amount, quotes = cost_engine.rank_by_amount(exchange_prices, amount)
     sorted_prices = sort_exchanges_by_price(exchange_prices)
-    best_volume = find_best_volume_exchange(exchange_prices)
     
     return schemas.ComparisonResult(
         coin=coin_name,
         exchanges=sorted_prices,
         best_price=sorted_prices[0] if sorted_prices else None,
-        best_for_large_orders=best_volume
+        best_for_large_orders=best_for_amount or find_best_volume_exchange(exchange_prices),
+        amount=amount,
+        best_by_order_size=quotes
     ) 
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+In-process columnar store of the stored prices.
+
+Every price column is a NumPy array over a coin x exchange grid, with maps
+from database IDs to grid rows and columns, so analytics across coins and
+exchanges run as array operations instead of loading Price objects one by
+one. Cells without a price (or without a value, e.g. no fee) are NaN, and
+last_updated is kept as a Unix timestamp.
+
+The matrix is rebuilt from the prices table on startup and after the
+periodic updates, and kept current in between by price_service.bulk_upsert,
+which applies every batch it commits. It only sees this worker's writes
+until the next rebuild.
+"""
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+COLUMNS = ("price_usd", "volume_24h", "bid_price", "ask_price", "trading_fee", "withdrawal_fee", "last_updated")
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # SQLite returns naive datetimes; they are stored in UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _slot(index: Dict[int, int], ids: List[int], key: int) -> int:
+    position = index.get(key)
+    if position is None:
+        position = index[key] = len(ids)
+        ids.append(key)
+    return position
+
+
+class PriceMatrix:
+    """
+    Price columns over a coin x exchange grid.
+
+    Grid rows and columns are assigned in order of first appearance and
+    never reused, so positions stay valid for the life of the matrix.
+    """
+
+    def __init__(self, coin_capacity: int = 64, exchange_capacity: int = 16):
+        self.coin_ids: List[int] = []
+        self.exchange_ids: List[int] = []
+        self.coin_index: Dict[int, int] = {}
+        self.exchange_index: Dict[int, int] = {}
+        # Incremented on every change, so derived results can be cached against it
+        self.version = 0
+        self._lock = threading.Lock()
+        self._columns = {column: np.full((coin_capacity, exchange_capacity), np.nan) for column in COLUMNS}
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.coin_ids), len(self.exchange_ids)
+
+    def _reserve(self) -> None:
+        """
+        Grow the arrays (doubling) until the grid fits.
+        """
+        capacity = self._columns[COLUMNS[0]].shape
+        coins, exchanges = self.shape
+        if coins <= capacity[0] and exchanges <= capacity[1]:
+            return
+        new_capacity = (max(capacity[0], 1), max(capacity[1], 1))
+        while new_capacity[0] < coins:
+            new_capacity = (new_capacity[0] * 2, new_capacity[1])
+        while new_capacity[1] < exchanges:
+            new_capacity = (new_capacity[0], new_capacity[1] * 2)
+        for column, values in self._columns.items():
+            grown = np.full(new_capacity, np.nan)
+            grown[:capacity[0], :capacity[1]] = values
+            self._columns[column] = grown
+
+    def apply(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        """
+        Write price rows into the grid.
+
+        Only the columns present in the rows are written, as in
+        price_service.bulk_upsert, so e.g. fees not given are kept.
+
+        Args:
+            rows: Price dictionaries, each with exchange_id, coin_id and the
+                attributes written. All rows must have the same keys.
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        columns = [column for column in COLUMNS if column in rows[0]]
+        with self._lock:
+            coin_positions = np.fromiter(
+                (_slot(self.coin_index, self.coin_ids, row["coin_id"]) for row in rows), np.intp, len(rows)
+            )
+            exchange_positions = np.fromiter(
+                (_slot(self.exchange_index, self.exchange_ids, row["exchange_id"]) for row in rows), np.intp, len(rows)
+            )
+            self._reserve()
+            for column in columns:
+                if column == "last_updated":
+                    values = [_timestamp(row[column]) for row in rows]
+                else:
+                    values = [row[column] for row in rows]
+                # None becomes NaN
+                self._columns[column][coin_positions, exchange_positions] = np.array(values, dtype=float)
+            self.version += 1
+
+    def remove_coin(self, coin_id: int) -> None:
+        """
+        Clear every price of a coin (e.g. once it has been deleted).
+        """
+        with self._lock:
+            position = self.coin_index.get(coin_id)
+            if position is None:
+                return
+            for values in self._columns.values():
+                values[position, :] = np.nan
+            self.version += 1
+
+    def snapshot(self, columns: Sequence[str] = COLUMNS) -> Tuple[List[int], List[int], Dict[str, np.ndarray]]:
+        """
+        Copy the occupied part of the grid, consistent across columns.
+
+        Args:
+            columns: Names of the columns to copy
+
+        Returns:
+            Tuple of (coin IDs by row, exchange IDs by column, arrays of
+            shape (coins, exchanges) keyed by column name)
+        """
+        with self._lock:
+            coins, exchanges = self.shape
+            return (
+                list(self.coin_ids),
+                list(self.exchange_ids),
+                {column: self._columns[column][:coins, :exchanges].copy() for column in columns},
+            )
+
+    def cell(self, coin_id: int, exchange_id: int) -> Optional[Dict[str, float]]:
+        """
+        Values of one coin on one exchange, or None if the pair is not in the grid.
+        """
+        coin = self.coin_index.get(coin_id)
+        exchange = self.exchange_index.get(exchange_id)
+        if coin is None or exchange is None:
+            return None
+        return {column: float(values[coin, exchange]) for column, values in self._columns.items()}
+
+
+def build(rows: Iterable[Mapping[str, Any]]) -> PriceMatrix:
+    """
+    Build a matrix from price rows (see price_service.get_matrix_rows).
+    """
+    rows = list(rows)
+    matrix = PriceMatrix(
+        coin_capacity=len({row["coin_id"] for row in rows}) or 64,
+        exchange_capacity=len({row["exchange_id"] for row in rows}) or 16,
+    )
+    matrix.apply(rows)
+    return matrix
+
+
+_matrix = PriceMatrix()
+
+
+def get_matrix() -> PriceMatrix:
+    """
+    Get this worker's price matrix.
+    """
+    return _matrix
+
+
+def rebuild(rows: Iterable[Mapping[str, Any]]) -> PriceMatrix:
+    """
+    Replace this worker's price matrix with one built from price rows.
+
+    The new matrix is built on the side and swapped in, so readers never
+    see a partly loaded one.
+
+    Args:
+        rows: Every stored price (see price_service.get_matrix_rows)
+
+    Returns:
+        The new matrix
+    """
+    global _matrix
+    _matrix = build(rows)
+    return _matrix
+
+
+def apply(rows: Iterable[Mapping[str, Any]]) -> None:
+    """
+    Write committed price rows into this worker's price matrix (see PriceMatrix.apply).
+    """
+    _matrix.apply(rows)
+
+
+def remove_coin(coin_id: int) -> None:
+    """
+    Clear a deleted coin from this worker's price matrix.
+    """
+    _matrix.remove_coin(coin_id)
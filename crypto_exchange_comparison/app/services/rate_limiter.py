@@ -0,0 +1,270 @@
+"""
+Rate limiting for requests to the CoinGecko API.
+
+The upstream budget is shared by every uvicorn worker and the scheduler, so
+the limiter state lives in Redis. When Redis cannot be reached each process
+falls back to its own in-process bucket rather than failing requests.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from redis.exceptions import RedisError
+
+from app.config.settings import settings
+from app.services.cache import async_redis_client
+
+logger = logging.getLogger("rate_limiter")
+
+# How long to stop trying Redis after it fails before checking again
+REDIS_RETRY_INTERVAL = 30.0
+
+# Atomically refill the bucket, honour any Retry-After block and take tokens.
+# Uses the Redis server clock so every process agrees on elapsed time and on
+# the current minute, whose usage is kept in the window hash with the minute
+# it belongs to.
+# Returns {granted, wait_ms, tokens_left}; tokens_left is a string because
+# Lua numbers are truncated to integers on the way back to the client.
+TAKE_TOKENS_SCRIPT = """
+local bucket_key = KEYS[1]
+local blocked_key = KEYS[2]
+local window_key = KEYS[3]
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local blocked_until = tonumber(redis.call('GET', blocked_key) or '0')
+if blocked_until > now then
+    return {0, blocked_until - now, '0'}
+end
+
+local state = redis.call('HMGET', bucket_key, 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local granted = 0
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+    granted = 1
+    local minute = math.floor(now / 60000)
+    if tonumber(redis.call('HGET', window_key, 'minute')) ~= minute then
+        redis.call('HSET', window_key, 'minute', minute, 'used', 0)
+    end
+    redis.call('HINCRBY', window_key, 'used', requested)
+    redis.call('EXPIRE', window_key, 120)
+else
+    wait = math.ceil((requested - tokens) / rate)
+end
+
+redis.call('HSET', bucket_key, 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', bucket_key, math.ceil(capacity / rate) * 2)
+return {granted, wait, tostring(tokens)}
+"""
+
+
+class TokenBucket:
+    """
+    In-process token bucket that paces callers to a per-minute budget.
+
+    Callers reserve a token without waiting on a lock: when the bucket is
+    empty the balance goes negative and each caller sleeps until its own
+    reserved token has been refilled. This is safe because the bucket is only
+    touched from the event loop thread and never awaits mid-update.
+    """
+
+    def __init__(self, rate_per_minute: int, capacity: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0  # Tokens refilled per second
+        self.capacity = capacity or rate_per_minute
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    @property
+    def available(self) -> float:
+        """
+        Number of tokens that can be taken right now without waiting.
+        """
+        if self.blocked_for > 0:
+            return 0.0
+        self._refill()
+        return max(self._tokens, 0.0)
+
+    @property
+    def blocked_for(self) -> float:
+        """
+        Seconds left before upstream asked us to resume (Retry-After).
+        """
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    def block(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for the given number of seconds.
+
+        Args:
+            seconds: Delay requested by the upstream Retry-After header
+        """
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """
+        Wait until the requested number of tokens is available and take them.
+
+        Args:
+            tokens: Number of tokens to take
+        """
+        if self.blocked_for > 0:
+            await asyncio.sleep(self.blocked_for)
+        self._refill()
+        self._tokens -= tokens
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class RedisTokenBucket:
+    """
+    Token bucket shared by every process through Redis.
+
+    The bucket refills continuously at `rate_per_minute / 60` tokens per
+    second up to `capacity`. A per-minute counter tracks how much of the
+    budget has been spent in the current minute (by the Redis clock) for
+    reporting.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        key: str,
+        rate_per_minute: int,
+        capacity: Optional[int] = None,
+    ):
+        self.redis = redis_client
+        self.key = key
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity or rate_per_minute
+        self.local = TokenBucket(rate_per_minute, self.capacity)
+        self._script = redis_client.register_script(TAKE_TOKENS_SCRIPT)
+        self._redis_down_until = 0.0
+
+    @property
+    def _blocked_key(self) -> str:
+        return f"{self.key}:blocked_until"
+
+    @property
+    def _window_key(self) -> str:
+        return f"{self.key}:minute"
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _mark_redis_down(self, error: Exception) -> None:
+        if self._redis_available():
+            logger.warning(f"Redis unavailable for rate limiting, using local bucket: {str(error)}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """
+        Wait until the shared budget has room and take tokens from it.
+
+        Args:
+            tokens: Number of tokens to take
+        """
+        while self._redis_available():
+            try:
+                granted, wait_ms, _ = await self._script(
+                    keys=[self.key, self._blocked_key, self._window_key],
+                    args=[self.rate_per_minute / 60000.0, self.capacity, tokens],
+                )
+            except (RedisError, OSError) as e:
+                self._mark_redis_down(e)
+                break
+            if int(granted):
+                return
+            await asyncio.sleep(int(wait_ms) / 1000.0)
+
+        await self.local.acquire(tokens)
+
+    async def penalize(self, retry_after: float) -> None:
+        """
+        Pause every process until upstream's Retry-After delay has passed.
+
+        Args:
+            retry_after: Seconds to wait before the next request
+        """
+        self.local.block(retry_after)
+        if not self._redis_available():
+            return
+        try:
+            # Store the resume time in ms; the script compares it with the server clock
+            server_seconds, server_micros = await self.redis.time()
+            resume_at = int(server_seconds * 1000 + server_micros // 1000 + retry_after * 1000)
+            await self.redis.set(self._blocked_key, resume_at, px=max(1, int(retry_after * 1000)))
+        except (RedisError, OSError) as e:
+            self._mark_redis_down(e)
+
+    async def get_budget(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the remaining upstream request budget.
+
+        Returns:
+            Dictionary with the per-minute limit, usage in the current minute,
+            tokens available now and any Retry-After pause still in effect
+        """
+        budget = {
+            "backend": "local",
+            "limit_per_minute": self.rate_per_minute,
+            "capacity": self.capacity,
+            "used_this_minute": None,
+            "remaining_this_minute": None,
+            "tokens_available": round(self.local.available, 2),
+            "blocked_for_seconds": round(self.local.blocked_for, 2),
+        }
+        if not self._redis_available():
+            return budget
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hmget(self.key, "tokens", "ts")
+            pipe.hmget(self._window_key, "minute", "used")
+            pipe.pttl(self._blocked_key)
+            pipe.time()
+            (tokens, ts), (minute, used), blocked_ms, (server_seconds, server_micros) = await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._mark_redis_down(e)
+            return budget
+
+        # Refill the stored balance up to the current server time, as the script would
+        now_ms = server_seconds * 1000 + server_micros // 1000
+        available = float(tokens) if tokens is not None else float(self.capacity)
+        if ts is not None:
+            available = min(self.capacity, available + max(0, now_ms - int(ts)) * self.rate_per_minute / 60000.0)
+        # Usage recorded in an earlier minute does not count against this one
+        used = int(used or 0) if minute is not None and int(minute) == now_ms // 60000 else 0
+
+        budget.update({
+            "backend": "redis",
+            "used_this_minute": used,
+            "remaining_this_minute": max(0, self.rate_per_minute - used),
+            "tokens_available": round(available, 2),
+            "blocked_for_seconds": round(max(0, blocked_ms) / 1000.0, 2),
+        })
+        return budget
+
+
+# Shared limiter for all outgoing CoinGecko requests across the cluster
+coingecko_limiter = RedisTokenBucket(
+    async_redis_client,
+    "ratelimit:coingecko",
+    settings.COINGECKO_RATE_LIMIT_PER_MINUTE,
+    settings.COINGECKO_RATE_LIMIT_BURST,
+)
@@ -0,0 +1,193 @@
+"""
+Cache of fully rendered JSON responses.
+
+On a plain cache hit a route still validates the cached value against its
+response model and serializes it again. Entries here hold the final body
+bytes, a gzip variant and an ETag, so a hit is answered with a raw
+Response (or a 304) without touching pydantic. Entries live in the local
+cache tier and in a Redis hash, and can be tagged like any other cached
+view (see cache.aset_cache). Redis errors are logged and the route falls
+back to rendering the response itself.
+"""
+import gzip
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+
+from app.config.settings import settings
+from app.services import cache
+
+logger = logging.getLogger("response_cache")
+
+KEY_PREFIX = "resp"
+GZIP_MIN_BYTES = 1024  # Smaller bodies are only stored uncompressed
+MEDIA_TYPE = "application/json"
+
+
+def cache_key(request: Request) -> str:
+    """
+    Build the cache key of a request from its path and sorted query parameters.
+    """
+    query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+    return f"{KEY_PREFIX}:{request.url.path}?{query}"
+
+
+def render(adapter: TypeAdapter, value: Any) -> bytes:
+    """
+    Validate a value against a response model and encode it as JSON, as FastAPI would.
+
+    Args:
+        adapter: TypeAdapter of the route's response model
+        value: Dict, model or ORM object(s) returned by the route
+
+    Returns:
+        Encoded JSON body
+    """
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True), by_alias=True)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {candidate.strip() for candidate in header.split(",")}
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _accepts_gzip(request: Request) -> bool:
+    """
+    Whether Accept-Encoding allows gzip, i.e. gives gzip (or failing that *) a q-value above 0.
+    """
+    qvalues = {}
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, *params = (part.strip() for part in coding.split(";"))
+        qvalue = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        qvalues[name.lower()] = qvalue
+    qvalue = qvalues.get("gzip", qvalues.get("x-gzip", qvalues.get("*", 0.0)))
+    return qvalue > 0
+
+
+def _respond(request: Request, entry: Dict[str, Any], status: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Build the response for a cache entry, honouring If-None-Match and Accept-Encoding.
+    """
+    response_headers = {
+        "ETag": entry["etag"],
+        "Vary": "Accept-Encoding",
+        "Age": str(max(0, int(time.time() - entry["cached_at"]))),
+        "X-Cache": status,
+        **(headers or {}),
+    }
+    if _etag_matches(request, entry["etag"]):
+        return Response(status_code=304, headers=response_headers)
+    if entry["gzip"] and _accepts_gzip(request):
+        response_headers["Content-Encoding"] = "gzip"
+        return Response(content=entry["gzip"], media_type=MEDIA_TYPE, headers=response_headers)
+    return Response(content=entry["body"], media_type=MEDIA_TYPE, headers=response_headers)
+
+
+async def get(request: Request, key: str) -> Optional[Response]:
+    """
+    Get the cached response for a key, checking the local tier before Redis.
+
+    Args:
+        request: Incoming request (for conditional and encoding headers)
+        key: Cache key, usually from cache_key()
+
+    Returns:
+        Response ready to return, or None on a miss
+    """
+    found, entry = cache.local_cache.get(key) if settings.CACHE_L1_ENABLED else (False, None)
+    if not found:
+        try:
+            stored = await cache.async_redis_client.hgetall(key)
+        except RedisError as e:
+            logger.warning(f"Response cache unavailable for {key}: {str(e)}")
+            return None
+        if not stored:
+            if settings.CACHE_L1_ENABLED:
+                cache.local_cache.record(key, "misses")
+            return None
+        stored = {name.decode() if isinstance(name, bytes) else name: value for name, value in stored.items()}
+        entry = {
+            "body": stored["body"],
+            "gzip": stored.get("gzip") or b"",
+            "etag": stored["etag"].decode(),
+            "cached_at": float(stored["cached_at"]),
+            "expires_at": float(stored["expires_at"]),
+        }
+        if settings.CACHE_L1_ENABLED:
+            cache.local_cache.record(key, "l2_hits")
+            cache.local_cache.set(
+                key, entry, len(entry["body"]) + len(entry["gzip"]), entry["expires_at"] - time.time()
+            )
+
+    if entry["expires_at"] <= time.time():
+        return None
+    return _respond(request, entry, "HIT")
+
+
+async def store(
+    request: Request,
+    key: str,
+    body: bytes,
+    ttl: float,
+    tags: Optional[Iterable[str]] = None,
+    age: int = 0,
+    status: str = "MISS",
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Store a rendered body and return the response for it.
+
+    Args:
+        request: Incoming request (for conditional and encoding headers)
+        key: Cache key, usually from cache_key()
+        body: Encoded JSON body, usually from render()
+        ttl: Seconds to keep the entry; nothing is stored unless positive
+        tags: Tags to store the entry under (see cache.aset_cache)
+        age: Age in seconds of the data the body was rendered from
+        status: Value of the X-Cache header on this response
+        headers: Extra headers for this response
+
+    Returns:
+        Response for the body
+    """
+    now = time.time()
+    entry = {
+        "body": body,
+        "gzip": gzip.compress(body) if len(body) >= GZIP_MIN_BYTES else b"",
+        "etag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+        "cached_at": now - age,
+        "expires_at": now + ttl,
+    }
+
+    if ttl > 0:
+        expiry = max(1, int(ttl))
+        try:
+            pipe = cache.async_redis_client.pipeline(transaction=False)
+            pipe.hset(key, mapping=entry)
+            pipe.expire(key, expiry)
+            cache.add_tags(pipe, key, expiry, tags or [])
+            await pipe.execute()
+        except RedisError as e:
+            # Without Redis the local tier could not be invalidated either, so skip both
+            logger.warning(f"Could not store response for {key}: {str(e)}")
+        else:
+            if settings.CACHE_L1_ENABLED:
+                cache.local_cache.set(key, entry, len(entry["body"]) + len(entry["gzip"]), ttl)
+                await cache.apublish_invalidation(keys=[key])
+
+    return _respond(request, entry, status, headers)
@@ -0,0 +1,334 @@
+"""
+In-memory search index over the CoinGecko coin list.
+
+Coins are stored in ranking order (coins with market data first, by market
+cap rank) with their id, symbol and name lowercased once. An inverted index
+maps every 2- and 3-character substring of those keys to the coins
+containing it, so a query only checks the coins sharing its rarest n-gram
+instead of the whole list. The index is rebuilt only when the coin list or
+market data it was built from changes.
+
+Fuzzy search uses a SymSpell-style deletion dictionary: every term (the
+keys plus the words of names and ids) is stored under all strings reachable
+from its first PREFIX_LENGTH characters by up to MAX_EDIT_DISTANCE
+deletions. A query generates its own deletions and looks them up, so only
+terms within the edit distance bound are ever compared against it.
+"""
+import asyncio
+import bisect
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+# Fields copied from the markets data into search results
+MARKET_FIELDS = {
+    "current_price": "current_price",
+    "market_cap": "market_cap",
+    "image": "image",
+    "price_change_24h": "price_change_percentage_24h",
+}
+
+NO_RANK = float("inf")
+
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7  # Deletions are generated from this many leading characters only
+
+
+def _ngrams(text: str, size: int) -> Set[str]:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _terms(keys: Tuple[str, str, str]) -> Set[str]:
+    """
+    Terms a coin can be fuzzy-matched on: its keys and the words of its id and name.
+    """
+    coin_id, _, name = keys
+    return {term for term in (*keys, *coin_id.split("-"), *name.split()) if term}
+
+
+def _deletes(term: str, max_distance: int) -> Set[str]:
+    """
+    All non-empty strings reachable from a term by deleting up to max_distance characters.
+    """
+    results = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        results |= frontier
+    results.discard("")
+    return results
+
+
+def max_distance_for(query: str) -> int:
+    """
+    Edit distance allowed for a query: 0 up to 2 characters, 1 up to 5, then MAX_EDIT_DISTANCE.
+    """
+    if len(query) <= 2:
+        return 0
+    if len(query) <= 5:
+        return 1
+    return MAX_EDIT_DISTANCE
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions).
+
+    Args:
+        a: First string
+        b: Second string
+        max_distance: Bound after which the computation stops early
+
+    Returns:
+        The distance, or max_distance + 1 if it exceeds max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class CoinSearchIndex:
+    """
+    Substring search over coin ids, symbols and names.
+
+    Results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, coins: List[Dict[str, Any]], market_coins: List[Dict[str, Any]]):
+        market_by_id = {coin["id"]: coin for coin in market_coins}
+
+        def rank(item: Tuple[int, Dict[str, Any]]) -> Tuple[int, float, int]:
+            position, coin = item
+            market = market_by_id.get(coin["id"])
+            if market is None:
+                return (1, NO_RANK, position)
+            return (0, market.get("market_cap_rank") or NO_RANK, position)
+
+        ordered = [coin for _, coin in sorted(enumerate(coins), key=rank)]
+
+        self.size = len(ordered)
+        # Positions below this have market data
+        self.market_count = sum(1 for coin in ordered if coin["id"] in market_by_id)
+        self.ids: List[str] = []
+        self.keys: List[Tuple[str, str, str]] = []
+        self.results: List[Dict[str, Any]] = []
+        postings: Dict[str, List[int]] = defaultdict(list)
+        exact: Dict[str, List[int]] = defaultdict(list)
+        prefixes: List[Tuple[str, int]] = []
+        term_positions: Dict[str, List[int]] = defaultdict(list)
+
+        for position, coin in enumerate(ordered):
+            keys = (coin["id"].lower(), coin["symbol"].lower(), coin["name"].lower())
+            market = market_by_id.get(coin["id"])
+            result = {
+                "id": coin["id"],
+                "symbol": coin["symbol"],
+                "name": coin["name"],
+                "has_market_data": market is not None,
+            }
+            if market is not None:
+                result.update({field: market.get(source) for field, source in MARKET_FIELDS.items()})
+
+            self.ids.append(coin["id"])
+            self.keys.append(keys)
+            self.results.append(result)
+            for key in set(keys):
+                exact[key].append(position)
+                prefixes.append((key, position))
+            # Positions are appended in ranking order, so every posting list is sorted by rank
+            for gram in set().union(*(_ngrams(key, 2) | _ngrams(key, 3) for key in keys)):
+                postings[gram].append(position)
+            for term in _terms(keys):
+                term_positions[term].append(position)
+
+        self.postings = dict(postings)
+        self.exact = dict(exact)
+        prefixes.sort()
+        self.prefix_keys = [key for key, _ in prefixes]
+        self.prefix_positions = [position for _, position in prefixes]
+
+        self.terms = list(term_positions)
+        self.term_positions = [term_positions[term] for term in self.terms]
+        deletes: Dict[str, List[int]] = defaultdict(list)
+        for term_index, term in enumerate(self.terms):
+            for deleted in _deletes(term[:PREFIX_LENGTH], MAX_EDIT_DISTANCE):
+                deletes[deleted].append(term_index)
+        self.deletes = dict(deletes)
+
+    def _candidates(self, query: str) -> Sequence[int]:
+        """
+        Positions of coins that may contain the query: those sharing its rarest n-gram.
+        """
+        if len(query) < 2:
+            return range(self.size)
+        grams = _ngrams(query, 3) if len(query) >= 3 else {query}
+        lists = [self.postings.get(gram) for gram in grams]
+        if any(posting is None for posting in lists):
+            return ()
+        return min(lists, key=len)
+
+    def search(self, query: str, limit: int = 20, exclude: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Find coins whose id, symbol or name contains the query.
+
+        Coins with market data come first, then exact matches before prefix
+        matches before other substring matches, then by market cap rank.
+
+        Args:
+            query: Search text (case-insensitive)
+            limit: Maximum number of results
+            exclude: CoinGecko IDs to leave out (e.g. coins already tracked)
+
+        Returns:
+            List of search result dictionaries
+        """
+        query = query.lower()
+        exclude = exclude or set()
+
+        def wanted(position: int) -> bool:
+            return self.ids[position] not in exclude
+
+        # Exact and prefix matches come from direct lookups
+        exact = sorted(position for position in set(self.exact.get(query, ())) if wanted(position))
+        start = bisect.bisect_left(self.prefix_keys, query)
+        end = bisect.bisect_left(self.prefix_keys, query + "\uffff")
+        seen = set(exact)
+        prefix = sorted({
+            position for position in self.prefix_positions[start:end]
+            if position not in seen and wanted(position)
+        })
+        seen.update(prefix)
+
+        # Other substring matches: candidates are in ranking order, so stop
+        # collecting a group once it has enough
+        contains: Tuple[List[int], List[int]] = ([], [])
+        candidates = self._candidates(query)
+        i = 0
+        while i < len(candidates):
+            position = candidates[i]
+            group = 0 if position < self.market_count else 1
+            if len(contains[group]) >= limit:
+                if group == 1:
+                    break
+                i = bisect.bisect_left(candidates, self.market_count, i)
+                continue
+            i += 1
+            if position in seen or not wanted(position):
+                continue
+            if any(query in key for key in self.keys[position]):
+                contains[group].append(position)
+
+        market_count = self.market_count
+        ranked = [position for position in exact if position < market_count]
+        ranked += [position for position in prefix if position < market_count] + contains[0]
+        if len(ranked) < limit:
+            ranked += [position for position in exact if position >= market_count]
+            ranked += [position for position in prefix if position >= market_count] + contains[1]
+        return [self.results[position] for position in ranked[:limit]]
+
+    def fuzzy_search(self, query: str, limit: int = 20, exclude: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Find coins with a term within a bounded edit distance of the query.
+
+        A coin's terms are its id, symbol and name and the words in them. The
+        allowed distance grows with the query length (see max_distance_for).
+        Results are ordered by their closest term's distance, then as in
+        search() (market data first, by market cap rank).
+
+        Args:
+            query: Search text (case-insensitive)
+            limit: Maximum number of results
+            exclude: CoinGecko IDs to leave out (e.g. coins already tracked)
+
+        Returns:
+            List of search result dictionaries
+        """
+        query = query.lower().strip()
+        exclude = exclude or set()
+        max_distance = max_distance_for(query)
+
+        distances: Dict[int, int] = {}
+        checked: Set[int] = set()
+        for deleted in _deletes(query[:PREFIX_LENGTH], max_distance):
+            for term_index in self.deletes.get(deleted, ()):
+                if term_index in checked:
+                    continue
+                checked.add(term_index)
+                distance = edit_distance(query, self.terms[term_index], max_distance)
+                if distance > max_distance:
+                    continue
+                for position in self.term_positions[term_index]:
+                    if distance < distances.get(position, max_distance + 1):
+                        distances[position] = distance
+
+        ranked = sorted(
+            (distance, position) for position, distance in distances.items()
+            if self.ids[position] not in exclude
+        )
+        return [self.results[position] for _, position in ranked[:limit]]
+
+
+def fingerprint(coins: List[Dict[str, Any]], market_coins: List[Dict[str, Any]]) -> str:
+    """
+    Digest of the fields the index is built from.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for coin in coins:
+        digest.update(f"{coin['id']}\x1f{coin['symbol']}\x1f{coin['name']}\x1e".encode())
+    digest.update(b"\x1d")
+    for coin in market_coins:
+        digest.update(f"{coin['id']}\x1f{coin.get('market_cap_rank')}\x1f".encode())
+        digest.update("\x1f".join(str(coin.get(source)) for source in MARKET_FIELDS.values()).encode())
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+# Created on first use so it belongs to the running event loop (Python 3.9)
+_lock: Optional[asyncio.Lock] = None
+_index: Optional[CoinSearchIndex] = None
+_fingerprint: Optional[str] = None
+# The exact list objects the current index was checked against; the local
+# cache tier hands out the same objects until they change, so most lookups
+# skip even the fingerprint
+_sources: Tuple[Any, Any] = (None, None)
+
+
+async def get_coin_index(coins: List[Dict[str, Any]], market_coins: List[Dict[str, Any]]) -> CoinSearchIndex:
+    """
+    Get the search index for a coin list and markets data, rebuilding it only if they changed.
+
+    Fingerprinting and rebuilding run in a worker thread so they do not stall the event loop.
+
+    Args:
+        coins: Result of coingecko.get_coins()
+        market_coins: Result of coingecko.get_coins_with_market_data()
+
+    Returns:
+        Search index
+    """
+    global _index, _fingerprint, _sources, _lock
+    if _index is not None and _sources[0] is coins and _sources[1] is market_coins:
+        return _index
+    if _lock is None:
+        _lock = asyncio.Lock()
+    async with _lock:
+        if _index is not None and _sources[0] is coins and _sources[1] is market_coins:
+            return _index
+        current = await asyncio.to_thread(fingerprint, coins, market_coins)
+        if _index is None or current != _fingerprint:
+            _index = await asyncio.to_thread(CoinSearchIndex, coins, market_coins)
+            _fingerprint = current
+        _sources = (coins, market_coins)
+        return _index
@@ -0,0 +1,135 @@
+"""
+Single-flight request coalescing.
+
+When many callers miss the cache for the same key at once, only one of them
+should do the expensive work (upstream fetch, DB write). Within a process the
+callers share an asyncio future; across workers a short Redis lock elects one
+leader while the others wait for the result it publishes. The result is keyed
+by the leader's lock token, so a later flight never picks up an earlier one's.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from redis.exceptions import RedisError
+
+from app.services import cache
+
+logger = logging.getLogger("singleflight")
+
+LOCK_TTL = 30  # Seconds before an abandoned leader lock expires
+RESULT_TTL = 15  # Seconds the leader's result stays available to waiting workers
+WAIT_TIMEOUT = 30.0  # Seconds a worker waits for another worker's result
+POLL_INTERVAL = 0.05
+
+# Futures for computations currently running in this process, keyed by coalescing key
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+def _lock_key(key: str) -> str:
+    return f"singleflight:lock:{key}"
+
+
+def _result_key(key: str, token: str) -> str:
+    return f"singleflight:result:{key}:{token}"
+
+
+async def _lock_owner(key: str) -> Optional[str]:
+    owner = await cache.async_redis_client.get(_lock_key(key))
+    return owner.decode() if isinstance(owner, bytes) else owner
+
+
+async def _release_lock(key: str, token: str) -> None:
+    """
+    Release the leader lock, but only if this worker still owns it.
+    """
+    try:
+        # Compare and delete in one step, so a lock that expired and was taken
+        # by another worker in between is left alone
+        release = cache.async_redis_client.register_script(cache.RELEASE_LOCK_SCRIPT)
+        await release(keys=[_lock_key(key)], args=[token])
+    except RedisError as e:
+        logger.warning(f"Could not release single-flight lock for {key}: {str(e)}")
+
+
+async def _run_across_workers(key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run fn as the cluster-wide leader for key, or wait for the current leader's result.
+    """
+    token = uuid.uuid4().hex
+    try:
+        acquired = await cache.async_redis_client.set(_lock_key(key), token, nx=True, ex=LOCK_TTL)
+    except RedisError as e:
+        # Without Redis we can still coalesce within this process
+        logger.warning(f"Single-flight lock unavailable for {key}: {str(e)}")
+        return await fn()
+
+    if acquired:
+        try:
+            result = await fn()
+            try:
+                await cache.aset_cache(_result_key(key, token), result, RESULT_TTL)
+            except RedisError as e:
+                logger.warning(f"Could not publish single-flight result for {key}: {str(e)}")
+            return result
+        finally:
+            await _release_lock(key, token)
+
+    # Another worker is the leader: wait for the result it publishes
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    try:
+        leader = await _lock_owner(key)
+        while leader is not None and time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            # The leader publishes before releasing, so read the owner first
+            owner = await _lock_owner(key)
+            result = await cache.aget_cache(_result_key(key, leader))
+            if result is not None:
+                return result
+            if owner != leader:
+                # The leader finished without publishing (it failed); do the work ourselves
+                break
+    except RedisError as e:
+        logger.warning(f"Lost Redis while waiting for single-flight result of {key}: {str(e)}")
+
+    return await fn()
+
+
+async def coalesce(key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run fn once for all concurrent callers asking for the same key.
+
+    The result must be JSON serializable, since workers other than the
+    leader receive it through Redis.
+
+    Args:
+        key: Coalescing key, usually the cache key being filled
+        fn: Coroutine function doing the actual work
+
+    Returns:
+        Result of fn, shared by every concurrent caller
+    """
+    future = _in_flight.get(key)
+    if future is not None:
+        # Shield so a cancelled follower does not cancel the shared computation
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = future
+    try:
+        result = await _run_across_workers(key, fn)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved in case nobody else was waiting
+        future.exception()
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _in_flight.pop(key, None)
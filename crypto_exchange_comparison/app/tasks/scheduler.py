@@ -7,8 +7,10 @@ from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 from fastapi import BackgroundTasks
 
+from app.config.settings import settings
 from app.database.connection import get_db
-from app.services import data_service
+from app.services import arbitrage, data_service, price_matrix
+from app.services.db import price_service
 
 # Configure logging
 logging.basicConfig(
@@ -137,6 +139,34 @@ async def periodic_updates(interval_hours: int = 4):
             # Run update
             await update_all_task(db)
             
+            # Pick up the prices other workers have written since the last rebuild
+            price_matrix.rebuild(price_service.get_matrix_rows(db))
+            
             logger.info(f"Scheduled periodic data update completed")
         except Exception as e:
-            logger.error(f"Error in periodic update: {str(e)}") 
\ No newline at end of file
+            logger.error(f"Error in periodic update: {str(e)}")
+
+
+async def periodic_arbitrage_scans(interval_seconds: int = settings.ARBITRAGE_SCAN_INTERVAL):
+    """
+    Scan the price matrix for arbitrage opportunities periodically, so
+    /arbitrage requests find a recent scan.
+    
+    Args:
+        interval_seconds: Number of seconds between scans
+    """
+    while True:
+        try:
+            await asyncio.sleep(interval_seconds)
+            
+            # The scan is CPU-bound, keep it off the event loop
+            result = await asyncio.to_thread(arbitrage.scan)
+            
+            opportunities = result["opportunities"]
+            if opportunities:
+                logger.info(
+                    f"Arbitrage scan of {result['coins']} coins x {result['exchanges']} exchanges: "
+                    f"{len(opportunities)} opportunities, widest {opportunities[0]['net_spread_percent']:.2f}%"
+                )
+        except Exception as e:
+            logger.error(f"Error in arbitrage scan: {str(e)}")
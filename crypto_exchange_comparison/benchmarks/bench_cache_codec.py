@@ -0,0 +1,164 @@
+"""
+Benchmark: encode/decode time and stored size of cached CoinGecko payloads
+for each available codec and compression, against the plain JSON format the
+cache used before.
+
+Payloads are synthetic but shaped like the real responses: /coins/list
+(~14k small records), /exchanges and one page of /coins/markets.
+
+Stored size is the payload length. If REDIS_URL points at a reachable Redis
+server the MEMORY USAGE of each stored key is reported as well.
+
+Usage (from the crypto_exchange_comparison directory):
+    python -m benchmarks.bench_cache_codec [--repeat 20] [--threshold 1024]
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import redis
+
+from app.services import cache_codec
+from app.services.cache_codec import DateTimeEncoder
+
+
+def coins_list(count: int = 14000):
+    return [
+        {"id": f"coin-{i:05d}", "symbol": f"c{i}", "name": f"Coin Number {i}"}
+        for i in range(count)
+    ]
+
+
+def exchanges_list(count: int = 700):
+    rng = random.Random(1)
+    return [
+        {
+            "id": f"exchange_{i}",
+            "name": f"Exchange {i}",
+            "year_established": 2010 + i % 14,
+            "country": rng.choice(["United States", "Japan", "Cayman Islands", None]),
+            "description": "",
+            "url": f"https://exchange{i}.example.com",
+            "image": f"https://assets.coingecko.com/markets/images/{i}/small/logo.png",
+            "has_trading_incentive": False,
+            "trust_score": rng.randint(1, 10),
+            "trust_score_rank": i + 1,
+            "trade_volume_24h_btc": rng.uniform(1, 100000),
+            "trade_volume_24h_btc_normalized": rng.uniform(1, 100000),
+        }
+        for i in range(count)
+    ]
+
+
+def markets_page(count: int = 250):
+    rng = random.Random(2)
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "id": f"coin-{i}",
+            "symbol": f"c{i}",
+            "name": f"Coin {i}",
+            "image": f"https://assets.coingecko.com/coins/images/{i}/large/coin.png",
+            "current_price": rng.uniform(0.01, 60000),
+            "market_cap": rng.randint(10 ** 6, 10 ** 12),
+            "market_cap_rank": i + 1,
+            "fully_diluted_valuation": rng.randint(10 ** 6, 10 ** 12),
+            "total_volume": rng.randint(10 ** 4, 10 ** 10),
+            "high_24h": rng.uniform(0.01, 60000),
+            "low_24h": rng.uniform(0.01, 60000),
+            "price_change_24h": rng.uniform(-100, 100),
+            "price_change_percentage_24h": rng.uniform(-10, 10),
+            "market_cap_change_24h": rng.uniform(-10 ** 8, 10 ** 8),
+            "market_cap_change_percentage_24h": rng.uniform(-10, 10),
+            "circulating_supply": rng.uniform(10 ** 6, 10 ** 10),
+            "total_supply": rng.uniform(10 ** 6, 10 ** 10),
+            "max_supply": None,
+            "ath": rng.uniform(0.01, 70000),
+            "ath_change_percentage": rng.uniform(-99, 0),
+            "ath_date": now,
+            "atl": rng.uniform(0.0001, 1),
+            "atl_change_percentage": rng.uniform(0, 10 ** 5),
+            "atl_date": now,
+            "roi": None,
+            "last_updated": now,
+        }
+        for i in range(count)
+    ]
+
+
+PAYLOADS = {
+    "coingecko:coins": coins_list,
+    "coingecko:exchanges": exchanges_list,
+    "coingecko:markets:usd:250:1": markets_page,
+}
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-repeat wall time of fn in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def connect_redis():
+    client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    try:
+        client.ping()
+    except redis.RedisError:
+        return None
+    return client
+
+
+def memory_usage(client, key: str, data: bytes):
+    if client is None:
+        return None
+    client.set(key, data)
+    try:
+        return client.memory_usage(key)
+    finally:
+        client.delete(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--threshold", type=int, default=1024, help="compression threshold in bytes")
+    args = parser.parse_args()
+
+    client = connect_redis()
+    print(f"codecs: {', '.join(cache_codec.CODECS)}; compression: {', '.join(cache_codec.COMPRESSORS)}")
+    print(f"redis memory usage: {'measured' if client else 'unavailable (payload size only)'}")
+
+    for key, build in PAYLOADS.items():
+        value = build()
+        legacy = json.dumps(value, cls=DateTimeEncoder).encode()
+        print(f"\n{key}  ({len(value)} records)")
+        print(f"{'format':<16} {'bytes':>10} {'redis':>10} {'encode ms':>10} {'decode ms':>10}")
+
+        encode_ms = timed(lambda: json.dumps(value, cls=DateTimeEncoder).encode(), args.repeat)
+        decode_ms = timed(lambda: json.loads(legacy), args.repeat)
+        redis_bytes = memory_usage(client, f"bench:{key}", legacy)
+        print(f"{'legacy json':<16} {len(legacy):>10} {redis_bytes or '-':>10} {encode_ms:>10.2f} {decode_ms:>10.2f}")
+
+        for codec in cache_codec.CODECS.values():
+            for compressor in cache_codec.COMPRESSORS.values():
+                with patch.object(cache_codec, "active_codec", codec), \
+                     patch.object(cache_codec, "active_compressor", compressor), \
+                     patch.object(cache_codec.settings, "CACHE_COMPRESSION_MIN_BYTES", args.threshold):
+                    data, _ = cache_codec.encode(value)
+                    encode_ms = timed(lambda: cache_codec.encode(value), args.repeat)
+                decode_ms = timed(lambda: cache_codec.decode(data), args.repeat)
+                redis_bytes = memory_usage(client, f"bench:{key}", data)
+                label = f"{codec.name}+{compressor.name}"
+                print(f"{label:<16} {len(data):>10} {redis_bytes or '-':>10} {encode_ms:>10.2f} {decode_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark: /coins/search lookup latency of the prebuilt search index against
+the previous linear scan over the whole coin list, and of fuzzy (typo) queries
+against a brute-force edit distance scan.
+
+Uses a synthetic coin list the size of CoinGecko's /coins/list (~15k coins)
+and a 250-coin markets page, or a real /coins/list dump passed with
+--coins-file.
+
+Usage (from the crypto_exchange_comparison directory):
+    python -m benchmarks.bench_coin_search [--coins 15000] [--coins-file coins.json] [--repeat 200]
+"""
+import argparse
+import asyncio
+import json
+import random
+import string
+import time
+
+from app.services import search_index
+
+QUERIES = ["bitcoin", "eth", "sol", "doge", "usd", "chain", "xrp", "inu", "zz", "coin"]
+FUZZY_QUERIES = ["etherium", "bitcoim", "solanna", "dgoe", "shiab", "protocl", "finanse", "brigde", "xrp", "uds"]
+WORDS = [
+    "bitcoin", "ethereum", "solana", "doge", "shiba", "inu", "chain", "link", "swap", "finance",
+    "protocol", "token", "coin", "usd", "wrapped", "staked", "dao", "network", "meta", "verse",
+    "pepe", "cat", "ai", "bridge", "layer", "zero", "moon", "safe", "gold", "pay",
+]
+
+
+def synthetic_coins(count: int):
+    rng = random.Random(42)
+    coins = []
+    for i in range(count):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        name = " ".join(word.capitalize() for word in words)
+        symbol = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 6)))
+        coins.append({"id": f"{'-'.join(words)}-{i}", "symbol": symbol, "name": name})
+    return coins
+
+
+def markets_for(coins, count: int = 250):
+    return [
+        {"id": coin["id"], "market_cap_rank": rank + 1, "current_price": 1.0, "market_cap": 10 ** 9 - rank,
+         "image": "", "price_change_percentage_24h": 0.0}
+        for rank, coin in enumerate(coins[:count])
+    ]
+
+
+def linear_search(all_coins, market_coins, query, limit, existing_coin_ids):
+    """The scan /coins/search did before the index existed."""
+    market_coins_by_id = {coin["id"]: coin for coin in market_coins}
+    query = query.lower()
+    matching_coins = []
+    for coin in all_coins:
+        if coin["id"] in existing_coin_ids:
+            continue
+        if (query in coin["id"].lower() or
+                query in coin["symbol"].lower() or
+                query in coin["name"].lower()):
+            market_data = market_coins_by_id.get(coin["id"])
+            result = {"id": coin["id"], "symbol": coin["symbol"], "name": coin["name"],
+                      "has_market_data": market_data is not None}
+            if market_data:
+                result.update({
+                    "current_price": market_data.get("current_price"),
+                    "market_cap": market_data.get("market_cap"),
+                    "image": market_data.get("image"),
+                    "price_change_24h": market_data.get("price_change_percentage_24h"),
+                })
+            matching_coins.append(result)
+
+    def get_sort_key(coin):
+        has_market_data = 0 if coin.get("has_market_data") else 1
+        if coin["id"].lower() == query or coin["symbol"].lower() == query or coin["name"].lower() == query:
+            return (has_market_data, 0)
+        if (coin["id"].lower().startswith(query) or coin["symbol"].lower().startswith(query)
+                or coin["name"].lower().startswith(query)):
+            return (has_market_data, 1)
+        return (has_market_data, 2)
+
+    matching_coins.sort(key=get_sort_key)
+    return matching_coins[:limit]
+
+
+def brute_force_fuzzy(index, query):
+    """Coins with a term within the allowed distance, by comparing every term."""
+    query = query.lower()
+    max_distance = search_index.max_distance_for(query)
+    return {
+        index.ids[position]
+        for term, positions in zip(index.terms, index.term_positions)
+        if search_index.edit_distance(query, term, max_distance) <= max_distance
+        for position in positions
+    }
+
+
+def per_query_us(fn, repeat: int, queries=QUERIES) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - started) / (repeat * len(queries)) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--coins", type=int, default=15000)
+    parser.add_argument("--coins-file", help="JSON dump of CoinGecko /coins/list")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.coins_file:
+        with open(args.coins_file) as f:
+            coins = json.load(f)
+    else:
+        coins = synthetic_coins(args.coins)
+    markets = markets_for(coins)
+    existing = {coin["id"] for coin in coins[:50]}
+
+    started = time.perf_counter()
+    index = asyncio.run(search_index.get_coin_index(coins, markets))
+    print(f"coins={len(coins)}  n-grams={len(index.postings)}  terms={len(index.terms)}  "
+          f"deletes={len(index.deletes)}  build={time.perf_counter() - started:.3f}s")
+
+    started = time.perf_counter()
+    asyncio.run(search_index.get_coin_index(list(coins), list(markets)))
+    print(f"unchanged-list check (fingerprint): {(time.perf_counter() - started) * 1000:.2f}ms")
+
+    linear_us = per_query_us(lambda q: linear_search(coins, markets, q, 20, existing), max(1, args.repeat // 20))
+    index_us = per_query_us(lambda q: index.search(q, 20, exclude=existing), args.repeat)
+    print(f"linear scan: {linear_us:9.1f}us per query")
+    print(f"index:       {index_us:9.1f}us per query  (x{linear_us / index_us:.0f})")
+
+    brute_us = per_query_us(lambda q: brute_force_fuzzy(index, q), 1, FUZZY_QUERIES)
+    fuzzy_us = per_query_us(lambda q: index.fuzzy_search(q, 20, exclude=existing), args.repeat, FUZZY_QUERIES)
+    print(f"fuzzy brute: {brute_us:9.1f}us per query")
+    print(f"fuzzy index: {fuzzy_us:9.1f}us per query  (x{brute_us / fuzzy_us:.0f})")
+
+    for query in FUZZY_QUERIES:
+        assert {c["id"] for c in index.fuzzy_search(query, 10 ** 6)} == brute_force_fuzzy(index, query), query
+    for query in QUERIES:
+        assert {c["id"] for c in index.search(query, 10 ** 6, exclude=existing)} == \
+            {c["id"] for c in linear_search(coins, markets, query, 10 ** 6, existing)}, query
+
+
+if __name__ == "__main__":
+    main()
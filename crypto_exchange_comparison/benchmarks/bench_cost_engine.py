@@ -0,0 +1,87 @@
+"""
+Benchmark: time to price every exchange for a set of order sizes with the
+vectorized cost engine against the same model evaluated in a Python loop.
+
+Usage (from the crypto_exchange_comparison directory):
+    python -m benchmarks.bench_cost_engine [--exchanges 100] [--amounts 50] [--repeat 200]
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.config.settings import settings
+from app.models import schemas
+from app.services import cost_engine
+
+
+def synthetic_prices(count: int):
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    prices = []
+    for i in range(count):
+        price = 50000 * (1 + rng.uniform(-0.01, 0.01))
+        prices.append(schemas.ExchangePrice(
+            exchange_name=f"Exchange {i}",
+            price_usd=price,
+            volume_24h=10 ** rng.uniform(4, 10),
+            ask_price=price * (1 + rng.uniform(0, 0.002)),
+            trading_fee=rng.choice([None, 0.05, 0.1, 0.2, 0.5]),
+            withdrawal_fee=rng.choice([None, 1.0, 5.0, 25.0]),
+            last_updated=now,
+        ))
+    return prices
+
+
+def loop_costs(prices, amounts):
+    """The cost model, one exchange and amount at a time."""
+    costs = []
+    for amount in amounts:
+        row = []
+        for price in prices:
+            volume = price.volume_24h or 0
+            if volume <= 0:
+                row.append(math.inf)
+                continue
+            fill = (price.ask_price or price.price_usd) * (1 + settings.SLIPPAGE_IMPACT * math.sqrt(amount / volume))
+            row.append(fill * (1 + (price.trading_fee or 0) / 100 + (price.withdrawal_fee or 0) / amount))
+        costs.append(row)
+    return costs
+
+
+def per_call_us(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exchanges", type=int, default=100)
+    parser.add_argument("--amounts", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    prices = synthetic_prices(args.exchanges)
+    amounts = np.geomspace(100, 10_000_000, args.amounts)
+
+    def vectorized():
+        return cost_engine.effective_prices(*cost_engine.price_arrays(prices), amounts)
+
+    assert np.allclose(vectorized(), loop_costs(prices, amounts))
+
+    loop_us = per_call_us(lambda: loop_costs(prices, amounts), max(1, args.repeat // 10))
+    numpy_us = per_call_us(vectorized, args.repeat)
+    one_us = per_call_us(lambda: cost_engine.effective_prices(*cost_engine.price_arrays(prices), amounts[:1]), args.repeat)
+    print(f"exchanges={args.exchanges}  amounts={args.amounts}")
+    print(f"python loop: {loop_us:9.1f}us")
+    print(f"numpy:       {numpy_us:9.1f}us  (x{loop_us / numpy_us:.0f})")
+    print(f"numpy, one amount: {one_us:9.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark: per-request CoinGecko latency during a full price update run,
+comparing a fresh httpx client per request against the shared pooled client.
+
+A local stub server stands in for CoinGecko, so nothing leaves the machine.
+The stub speaks plain HTTP, so the saving shown is only the TCP handshake and
+client setup; against the real API each new connection also pays a TLS
+handshake, which makes the difference considerably larger.
+
+Usage (from the crypto_exchange_comparison directory):
+    python -m benchmarks.bench_http_client [--coins 100] [--exchanges 20] [--concurrency 1]
+
+Concurrency defaults to 1 so that latencies are not inflated by requests
+queueing behind database writes on the event loop.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, patch
+
+# Point the app at a throwaway SQLite database before any app module is imported
+_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file.name}"
+
+import httpx  # noqa: E402
+
+from app.database.connection import Base, SessionLocal, engine  # noqa: E402
+from app.models import models  # noqa: E402
+from app.services import cache, coingecko, data_service  # noqa: E402
+from app.services.rate_limiter import TokenBucket  # noqa: E402
+
+
+def build_tickers_payload(exchange_names):
+    """Build a /coins/{id}/tickers style payload with one ticker per exchange."""
+    return json.dumps({
+        "name": "Stub",
+        "tickers": [
+            {
+                "market": {"name": name, "identifier": name.lower()},
+                "converted_last": {"usd": 100.0 + i},
+                "converted_volume": {"usd": 1_000_000.0 - i},
+                "bid": 99.5 + i,
+                "ask": 100.5 + i,
+                "bid_ask_spread_percentage": 1.0,
+            }
+            for i, name in enumerate(exchange_names)
+        ],
+    }).encode()
+
+
+def start_stub_server(payload: bytes) -> ThreadingHTTPServer:
+    """Start a keep-alive capable HTTP/1.1 stub server on a free local port."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def seed_database(coin_count: int, exchange_names):
+    """Create tables and insert the coins and exchanges the update run will touch."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(models.Exchange(name=name) for name in exchange_names)
+    db.add_all(
+        models.Coin(coingecko_id=f"coin-{i:04d}", symbol=f"C{i}", name=f"Coin {i:04d}")
+        for i in range(coin_count)
+    )
+    db.commit()
+    db.close()
+
+
+class OneShotClient:
+    """Mimics the old behaviour: a brand-new AsyncClient for every request."""
+
+    async def get(self, url, params=None):
+        async with httpx.AsyncClient() as client:
+            return await client.get(url, params=params, timeout=10.0)
+
+
+async def run_update(coin_count: int, exchange_names, pooled: bool, concurrency: int):
+    """
+    Run data_service.update_prices once and collect per-request latencies.
+
+    The upstream rate limiter is lifted so the run measures the HTTP path only.
+    """
+    seed_database(coin_count, exchange_names)
+    latencies = []
+    original_request = coingecko.make_api_request
+
+    async def timed_request(url, params=None):
+        start = time.perf_counter()
+        try:
+            return await original_request(url, params)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    client_factory = coingecko.get_client if pooled else OneShotClient
+    db = SessionLocal()
+    started = time.perf_counter()
+    with patch.object(coingecko, "make_api_request", timed_request), \
+         patch.object(coingecko, "get_client", client_factory), \
+         patch.object(cache, "aget_cache", AsyncMock(return_value=None)), \
+         patch.object(cache, "aset_cache", AsyncMock()), \
+         patch.object(coingecko, "coingecko_limiter", TokenBucket(10 ** 9)):
+        updated = await data_service.update_prices(db, concurrency=concurrency)
+    total = time.perf_counter() - started
+    db.close()
+    await coingecko.close_client()
+    return updated, total, latencies
+
+
+def report(label: str, updated: int, total: float, latencies):
+    ms = sorted(latency * 1000 for latency in latencies)
+    p95 = ms[int(len(ms) * 0.95) - 1] if ms else 0.0
+    print(
+        f"{label:<22} requests={len(ms):>5}  rows={updated:>6}  total={total:7.3f}s  "
+        f"mean={statistics.mean(ms):6.3f}ms  p50={statistics.median(ms):6.3f}ms  p95={p95:6.3f}ms"
+    )
+    return statistics.mean(ms)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--coins", type=int, default=100, help="Coins to refresh (update_prices reads up to 100)")
+    parser.add_argument("--exchanges", type=int, default=20, help="Tickers per coin")
+    parser.add_argument("--concurrency", type=int, default=1, help="Coins fetched at the same time")
+    args = parser.parse_args()
+
+    exchange_names = [f"Exchange {i:03d}" for i in range(args.exchanges)]
+    server = start_stub_server(build_tickers_payload(exchange_names))
+    coingecko.COINGECKO_API_URL = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        fresh_mean = report("client per request", *await run_update(args.coins, exchange_names, False, args.concurrency))
+        pooled_mean = report("shared pooled client", *await run_update(args.coins, exchange_names, True, args.concurrency))
+        print(f"per-request latency drop: {fresh_mean - pooled_mean:.3f}ms ({(1 - pooled_mean / fresh_mean) * 100:.1f}%)")
+    finally:
+        server.shutdown()
+        os.unlink(_db_file.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Benchmark: a cross-coin query (the cheapest ask of every coin) answered by
+loading Price objects through the ORM against the in-memory price matrix,
+plus the cost of rebuilding the matrix and of applying one coin's update.
+
+Runs against a throwaway SQLite file.
+
+Usage (from the crypto_exchange_comparison directory):
+    python -m benchmarks.bench_price_matrix [--coins 1000] [--exchanges 100] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Point the app at a throwaway SQLite database before any app module is imported
+_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file.name}"
+
+import numpy as np  # noqa: E402
+
+from app.database.connection import Base, SessionLocal, engine  # noqa: E402
+from app.models import models  # noqa: E402
+from app.services import price_matrix  # noqa: E402
+from app.services.db import price_service  # noqa: E402
+
+
+def price_rows(coin_id: int, exchange_ids, rng: random.Random):
+    now = datetime.now(timezone.utc)
+    rows = []
+    for exchange_id in exchange_ids:
+        price = 100.0 * (1 + rng.uniform(-0.01, 0.01))
+        rows.append({
+            "exchange_id": exchange_id,
+            "coin_id": coin_id,
+            "price_usd": price,
+            "volume_24h": rng.uniform(1e4, 1e9),
+            "bid_price": price * 0.999,
+            "ask_price": price * 1.001,
+            "last_updated": now,
+        })
+    return rows
+
+
+def seed_database(coin_count: int, exchange_count: int):
+    """Recreate the tables and store a price for every coin x exchange pair."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(models.Exchange(name=f"Exchange {i:03d}") for i in range(exchange_count))
+    db.add_all(
+        models.Coin(coingecko_id=f"coin-{i:04d}", symbol=f"C{i}", name=f"Coin {i:04d}")
+        for i in range(coin_count)
+    )
+    db.commit()
+    coin_ids = [coin.id for coin in db.query(models.Coin).all()]
+    exchange_ids = [exchange.id for exchange in db.query(models.Exchange).all()]
+    rng = random.Random(42)
+    rows = [row for coin_id in coin_ids for row in price_rows(coin_id, exchange_ids, rng)]
+    price_service.bulk_upsert(db, rows)
+    db.close()
+    return coin_ids, exchange_ids, rng
+
+
+def orm_best_asks(db):
+    """The cheapest ask of every coin, from Price objects."""
+    db.expire_all()
+    best = {}
+    for price in db.query(models.Price).all():
+        if price.ask_price is not None and price.ask_price < best.get(price.coin_id, float("inf")):
+            best[price.coin_id] = price.ask_price
+    return best
+
+
+def matrix_best_asks():
+    """The cheapest ask of every coin, from the price matrix."""
+    coin_ids, _, columns = price_matrix.get_matrix().snapshot(["ask_price"])
+    asks = np.where(np.isnan(columns["ask_price"]), np.inf, columns["ask_price"]).min(axis=1)
+    return dict(zip(coin_ids, asks.tolist()))
+
+
+def per_call_ms(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--coins", type=int, default=1000)
+    parser.add_argument("--exchanges", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        coin_ids, exchange_ids, rng = seed_database(args.coins, args.exchanges)
+        db = SessionLocal()
+
+        rebuild_ms = per_call_ms(lambda: price_matrix.rebuild(price_service.get_matrix_rows(db)), 1)
+        assert orm_best_asks(db) == matrix_best_asks()
+
+        update = price_rows(coin_ids[0], exchange_ids, rng)
+        apply_ms = per_call_ms(lambda: price_matrix.apply(update), args.repeat * 10)
+        orm_ms = per_call_ms(lambda: orm_best_asks(db), max(1, args.repeat // 10))
+        matrix_ms = per_call_ms(matrix_best_asks, args.repeat)
+
+        print(f"coins={args.coins}  exchanges={args.exchanges}  prices={args.coins * args.exchanges}")
+        print(f"rebuild from table:       {rebuild_ms:9.1f}ms")
+        print(f"apply one coin's update:  {apply_ms:9.3f}ms")
+        print(f"best asks via ORM:        {orm_ms:9.1f}ms")
+        print(f"best asks via matrix:     {matrix_ms:9.1f}ms  (x{orm_ms / matrix_ms:.0f})")
+        db.close()
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == "__main__":
+    main()
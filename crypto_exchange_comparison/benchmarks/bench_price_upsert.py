@@ -0,0 +1,112 @@
+"""
+Benchmark: price write throughput (rows per second) of the per-row
+price_service.update_or_create path against price_service.bulk_upsert.
+
+Each run writes every coin x exchange pair twice: a first pass that inserts
+the rows and a second pass that updates them, which is the steady state of
+the scheduler. Like the ingestion code, the bulk path commits once per coin.
+
+Runs against a throwaway SQLite file by default. Set BENCH_DATABASE_URL to a
+PostgreSQL URL to measure the ON CONFLICT path there (tables are recreated).
+
+Usage (from the crypto_exchange_comparison directory):
+    python -m benchmarks.bench_price_upsert [--coins 50] [--exchanges 80]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+_db_file = None
+if "BENCH_DATABASE_URL" in os.environ:
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    # Point the app at a throwaway SQLite database before any app module is imported
+    _db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_file.name}"
+
+from app.database.connection import Base, SessionLocal, engine  # noqa: E402
+from app.models import models  # noqa: E402
+from app.services.db import price_service  # noqa: E402
+
+
+def seed_database(coin_count: int, exchange_count: int):
+    """Recreate the tables and insert the coins and exchanges prices refer to."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(models.Exchange(name=f"Exchange {i:03d}") for i in range(exchange_count))
+    db.add_all(
+        models.Coin(coingecko_id=f"coin-{i:04d}", symbol=f"C{i}", name=f"Coin {i:04d}")
+        for i in range(coin_count)
+    )
+    db.commit()
+    coin_ids = [coin.id for coin in db.query(models.Coin).all()]
+    exchange_ids = [exchange.id for exchange in db.query(models.Exchange).all()]
+    db.close()
+    return coin_ids, exchange_ids
+
+
+def price_rows(coin_id: int, exchange_ids, generation: int):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "exchange_id": exchange_id,
+            "coin_id": coin_id,
+            "price_usd": 100.0 + generation + i,
+            "volume_24h": 1_000_000.0 - i,
+            "bid_price": 99.5 + generation + i,
+            "ask_price": 100.5 + generation + i,
+            "last_updated": now,
+        }
+        for i, exchange_id in enumerate(exchange_ids)
+    ]
+
+
+def write_per_row(db, coin_ids, exchange_ids, generation: int):
+    for coin_id in coin_ids:
+        for row in price_rows(coin_id, exchange_ids, generation):
+            filter_data = {"exchange_id": row.pop("exchange_id"), "coin_id": row.pop("coin_id")}
+            price_service.update_or_create(db, filter_data, row)
+
+
+def write_bulk(db, coin_ids, exchange_ids, generation: int):
+    for coin_id in coin_ids:
+        price_service.bulk_upsert(db, price_rows(coin_id, exchange_ids, generation))
+
+
+def run(label: str, writer, coin_count: int, exchange_count: int):
+    coin_ids, exchange_ids = seed_database(coin_count, exchange_count)
+    rows = len(coin_ids) * len(exchange_ids)
+    db = SessionLocal()
+    results = []
+    for generation, phase in enumerate(("insert", "update")):
+        started = time.perf_counter()
+        writer(db, coin_ids, exchange_ids, generation)
+        elapsed = time.perf_counter() - started
+        results.append(rows / elapsed)
+        print(f"{label:<10} {phase:<7} rows={rows:>6}  time={elapsed:7.3f}s  rows/s={rows / elapsed:10.0f}")
+    assert db.query(models.Price).count() == rows
+    db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--coins", type=int, default=50)
+    parser.add_argument("--exchanges", type=int, default=80)
+    args = parser.parse_args()
+
+    print(f"database: {engine.dialect.name}")
+    try:
+        per_row = run("per-row", write_per_row, args.coins, args.exchanges)
+        bulk = run("bulk", write_bulk, args.coins, args.exchanges)
+        print(f"speedup: insert x{bulk[0] / per_row[0]:.1f}, update x{bulk[1] / per_row[1]:.1f}")
+    finally:
+        if _db_file is not None:
+            os.unlink(_db_file.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: CPU time per cache hit of the rendered response cache against
+re-validating and re-serializing a cached value through the response model.
+
+The "model" path is what FastAPI does when a route returns a cached dict or
+ORM objects: validate against response_model, serialize, render JSONResponse.
+The "bytes" path is response_cache.get() answering from the local tier.
+
+Usage (from the crypto_exchange_comparison directory):
+    python -m benchmarks.bench_response_cache [--iterations 2000] [--exchanges 50] [--coins 1000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import List
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Point the app at a throwaway SQLite database before any app module is imported
+_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file.name}"
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from app.models import models, schemas  # noqa: E402
+from app.services import cache, response_cache  # noqa: E402
+
+
+def comparison_payload(exchange_count: int):
+    now = datetime.now(timezone.utc)
+    exchanges = [
+        {
+            "exchange_name": f"Exchange {i}",
+            "price_usd": 50000.0 + i,
+            "volume_24h": 1_000_000.0 + i,
+            "bid_price": 49990.0 + i,
+            "ask_price": 50010.0 + i,
+            "trading_fee": 0.1,
+            "withdrawal_fee": 0.0005,
+            "last_updated": now,
+            "spread": 0.04,
+        }
+        for i in range(exchange_count)
+    ]
+    return schemas.ComparisonResult(
+        coin="Bitcoin", exchanges=exchanges, best_price=exchanges[0], best_for_large_orders=exchanges[0]
+    ).model_dump()
+
+
+def coin_rows(count: int):
+    now = datetime.now(timezone.utc)
+    return [
+        models.Coin(id=i, coingecko_id=f"coin-{i}", symbol=f"C{i}", name=f"Coin {i}", created_at=now, updated_at=now)
+        for i in range(count)
+    ]
+
+
+def make_request(path: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")],
+    })
+
+
+async def cpu_per_call(fn, iterations: int) -> float:
+    """CPU microseconds per awaited call."""
+    started = time.process_time()
+    for _ in range(iterations):
+        await fn()
+    return (time.process_time() - started) / iterations * 1_000_000
+
+
+async def run(label: str, response_type, adapter: TypeAdapter, value, path: str, iterations: int):
+    field = create_response_field(name=f"Response_{label}", type_=response_type)
+
+    async def via_model():
+        content = await serialize_response(field=field, response_content=value, is_coroutine=True)
+        return JSONResponse(content)
+
+    request = make_request(path)
+    key = response_cache.cache_key(request)
+    # Store through a stub Redis; hits are then answered from the local tier
+    pipe = MagicMock(execute=AsyncMock())
+    with patch.object(cache, "async_redis_client", AsyncMock(pipeline=MagicMock(return_value=pipe))):
+        await response_cache.store(request, key, response_cache.render(adapter, value), 3600)
+
+    async def via_bytes():
+        return await response_cache.get(request, key)
+
+    model_us = await cpu_per_call(via_model, iterations)
+    bytes_us = await cpu_per_call(via_bytes, iterations)
+    print(f"{label:<12} model={model_us:9.1f}us  bytes={bytes_us:7.1f}us  saved={model_us - bytes_us:9.1f}us per hit "
+          f"(x{model_us / bytes_us:.0f})")
+
+
+async def main_async(args):
+    await run(
+        "compare", schemas.ComparisonResult, TypeAdapter(schemas.ComparisonResult),
+        comparison_payload(args.exchanges), "/compare/bitcoin", args.iterations,
+    )
+    await run(
+        "coins", List[schemas.Coin], TypeAdapter(List[schemas.Coin]),
+        coin_rows(args.coins), "/coins/", max(1, args.iterations // 10),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--exchanges", type=int, default=50)
+    parser.add_argument("--coins", type=int, default=1000)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark: CPU time and memory of reducing CoinGecko tickers to the best
+ticker per exchange, with slotted TickerRecords against the previous dict
+entries that kept a reference to the whole raw ticker. Covers the list path
+(filter_best_tickers, /compare) and the streaming path (price updates),
+which used to build an extracted dict for every ticker.
+
+"retained" is what is still allocated once the raw ticker pages are
+dropped: the dict entries keep every winning raw ticker alive, records
+keep only their own fields.
+
+Usage (from the crypto_exchange_comparison directory):
+    python -m benchmarks.bench_ticker_records [--tickers 10000] [--exchanges 400] [--repeat 20]
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from app.services import coingecko_processor
+
+
+def synthetic_tickers(count: int, exchanges: int):
+    """Tickers shaped like /coins/{id}/tickers entries."""
+    rng = random.Random(7)
+    tickers = []
+    for i in range(count):
+        exchange = rng.randrange(exchanges)
+        price = rng.uniform(49000, 51000)
+        volume = rng.uniform(1e3, 1e9)
+        tickers.append({
+            "base": "BTC",
+            "target": rng.choice(["USDT", "USD", "EUR", "BUSD", "FDUSD"]),
+            "market": {
+                "name": f"Exchange {exchange}",
+                "identifier": f"exchange_{exchange}",
+                "has_trading_incentive": False,
+            },
+            "last": price,
+            "volume": volume / price,
+            "converted_last": {"btc": 1.0, "eth": 18.2, "usd": price},
+            "converted_volume": {"btc": volume / price, "eth": volume / price * 18.2, "usd": volume},
+            "trust_score": "green",
+            "bid_ask_spread_percentage": rng.uniform(0.01, 1),
+            "timestamp": "2024-01-01T00:00:00+00:00",
+            "last_traded_at": "2024-01-01T00:00:00+00:00",
+            "last_fetch_at": "2024-01-01T00:00:00+00:00",
+            "is_anomaly": False,
+            "is_stale": False,
+            "trade_url": f"https://exchange{exchange}.example.com/trade/BTC_USDT",
+            "token_info_url": None,
+            "coin_id": "bitcoin",
+            "target_coin_id": "tether",
+            "bid": price - 1,
+            "ask": price + 1,
+        })
+    return tickers
+
+
+def legacy_process(tickers):
+    """The dict-based reduction used before TickerRecord."""
+    exchange_data = {}
+    for ticker in tickers:
+        exchange_name = ticker.get("market", {}).get("name")
+        if not exchange_name:
+            continue
+        volume = ticker.get("converted_volume", {}).get("usd", 0)
+        if exchange_name in exchange_data and volume <= exchange_data[exchange_name]["volume"]:
+            continue
+        exchange_data[exchange_name] = {
+            "name": exchange_name,
+            "price": ticker.get("converted_last", {}).get("usd", 0),
+            "volume": volume,
+            "bid": ticker.get("bid"),
+            "ask": ticker.get("ask"),
+            "spread": ticker.get("bid_ask_spread_percentage"),
+            "ticker": ticker,
+        }
+    return exchange_data
+
+
+def legacy_stream(tickers):
+    """The streaming reduction used before TickerRecord: one extracted dict per ticker."""
+    exchange_data = {}
+    for ticker in tickers:
+        exchange_name = ticker.get("market", {}).get("name")
+        if not exchange_name:
+            continue
+        ticker_data = {
+            "name": exchange_name,
+            "price": ticker.get("converted_last", {}).get("usd", 0),
+            "volume": ticker.get("converted_volume", {}).get("usd", 0),
+            "bid": ticker.get("bid"),
+            "ask": ticker.get("ask"),
+            "depth_up_usd": ticker.get("cost_to_move_up_usd"),
+            "depth_down_usd": ticker.get("cost_to_move_down_usd"),
+            "ticker": ticker,
+        }
+        if exchange_name in exchange_data and ticker_data["volume"] <= exchange_data[exchange_name]["volume"]:
+            continue
+        exchange_data[exchange_name] = ticker_data
+    return exchange_data
+
+
+def record_stream(tickers):
+    """The streaming reduction with records: what afilter_best_tickers(iter_coin_tickers()) does per ticker."""
+    best = {}
+    for ticker in tickers:
+        record = coingecko_processor.normalize_ticker(ticker)
+        if record is not None:
+            current = best.get(record.name)
+            if current is None or record.volume > current.volume:
+                best[record.name] = record
+    return best
+
+
+def cpu_ms(fn, tickers, repeat: int) -> float:
+    """Best-of-repeat CPU time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn(tickers)
+        best = min(best, time.process_time() - started)
+    return best * 1000
+
+
+def memory(fn, args) -> tuple:
+    """(peak bytes while processing, bytes retained after the raw tickers are dropped)."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tickers = synthetic_tickers(args.tickers, args.exchanges)
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    result = fn(tickers)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    del tickers
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    assert result
+    return peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=10000)
+    parser.add_argument("--exchanges", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tickers = synthetic_tickers(args.tickers, args.exchanges)
+    legacy = legacy_process(tickers)
+    records = coingecko_processor.filter_best_tickers(tickers)
+    assert {name: entry["price"] for name, entry in legacy.items()} == \
+        {name: record.price for name, record in records.items()}
+
+    entry = next(iter(legacy.values()))
+    record = next(iter(records.values()))
+    print(f"tickers={args.tickers}  exchanges kept={len(records)}")
+    print(f"entry size:  dict={sys.getsizeof(entry)}B (+ raw ticker)  record={sys.getsizeof(record)}B")
+
+    del tickers
+    for label, fn in (
+        ("list, dicts", legacy_process),
+        ("list, records", coingecko_processor.filter_best_tickers),
+        ("stream, dicts", legacy_stream),
+        ("stream, records", record_stream),
+    ):
+        tickers = synthetic_tickers(args.tickers, args.exchanges)
+        cpu = cpu_ms(fn, tickers, args.repeat)
+        del tickers
+        peak, retained = memory(fn, args)
+        print(f"{label:<16} cpu={cpu:7.2f}ms  peak={peak / 1024:8.1f}KiB  retained={retained / 1024:8.1f}KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,49 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.database.connection import get_db, Base
+from app.database.connection import get_async_db, get_db, Base
+from app.services import cache, price_matrix
 
-# Use an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    """Start every test with an empty in-process cache tier"""
+    cache.local_cache.clear()
+    yield
+    cache.local_cache.clear()
+
+@pytest.fixture(autouse=True)
+def empty_price_matrix():
+    """Start every test with an empty in-memory price matrix"""
+    price_matrix.rebuild([])
+    yield
+
+@pytest.fixture
+def database_path(tmp_path):
+    """
+    Path of a fresh SQLite database file for each test.
+
+    A file (rather than :memory:) lets the sync engine and the aiosqlite
+    engine used by async routes see the same data.
+    """
+    return tmp_path / "test.db"
 
 @pytest.fixture
-def test_db():
+def test_db(database_path):
     """Create a fresh database for each test"""
     engine = create_engine(
-        SQLALCHEMY_DATABASE_URL,
+        f"sqlite:///{database_path}",
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
     )
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    
+
     # Create the tables
     Base.metadata.create_all(bind=engine)
-    
+
     # Create a new session for testing
     db = TestingSessionLocal()
     try:
@@ -31,21 +52,34 @@ def test_db():
         db.close()
         # Drop all tables after the test
         Base.metadata.drop_all(bind=engine)
+        engine.dispose()
 
 @pytest.fixture
-def client(test_db):
+def async_session_factory(database_path, test_db):
+    """Async session factory bound to the same database as test_db"""
+    # NullPool: aiosqlite connections must not outlive the event loop that opened them
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool)
+    yield async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+@pytest.fixture
+def client(test_db, async_session_factory):
     """Create a test client with the test database"""
     def override_get_db():
         try:
             yield test_db
         finally:
             pass
-    
-    # Override the get_db dependency
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    # Override the get_db dependencies
     app.dependency_overrides[get_db] = override_get_db
-    
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
     with TestClient(app) as client:
         yield client
-        
+
     # Remove the override
-    app.dependency_overrides = {} 
\ No newline at end of file
+    app.dependency_overrides = {}
@@ -0,0 +1,139 @@
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.models.models import Coin, Exchange
+from app.services import arbitrage, price_matrix
+from app.services.db import price_service
+
+
+def scan_columns(rows):
+    return price_matrix.build(rows).snapshot(arbitrage.SCAN_COLUMNS)
+
+
+def price(coin_id, exchange_id, bid, ask, trading_fee=None, withdrawal_fee=None, last_updated=None):
+    return {
+        "coin_id": coin_id,
+        "exchange_id": exchange_id,
+        "price_usd": ask or bid,
+        "bid_price": bid,
+        "ask_price": ask,
+        "trading_fee": trading_fee,
+        "withdrawal_fee": withdrawal_fee,
+        "last_updated": last_updated or datetime.now(timezone.utc),
+    }
+
+
+def test_find_opportunities_nets_fees_and_orders_by_spread():
+    """Test that each coin's best pair is found after fees and the widest come first"""
+    coin_ids, exchange_ids, columns = scan_columns([
+        price(1, 10, 99, 100, trading_fee=0.1, withdrawal_fee=10),
+        price(1, 20, 103, 104, trading_fee=0.1),
+        price(2, 10, 200, 201),
+        price(2, 20, 202, 203),
+        # Sell side after fees is below the buy cost
+        price(3, 10, 50, 50.1, trading_fee=1),
+        price(3, 20, 50.2, 50.3, trading_fee=1),
+    ])
+
+    opportunities = arbitrage.find_opportunities(coin_ids, exchange_ids, columns)
+
+    assert [o["coin_id"] for o in opportunities] == [1, 2]
+    best = opportunities[0]
+    assert (best["buy_exchange_id"], best["sell_exchange_id"]) == (10, 20)
+    assert (best["buy_price"], best["sell_price"]) == (100, 103)
+    assert best["gross_spread_percent"] == pytest.approx(3)
+    buy_cost = 100 * (1 + 0.001 + 10 / arbitrage.settings.ARBITRAGE_NOTIONAL_USD)
+    assert best["net_spread_percent"] == pytest.approx((103 * 0.999 - buy_cost) / buy_cost * 100)
+    assert len(arbitrage.find_opportunities(coin_ids, exchange_ids, columns, limit=1)) == 1
+
+
+def test_find_opportunities_skips_stale_and_missing_quotes():
+    """Test that old prices, missing quotes and single-exchange gaps are left out"""
+    old = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    coin_ids, exchange_ids, columns = scan_columns([
+        price(1, 10, 99, 100),
+        price(1, 20, 150, 151, last_updated=old),
+        # A crossed book on a single exchange is not an arbitrage between exchanges
+        price(2, 10, 101, 100),
+        price(2, 20, None, None),
+    ])
+
+    assert arbitrage.find_opportunities(coin_ids, exchange_ids, columns, max_age=3600, now=time.time()) == []
+    assert [o["coin_id"] for o in arbitrage.find_opportunities(coin_ids, exchange_ids, columns)] == [1]
+    assert arbitrage.find_opportunities([], [], {}) == []
+
+
+def test_find_opportunities_when_one_exchange_has_best_bid_and_ask():
+    """Test that a crossed quote on one exchange does not hide the spread to another exchange"""
+    coin_ids, exchange_ids, columns = scan_columns([
+        # Crossed: lowest ask and highest bid
+        price(1, 10, 110, 100),
+        price(1, 20, 101, 102),
+        price(1, 30, 104, 105),
+    ])
+
+    [opportunity] = arbitrage.find_opportunities(coin_ids, exchange_ids, columns)
+
+    # Selling on the crossed exchange after buying at the cheapest other ask
+    # beats buying there and selling at the richest other bid (4%)
+    assert (opportunity["buy_exchange_id"], opportunity["sell_exchange_id"]) == (20, 10)
+    assert opportunity["net_spread_percent"] == pytest.approx((110 - 102) / 102 * 100)
+
+
+def test_find_opportunities_scales_to_full_universe():
+    """Test a 1000 coin x 100 exchange scan against a per-coin pairwise check"""
+    rng = np.random.default_rng(0)
+    shape = (1000, 100)
+    mid = rng.uniform(1, 1000, (shape[0], 1)) * rng.uniform(0.98, 1.02, shape)
+    columns = {
+        "bid_price": mid * 0.999,
+        "ask_price": mid * 1.001,
+        "trading_fee": rng.choice([0.1, 0.2, np.nan], shape),
+        "withdrawal_fee": rng.choice([0.0, 5.0, np.nan], shape),
+        "last_updated": np.full(shape, time.time()),
+    }
+    coin_ids, exchange_ids = list(range(shape[0])), list(range(shape[1]))
+
+    started = time.perf_counter()
+    opportunities = arbitrage.find_opportunities(coin_ids, exchange_ids, columns, limit=10)
+    assert time.perf_counter() - started < 1
+
+    fees = np.nan_to_num(columns["trading_fee"]) / 100
+    withdrawal = np.nan_to_num(columns["withdrawal_fee"]) / arbitrage.settings.ARBITRAGE_NOTIONAL_USD
+    row = opportunities[0]["coin_id"]
+    pairwise = max(
+        (columns["bid_price"][row, j] * (1 - fees[row, j]) - columns["ask_price"][row, i] * (1 + fees[row, i] + withdrawal[row, i]))
+        / (columns["ask_price"][row, i] * (1 + fees[row, i] + withdrawal[row, i])) * 100
+        for i in range(shape[1]) for j in range(shape[1]) if i != j
+    )
+    assert opportunities[0]["net_spread_percent"] == pytest.approx(pairwise)
+    spreads = [o["net_spread_percent"] for o in opportunities]
+    assert spreads == sorted(spreads, reverse=True)
+
+
+def test_get_arbitrage_opportunities(client, test_db):
+    """Test that stored prices are scanned and described with coin and exchange names"""
+    binance = Exchange(name="Binance")
+    kraken = Exchange(name="Kraken")
+    bitcoin = Coin(coingecko_id="bitcoin", symbol="BTC", name="Bitcoin")
+    test_db.add_all([binance, kraken, bitcoin])
+    test_db.commit()
+    price_matrix.rebuild([])
+    price_service.bulk_upsert(test_db, [
+        price(bitcoin.id, binance.id, 49900, 50000),
+        price(bitcoin.id, kraken.id, 50500, 50600),
+    ])
+
+    response = client.get("/arbitrage/")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["coins"], data["exchanges"]) == (1, 2)
+    [opportunity] = data["opportunities"]
+    assert opportunity["coin_id"] == "bitcoin"
+    assert (opportunity["buy_exchange"], opportunity["sell_exchange"]) == ("Binance", "Kraken")
+    assert opportunity["net_spread_percent"] == pytest.approx(1)
+    assert client.get("/arbitrage/?min_spread=5").json()["opportunities"] == []
@@ -1,8 +1,14 @@
+import asyncio
+import time
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 import json
 
-from app.services.cache import get_cache, set_cache, delete_cache, clear_cache_pattern
+from app.services import cache, cache_codec
+from app.services.cache import (
+    LocalCache, get_cache, set_cache, delete_cache, clear_cache_pattern, handle_invalidation, local_cache,
+    aget_cache, aset_cache, aclear_cache_pattern, aget_many, aset_many, aget_with_revalidation
+)
 
 @patch('app.services.cache.redis_client')
 def test_get_cache_hit(mock_redis):
@@ -37,7 +43,10 @@ def test_set_cache(mock_redis):
     set_cache("test_key", {"test": "data"}, 60)
     
     # Check that Redis client was called correctly
-    mock_redis.setex.assert_called_once_with("test_key", 60, json.dumps({"test": "data"}))
+    mock_redis.setex.assert_called_once()
+    key, expiry, data = mock_redis.setex.call_args.args
+    assert (key, expiry) == ("test_key", 60)
+    assert cache_codec.decode(data)[0] == {"test": "data"}
 
 @patch('app.services.cache.redis_client')
 def test_delete_cache(mock_redis):
@@ -59,4 +68,250 @@ def test_clear_cache_pattern(mock_redis):
     
     # Check that Redis client was called correctly
     mock_redis.scan_iter.assert_called_once_with("test_pattern*")
-    assert mock_redis.delete.call_count == 2 
\ No newline at end of file
+    assert mock_redis.delete.call_count == 2 
+
+@patch('app.services.cache.redis_client')
+def test_get_cache_served_from_local_tier(mock_redis):
+    """Test that a second lookup is answered in-process without a Redis round-trip"""
+    mock_redis.get.return_value = json.dumps({"test": "data"})
+
+    assert get_cache("coingecko:coins") == {"test": "data"}
+    assert get_cache("coingecko:coins") == {"test": "data"}
+
+    mock_redis.get.assert_called_once_with("coingecko:coins")
+    stats = local_cache.stats()["prefixes"]["coingecko"]
+    assert stats["l2_hits"] == 1
+    assert stats["l1_hits"] == 1
+
+def test_local_cache_evicts_least_recently_used():
+    """Test LRU eviction by entry count and by payload size"""
+    lru = LocalCache(max_entries=2, max_bytes=100, default_ttl=60)
+    lru.set("a:1", 1, size=10)
+    lru.set("a:2", 2, size=10)
+    lru.get("a:1")  # a:2 is now the least recently used
+    lru.set("a:3", 3, size=10)
+
+    assert lru.get("a:2") == (False, None)
+    assert lru.get("a:1") == (True, 1)
+
+    lru.set("b:big", 4, size=95)  # Pushes everything else out to fit the byte budget
+    assert lru.stats()["entries"] == 1
+    assert lru.stats()["prefixes"]["a"]["evictions"] == 3
+
+def test_local_cache_expires_entries():
+    """Test that entries are dropped once their TTL has passed"""
+    lru = LocalCache(max_entries=10, max_bytes=100, default_ttl=60)
+    lru.set("a:1", 1, size=1, ttl=0)
+
+    assert lru.get("a:1") == (False, None)
+
+def test_invalidation_from_other_worker_drops_local_entry():
+    """Test that invalidation messages from other workers clear local entries"""
+    local_cache.set("compare:bitcoin:default", {"stale": True}, size=10)
+    local_cache.set("compare:ethereum:default", {"stale": True}, size=10)
+
+    handle_invalidation({"data": json.dumps({"origin": "other-worker", "keys": ["compare:bitcoin:default"]})})
+    assert local_cache.get("compare:bitcoin:default") == (False, None)
+
+    handle_invalidation({"data": json.dumps({"origin": "other-worker", "keys": [], "pattern": "compare:"})})
+    assert local_cache.get("compare:ethereum:default") == (False, None)
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_aget_cache_and_aset_cache(mock_redis):
+    """Test the async helpers read and write through the asyncio client"""
+    mock_redis.get.return_value = json.dumps({"test": "data"}).encode()
+
+    assert await aget_cache("coingecko:coins") == {"test": "data"}
+    await aset_cache("coingecko:exchanges", {"test": "data"}, 60)
+
+    mock_redis.get.assert_called_once_with("coingecko:coins")
+    key, expiry, data = mock_redis.setex.call_args.args
+    assert (key, expiry) == ("coingecko:exchanges", 60)
+    assert cache_codec.decode(data)[0] == {"test": "data"}
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_aset_cache_fills_local_tier_without_decoding(mock_redis):
+    """Test that writes put the original value in the local tier instead of decoding the payload again"""
+    value = {"prices": list(range(1000))}
+
+    with patch('app.services.cache.cache_codec.decode') as mock_decode:
+        await aset_cache("coingecko:tickers:bitcoin", value, 60)
+
+    mock_decode.assert_not_called()
+    assert local_cache.get("coingecko:tickers:bitcoin") == (True, value)
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_aget_many_uses_one_round_trip(mock_redis):
+    """Test that multi-get only asks Redis for keys missing from the local tier"""
+    local_cache.set("compare:bitcoin:default", {"coin": "Bitcoin"}, size=10)
+    mock_redis.mget.return_value = [json.dumps({"coin": "Ethereum"}).encode(), None]
+
+    result = await aget_many(["compare:bitcoin:default", "compare:ethereum:default", "compare:dogecoin:default"])
+
+    assert result == {"compare:bitcoin:default": {"coin": "Bitcoin"}, "compare:ethereum:default": {"coin": "Ethereum"}}
+    mock_redis.mget.assert_called_once_with(["compare:ethereum:default", "compare:dogecoin:default"])
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_aset_many_pipelines_writes(mock_redis):
+    """Test that multi-set sends every write in a single pipeline"""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    mock_redis.pipeline = MagicMock(return_value=pipe)
+
+    await aset_many({"a:1": {"v": 1}, "a:2": {"v": 2}}, 60)
+
+    assert pipe.setex.call_count == 2
+    pipe.execute.assert_awaited_once()
+    assert local_cache.get("a:2") == (True, {"v": 2})
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_aclear_cache_pattern_unlinks_in_batches(mock_redis):
+    """Test that pattern clears remove matching keys with batched UNLINK calls"""
+    async def scan_iter(match, count):
+        for key in (b"compare:1", b"compare:2", b"compare:3"):
+            yield key
+    mock_redis.scan_iter = scan_iter
+    local_cache.set("compare:1", {"v": 1}, size=10)
+
+    with patch('app.services.cache.CLEAR_BATCH_SIZE', 2):
+        await aclear_cache_pattern("compare:")
+
+    assert mock_redis.unlink.await_count == 2
+    mock_redis.unlink.assert_any_await(b"compare:1", b"compare:2")
+    assert local_cache.get("compare:1") == (False, None)
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_stale_entry_is_served_while_refreshing_once(mock_redis):
+    """Test that stale entries are returned at once and refreshed by a single background task"""
+    mock_redis.register_script = MagicMock(return_value=AsyncMock(return_value=1))
+    local_cache.set("compare:bitcoin:default", {"value": {"v": 1}, "cached_at": time.time() - 120}, size=10)
+    compute = AsyncMock()
+    refresh = AsyncMock(return_value={"v": 2})
+
+    results = await asyncio.gather(*(
+        aget_with_revalidation("compare:bitcoin:default", compute, 60, 300, refresh=refresh) for _ in range(5)
+    ))
+    await asyncio.gather(*list(cache._revalidations.values()))
+
+    assert all(value == {"v": 1} and age >= 120 and status == "STALE" for value, age, status in results)
+    refresh.assert_awaited_once()
+    compute.assert_not_awaited()
+    assert local_cache.get("compare:bitcoin:default")[1]["value"] == {"v": 2}
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_failed_refresh_is_retried_on_next_stale_read(mock_redis):
+    """Test that a failed background refresh releases its lock, so the next stale read refreshes again"""
+    locks = {}
+
+    async def set_lock(key, value, nx=False, ex=None):
+        if nx and key in locks:
+            return None
+        locks[key] = value
+        return True
+
+    async def release(keys, args):
+        if locks.get(keys[0]) == args[0]:
+            del locks[keys[0]]
+            return 1
+        return 0
+
+    mock_redis.set.side_effect = set_lock
+    mock_redis.register_script = MagicMock(return_value=release)
+    local_cache.set("compare:bitcoin:default", {"value": {"v": 1}, "cached_at": time.time() - 120}, size=10)
+    refresh = AsyncMock(side_effect=[RuntimeError("upstream down"), {"v": 2}])
+
+    for _ in range(2):
+        await aget_with_revalidation("compare:bitcoin:default", AsyncMock(), 60, 300, refresh=refresh)
+        await asyncio.gather(*list(cache._revalidations.values()))
+
+    assert refresh.await_count == 2
+    assert locks == {}
+    assert local_cache.get("compare:bitcoin:default")[1]["value"] == {"v": 2}
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_entry_past_hard_ttl_is_recomputed(mock_redis):
+    """Test that an entry older than the hard TTL is a miss, even while the local tier still holds it"""
+    local_cache.set("compare:bitcoin:default", {"value": {"v": 1}, "cached_at": time.time() - 400}, size=10)
+    compute = AsyncMock(return_value={"v": 2})
+    refresh = AsyncMock()
+
+    value, age, status = await aget_with_revalidation("compare:bitcoin:default", compute, 60, 300, refresh=refresh)
+
+    assert (value, age, status) == ({"v": 2}, 0, "MISS")
+    compute.assert_awaited_once()
+    refresh.assert_not_awaited()
+    assert "compare:bitcoin:default" not in cache._revalidations
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_aget_or_compute_stores_cost_and_jittered_expiry(mock_redis):
+    """Test that computed values are stored with their compute time and a spread-out TTL"""
+    mock_redis.get.return_value = None
+    compute = AsyncMock(return_value={"v": 1})
+
+    assert await cache.aget_or_compute("coingecko:coins", compute, 1000) == {"v": 1}
+
+    key, expiry, data = mock_redis.setex.call_args.args
+    entry = cache_codec.decode(data)[0]
+    assert 900 <= expiry <= 1100
+    assert entry["value"] == {"v": 1}
+    assert entry["delta"] >= 0
+    assert entry["expires_at"] == pytest.approx(time.time() + expiry, abs=5)
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_aget_or_compute_recomputes_early_near_expiry(mock_redis):
+    """Test that entries are served far from expiry and recomputed early close to it"""
+    compute = AsyncMock(return_value={"v": 2})
+    local_cache.set("coingecko:coins", {"value": {"v": 1}, "delta": 0.5, "expires_at": time.time() + 600}, size=10)
+
+    with patch('app.services.cache.random.random', return_value=0.5):
+        assert await cache.aget_or_compute("coingecko:coins", compute, 1000) == {"v": 1}
+    compute.assert_not_awaited()
+
+    local_cache.set("coingecko:coins", {"value": {"v": 1}, "delta": 0.5, "expires_at": time.time() + 1}, size=10)
+    # A draw near 1 (recompute gap of -0.5 * ln(0.01), about 2.3s) reaches past the expiry
+    with patch('app.services.cache.random.random', return_value=0.99):
+        assert await cache.aget_or_compute("coingecko:coins", compute, 1000) == {"v": 2}
+    compute.assert_awaited_once()
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_aset_cache_records_tags(mock_redis):
+    """Test that tagged entries are added to their tag sets in the same round-trip"""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    mock_redis.pipeline = MagicMock(return_value=pipe)
+
+    with patch('app.services.cache.time.time', return_value=1000.0):
+        await aset_cache("compare:bitcoin:default", {"v": 1}, 300, tags=["coin:bitcoin"])
+
+    pipe.zadd.assert_called_once_with("tagz:coin:bitcoin", {"compare:bitcoin:default": 1300.0})
+    # Members that expired by now are trimmed
+    pipe.zremrangebyscore.assert_called_once_with("tagz:coin:bitcoin", "-inf", 1000.0)
+    pipe.expire.assert_called_once_with("tagz:coin:bitcoin", cache.TAG_TTL)
+    pipe.execute.assert_awaited_once()
+
+@pytest.mark.asyncio
+@patch('app.services.cache.async_redis_client', new_callable=AsyncMock)
+async def test_ainvalidate_tags_drops_tagged_entries(mock_redis):
+    """Test that invalidating a tag removes its entries from Redis and the local tier"""
+    script = AsyncMock(return_value=[b"compare:bitcoin:default", b"compare:bitcoin:10.0"])
+    mock_redis.register_script = MagicMock(return_value=script)
+    local_cache.set("compare:bitcoin:default", {"v": 1}, size=10)
+    local_cache.set("compare:ethereum:default", {"v": 2}, size=10)
+
+    dropped = await cache.ainvalidate_tags(cache.price_tags("bitcoin", [1, 2]))
+
+    assert dropped == 2
+    script.assert_awaited_once_with(keys=["tagz:coin:bitcoin", "tagz:exchange:1", "tagz:exchange:2"])
+    assert local_cache.get("compare:bitcoin:default") == (False, None)
+    assert local_cache.get("compare:ethereum:default") == (True, {"v": 2})
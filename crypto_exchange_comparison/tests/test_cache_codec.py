@@ -0,0 +1,53 @@
+import json
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app.services import cache_codec
+
+MARKETS = [
+    {"id": f"coin-{i}", "symbol": f"c{i}", "current_price": 100.5 + i, "market_cap_rank": i}
+    for i in range(200)
+]
+
+def test_round_trip_compresses_large_payloads():
+    """Test that large values are compressed and decode back unchanged"""
+    data, size = cache_codec.encode(MARKETS)
+
+    assert data[0] == cache_codec.MAGIC
+    assert data[3] != cache_codec.COMPRESSORS["none"].id
+    assert len(data) < size
+    assert cache_codec.decode(data) == (MARKETS, size)
+
+def test_small_payloads_are_not_compressed():
+    """Test that values under the threshold are stored as-is"""
+    data, size = cache_codec.encode({"bitcoin": {"usd": 50000}})
+
+    assert data[3] == cache_codec.COMPRESSORS["none"].id
+    assert len(data) == cache_codec.HEADER_SIZE + size
+
+def test_legacy_json_entries_are_still_readable():
+    """Test that entries written as plain JSON before the header existed decode"""
+    legacy = json.dumps({"bitcoin": {"usd": 50000}}).encode()
+
+    assert cache_codec.decode(legacy)[0] == {"bitcoin": {"usd": 50000}}
+
+def test_payloads_decode_regardless_of_current_settings():
+    """Test that entries written with another codec and compression remain readable"""
+    with patch.object(cache_codec, "active_codec", cache_codec.CODECS["json"]), \
+         patch.object(cache_codec, "active_compressor", cache_codec.COMPRESSORS["zlib"]):
+        data, _ = cache_codec.encode(MARKETS)
+
+    assert data[2] == cache_codec.CODECS["json"].id
+    assert cache_codec.decode(data)[0] == MARKETS
+
+def test_datetimes_are_stored_as_iso_strings():
+    """Test that datetimes serialize the same way as the JSON encoder"""
+    now = datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc)
+
+    assert cache_codec.decode(cache_codec.encode({"at": now})[0])[0] == {"at": now.isoformat()}
+
+def test_unknown_codec_is_rejected():
+    """Test that payloads from an unknown codec raise ValueError"""
+    with pytest.raises(ValueError):
+        cache_codec.decode(bytes((cache_codec.MAGIC, cache_codec.FORMAT_VERSION, 99, 0)) + b"{}")
@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+import httpx
+from unittest.mock import AsyncMock, patch
+
+from app.services import coingecko
+
+@pytest.fixture
+def mock_transport_client():
+    """Install a shared client backed by a mock transport that records requests"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"bitcoin": {"usd": 50000}})
+
+    coingecko._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    yield requests
+    coingecko._client = None
+
+@pytest.mark.asyncio
+async def test_make_api_request_reuses_shared_client(mock_transport_client):
+    """Test that every request goes through the same application-scoped client"""
+    client = coingecko.get_client()
+
+    first = await coingecko.make_api_request("https://coingecko.test/simple/price", {"ids": "bitcoin"})
+    second = await coingecko.make_api_request("https://coingecko.test/simple/price", {"ids": "bitcoin"})
+
+    assert first == second == {"bitcoin": {"usd": 50000}}
+    assert len(mock_transport_client) == 2
+    assert coingecko.get_client() is client
+
+@pytest.mark.asyncio
+async def test_close_client_releases_shared_client():
+    """Test that the shared client is closed on shutdown and recreated on next startup"""
+    client = await coingecko.init_client()
+    assert await coingecko.init_client() is client
+    assert coingecko.get_client() is client
+
+    await coingecko.close_client()
+
+    assert client.is_closed
+    assert coingecko._client is None
+
+@pytest.mark.asyncio
+async def test_make_api_request_honours_retry_after():
+    """Test that a 429 with Retry-After pauses the shared limiter before retrying"""
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "2"}),
+        httpx.Response(200, json={"ok": True}),
+    ]
+    coingecko._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0)))
+
+    with patch.object(coingecko, "coingecko_limiter") as mock_limiter:
+        mock_limiter.acquire = AsyncMock()
+        mock_limiter.penalize = AsyncMock()
+        result = await coingecko.make_api_request("https://coingecko.test/coins/list")
+
+    coingecko._client = None
+    assert result == {"ok": True}
+    mock_limiter.penalize.assert_awaited_once_with(2.0)
+    assert mock_limiter.acquire.await_count == 2
+
+@pytest.mark.asyncio
+async def test_get_top_coins_fetches_market_pages_concurrently():
+    """Test that the top coins are assembled from concurrently fetched /coins/markets pages"""
+    in_flight = 0
+    peak = 0
+    calls = []
+
+    async def fake_markets(vs_currency="usd", per_page=250, page=1):
+        nonlocal in_flight, peak
+        calls.append((per_page, page))
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [{"id": f"coin-{(page - 1) * per_page + i}"} for i in range(per_page)]
+
+    with patch.object(coingecko, "get_coins_with_market_data", fake_markets), \
+         patch.object(coingecko.settings, "COINGECKO_PAGE_CONCURRENCY", 2):
+        coins = await coingecko.get_top_coins_with_market_data(600)
+
+    assert sorted(calls) == [(250, 1), (250, 2), (250, 3)]
+    assert peak == 2
+    assert [coin["id"] for coin in coins] == [f"coin-{i}" for i in range(600)]
+
+    with patch.object(coingecko, "get_coins_with_market_data", fake_markets):
+        calls.clear()
+        assert len(await coingecko.get_top_coins_with_market_data(50)) == 50
+    assert calls == [(50, 1)]
+
+@pytest.mark.asyncio
+async def test_iter_coin_tickers_walks_all_pages():
+    """Test that tickers are streamed from every page until the first short page"""
+    requested = []
+
+    async def fake_page(coin_id, page, exchange_ids=None, depth=False):
+        requested.append(page)
+        count = 100 if page <= 4 else 30 if page == 5 else 0
+        return {"tickers": [{"page": page, "i": i} for i in range(count)]}
+
+    with patch.object(coingecko, "get_coin_tickers_page", fake_page), \
+         patch.object(coingecko.settings, "COINGECKO_PAGE_CONCURRENCY", 3):
+        tickers = [ticker async for ticker in coingecko.iter_coin_tickers("bitcoin")]
+
+    assert len(tickers) == 430
+    assert sorted(requested) == [1, 2, 3, 4, 5, 6, 7]
+
+@pytest.mark.asyncio
+async def test_get_coin_tickers_page_passes_filters():
+    """Test that exchange and depth filters are sent upstream and keyed in the cache"""
+    async def no_cache(key, compute, ttl, coalesce=False):
+        return {"key": key, "data": await compute()}
+
+    with patch.object(coingecko, "aget_or_compute", no_cache), \
+         patch.object(coingecko, "make_api_request", AsyncMock(return_value={"tickers": []})) as mock_request:
+        result = await coingecko.get_coin_tickers_page("bitcoin", 2, exchange_ids=["kraken", "binance"], depth=True)
+
+    assert result["key"] == "coingecko:tickers:bitcoin:2:binance,kraken:1"
+    mock_request.assert_awaited_once_with(
+        f"{coingecko.COINGECKO_API_URL}/coins/bitcoin/tickers",
+        {"page": 2, "exchange_ids": "binance,kraken", "depth": "true"}
+    )
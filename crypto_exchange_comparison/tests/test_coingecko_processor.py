@@ -0,0 +1,62 @@
+import pytest
+
+from app.services import coingecko_processor
+from app.services.exchange_analyzer import process_ticker_data
+
+def make_ticker(exchange, volume, price=100.0, **extra):
+    return {
+        "base": "BTC",
+        "target": "USDT",
+        "market": {"name": exchange, "identifier": exchange.lower(), "has_trading_incentive": False},
+        "last": price,
+        "volume": volume / price,
+        "converted_last": {"btc": 1.0, "eth": 20.0, "usd": price},
+        "converted_volume": {"btc": 1.0, "eth": 20.0, "usd": volume},
+        "bid": price - 1,
+        "ask": price + 1,
+        "bid_ask_spread_percentage": 2.0,
+        "trust_score": "green",
+        **extra,
+    }
+
+def test_normalize_ticker_keeps_only_used_fields():
+    """Test that a raw ticker is reduced to a slotted record"""
+    record = coingecko_processor.normalize_ticker(
+        make_ticker("Binance", 5000.0, cost_to_move_up_usd=1e6, cost_to_move_down_usd=2e6)
+    )
+
+    assert (record.name, record.coingecko_exchange_id, record.price, record.volume) == ("Binance", "binance", 100.0, 5000.0)
+    assert (record.bid, record.ask, record.spread) == (99.0, 101.0, 2.0)
+    assert (record.depth_up_usd, record.depth_down_usd) == (1e6, 2e6)
+    assert not hasattr(record, "__dict__")
+
+    assert coingecko_processor.normalize_ticker({"market": {}}) is None
+    assert coingecko_processor.normalize_ticker({}) is None
+    assert coingecko_processor.normalize_ticker({"market": {"name": "Kraken"}}).price == 0
+
+def test_filter_best_tickers_keeps_highest_volume_per_exchange():
+    """Test that both ticker processors keep the first highest volume ticker of each exchange"""
+    tickers = [
+        make_ticker("Binance", 10.0, price=1.0),
+        make_ticker("Kraken", 5.0),
+        make_ticker("Binance", 30.0, price=2.0),
+        make_ticker("Binance", 30.0, price=3.0),
+        {"market": {"name": ""}},
+    ]
+
+    best = coingecko_processor.filter_best_tickers(tickers)
+
+    assert {name: record.price for name, record in best.items()} == {"Binance": 2.0, "Kraken": 100.0}
+    assert {name: record.price for name, record in process_ticker_data({"tickers": tickers}).items()} == \
+        {"Binance": 2.0, "Kraken": 100.0}
+
+@pytest.mark.asyncio
+async def test_afilter_best_tickers_consumes_stream():
+    """Test that the streaming filter matches the list filter"""
+    async def stream():
+        for ticker in (make_ticker("Binance", 10.0), make_ticker("Binance", 20.0)):
+            yield coingecko_processor.normalize_ticker(ticker)
+
+    best = await coingecko_processor.afilter_best_tickers(stream())
+
+    assert best["Binance"].volume == 20.0
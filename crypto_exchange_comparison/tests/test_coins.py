@@ -11,6 +11,57 @@ def test_get_coins_empty(client, test_db):
     assert response.status_code == 200
     assert response.json() == []
 
+def test_get_coins_ordered_by_market_cap_rank(client, test_db):
+    """Test that coins are listed by market cap rank, unranked coins last by name"""
+    test_db.add_all([
+        Coin(coingecko_id="aave", symbol="AAVE", name="Aave"),
+        Coin(coingecko_id="ethereum", symbol="ETH", name="Ethereum", market_cap_rank=2, current_price=3000.0),
+        Coin(coingecko_id="bitcoin", symbol="BTC", name="Bitcoin", market_cap_rank=1, market_cap=1.2e12),
+    ])
+    test_db.commit()
+
+    response = client.get("/coins/")
+
+    assert [coin["coingecko_id"] for coin in response.json()] == ["bitcoin", "ethereum", "aave"]
+    assert response.json()[0]["market_cap"] == 1.2e12
+    assert response.json()[2]["market_cap_rank"] is None
+
+def test_get_coins_search(client, test_db):
+    """Test filtering coins by name or symbol, exact symbol and prefix matches first"""
+    test_db.add_all([
+        Coin(coingecko_id="wrapped-bitcoin", symbol="WBTC", name="Wrapped Bitcoin"),
+        Coin(coingecko_id="bitcoin", symbol="BTC", name="Bitcoin"),
+        Coin(coingecko_id="bitcoin-cash", symbol="BCH", name="Bitcoin Cash"),
+        Coin(coingecko_id="ethereum", symbol="ETH", name="Ethereum"),
+        Coin(coingecko_id="percent", symbol="PCT", name="100% Coin"),
+    ])
+    test_db.commit()
+
+    response = client.get("/coins/", params={"q": "btc"})
+    assert [coin["coingecko_id"] for coin in response.json()] == ["bitcoin", "wrapped-bitcoin"]
+
+    response = client.get("/coins/", params={"q": "BITCOIN"})
+    assert [coin["coingecko_id"] for coin in response.json()] == ["bitcoin", "bitcoin-cash", "wrapped-bitcoin"]
+
+    # LIKE wildcards are matched literally
+    response = client.get("/coins/", params={"q": "%"})
+    assert [coin["coingecko_id"] for coin in response.json()] == ["percent"]
+
+    assert client.get("/coins/", params={"q": ""}).status_code == 422
+
+def test_trigram_indexes_only_on_postgresql(test_db):
+    """Test that the search indexes are GIN trigram indexes, skipped on other databases"""
+    from sqlalchemy import inspect
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateIndex
+
+    index = next(index for index in Coin.__table__.indexes if index.name == "ix_coins_name_trgm")
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    assert "USING gin (name gin_trgm_ops)" in ddl
+
+    sqlite_indexes = {index["name"] for index in inspect(test_db.get_bind()).get_indexes("coins")}
+    assert "ix_coins_name_trgm" not in sqlite_indexes
+
 @patch('app.services.coingecko.get_coin_price')
 def test_create_coin(mock_get_coin_price, client, test_db):
     """Test creating a new coin"""
@@ -165,4 +216,24 @@ def test_delete_coin(client, test_db):
     
     # Verify it's gone from the database
     db_coin = test_db.query(Coin).filter(Coin.id == coin.id).first()
-    assert db_coin is None 
\ No newline at end of file
+    assert db_coin is None 
+
+@patch("app.services.coingecko.get_top_coins_with_market_data")
+def test_sync_top_coins_uses_market_cap_ranking(mock_top_coins, client, test_db):
+    """Test that /coins/sync/top syncs the top coins by market cap with their market data"""
+    test_db.add(Coin(coingecko_id="ethereum", symbol="ETH", name="Ethereum"))
+    test_db.commit()
+    mock_top_coins.return_value = [
+        {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin", "market_cap_rank": 1, "market_cap": 1e12, "current_price": 50000},
+        {"id": "ethereum", "symbol": "eth", "name": "Ethereum", "market_cap_rank": 2, "market_cap": 4e11, "current_price": 3000},
+    ]
+
+    response = client.get("/coins/sync/top?limit=2")
+
+    assert response.status_code == 200
+    assert [coin["coingecko_id"] for coin in response.json()] == ["bitcoin"]
+    mock_top_coins.assert_called_once_with(2)
+    coins = {coin.coingecko_id: coin for coin in test_db.query(Coin).all()}
+    assert coins["bitcoin"].market_cap_rank == 1
+    assert coins["ethereum"].market_cap_rank == 2
+    assert coins["ethereum"].current_price == 3000
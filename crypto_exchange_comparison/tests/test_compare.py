@@ -1,7 +1,8 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock
 
 from app.models.models import Coin, Exchange, Price
 from app.services import coingecko
@@ -67,10 +68,16 @@ MOCK_ETH_TICKERS = {
 @pytest.fixture
 def mock_redis():
     """Fixture to mock Redis client"""
-    with patch('app.services.cache.redis_client') as mock_redis:
+    with patch('app.services.cache.async_redis_client', new_callable=AsyncMock) as mock_redis:
         # Configure the mock redis client behavior
         mock_redis.get.return_value = None
+        mock_redis.hgetall.return_value = {}
         mock_redis.setex.return_value = True
+        # Tagged writes are pipelined and tag invalidation runs a script
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        mock_redis.pipeline = MagicMock(return_value=pipe)
+        mock_redis.register_script = MagicMock(return_value=AsyncMock(return_value=[]))
         yield mock_redis
 
 @pytest.fixture
@@ -151,8 +158,44 @@ def test_compare_exchanges_existing_coin(client, test_db, seed_database, mock_co
     assert data["best_price"]["exchange_name"] == "Binance"
     assert data["best_for_large_orders"]["exchange_name"] == "Binance"
 
-@patch('app.services.cache.get_cache')
-@patch('app.services.cache.set_cache')
+def test_compare_exchanges_reads_stored_prices_only(client, test_db, seed_database, mock_redis):
+    """Test that a coin with stored prices is compared without calling CoinGecko or writing"""
+    with patch('app.services.coingecko.get_coin_tickers', new_callable=AsyncMock) as mock_tickers, \
+         patch('app.services.coingecko.get_coin_price', new_callable=AsyncMock) as mock_price, \
+         patch('app.services.db.price_service.bulk_upsert') as mock_upsert:
+        response = client.get("/compare/bitcoin")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [exchange["exchange_name"] for exchange in data["exchanges"]] == ["Binance", "Coinbase"]
+    assert data["best_price"]["trading_fee"] == 0.1
+    assert data["best_price"]["spread"] == pytest.approx(0.4)
+    mock_tickers.assert_not_called()
+    mock_price.assert_not_called()
+    mock_upsert.assert_not_called()
+
+def test_compare_exchanges_without_live_fallback(client, test_db, mock_coingecko_responses, mock_redis):
+    """Test that an unpriced coin is not fetched on the request when the live fallback is off"""
+    from app.config.settings import settings
+
+    with patch.object(settings, "COMPARE_LIVE_FALLBACK", False):
+        response = client.get("/compare/ethereum")
+
+    assert response.status_code == 404
+    assert test_db.query(Coin).filter(Coin.coingecko_id == "ethereum").first() is None
+
+def test_compare_exchanges_reports_cache_freshness(client, test_db, seed_database, mock_coingecko_responses, mock_redis):
+    """Test that comparison responses say whether and how long they were cached"""
+    first = client.get("/compare/bitcoin")
+    second = client.get("/compare/bitcoin")
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert first.headers["Age"] == "0"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+
+@patch('app.services.cache.aget_cache', new_callable=AsyncMock)
+@patch('app.services.cache.aset_cache', new_callable=AsyncMock)
 def test_compare_exchanges_new_coin(mock_set_cache, mock_get_cache, client, test_db, mock_coingecko_responses, mock_redis):
     """Test comparing exchanges for a new coin that needs to be fetched from Coingecko"""
     # Ensure cache returns None
@@ -182,4 +225,69 @@ def test_get_exchange_fees(client, test_db, seed_database):
     
     assert len(data) == 1  # Only one coin with fee data
     assert data[0]["coin"] == "BTC"
-    assert data[0]["trading_fee"] == 0.1 
\ No newline at end of file
+    assert data[0]["trading_fee"] == 0.1 
+
+def test_compare_batch(client, test_db, seed_database, mock_coingecko_responses, mock_redis):
+    """Test comparing several coins at once, from stored prices and CoinGecko"""
+    mock_redis.mget.side_effect = lambda keys: [None] * len(keys)
+
+    with patch('app.api.compare.SessionLocal', return_value=test_db), \
+         patch.object(test_db, "close"):
+        response = client.post("/compare/batch", json={"coin_ids": ["ethereum", "bitcoin", "bitcoin"]})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert list(data["results"]) == ["ethereum", "bitcoin"]
+    assert data["results"]["bitcoin"]["best_price"]["exchange_name"] == "Binance"
+    assert data["results"]["ethereum"]["coin"] == "Ethereum"
+    assert data["errors"] == {}
+    # Cached results for all coins are looked up in one round-trip
+    mock_redis.mget.assert_called_once()
+
+def test_compare_batch_streams_ndjson(client, test_db, seed_database, mock_redis):
+    """Test that batch results are streamed one JSON line per coin"""
+    from app.config.settings import settings
+
+    mock_redis.mget.side_effect = lambda keys: [None] * len(keys)
+
+    with patch.object(settings, "COMPARE_LIVE_FALLBACK", False):
+        response = client.post("/compare/batch?stream=true", json={"coin_ids": ["bitcoin", "ethereum"]})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert [item["coin_id"] for item in items] == ["bitcoin", "ethereum"]
+    assert items[0]["result"]["coin"] == "Bitcoin"
+    assert items[1]["result"] is None
+    assert items[1]["error"] == "No price data for this coin yet"
+
+def test_compare_batch_rejects_empty_request(client):
+    """Test that a batch needs at least one coin"""
+    response = client.post("/compare/batch", json={"coin_ids": []})
+
+    assert response.status_code == 422
+
+def test_compare_exchanges_for_order_size(client, test_db, seed_database, mock_redis):
+    """Test that exchanges are ranked by expected cost for the requested order size"""
+    response = client.get("/compare/bitcoin?amount=50000")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["amount"] == 50000
+    assert all(exchange["effective_price"] > exchange["ask_price"] for exchange in data["exchanges"])
+    assert data["best_for_large_orders"]["exchange_name"] == "Binance"
+    assert client.get("/compare/bitcoin?amount=0").status_code == 422
+
+def test_compare_exchanges_matches_exchanges_on_coingecko_id(client, test_db, mock_redis):
+    """Test that a ticker market named differently from a stored exchange with its CoinGecko ID reuses it"""
+    test_db.add(Exchange(name="Binance Global", coingecko_id="binance"))
+    test_db.commit()
+
+    with patch('app.services.coingecko.get_coin_tickers', new_callable=AsyncMock) as mock_tickers:
+        mock_tickers.return_value = MOCK_ETH_TICKERS
+        response = client.get("/compare/ethereum")
+
+    assert response.status_code == 200
+    assert {exchange["exchange_name"] for exchange in response.json()["exchanges"]} == {"Binance", "Coinbase"}
+    assert test_db.query(Exchange).filter(Exchange.coingecko_id == "binance").count() == 1
+    assert test_db.query(Price).count() == 2
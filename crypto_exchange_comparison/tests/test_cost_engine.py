@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.config.settings import settings
+from app.models import schemas
+from app.services import cost_engine
+from app.services.exchange_analyzer import build_comparison_result
+
+
+def exchange_price(name, price, volume=None, ask=None, trading_fee=None, withdrawal_fee=None):
+    return schemas.ExchangePrice(
+        exchange_name=name,
+        price_usd=price,
+        volume_24h=volume,
+        ask_price=ask,
+        trading_fee=trading_fee,
+        withdrawal_fee=withdrawal_fee,
+        last_updated=datetime.now(timezone.utc),
+    )
+
+
+def test_effective_prices_combine_spread_slippage_and_fees():
+    """Test the cost model against a hand-computed value"""
+    costs = cost_engine.effective_prices(
+        np.array([100.0]), np.array([1_000_000.0]), np.array([0.1]), np.array([5.0]), np.array([10_000.0])
+    )
+
+    impact = settings.SLIPPAGE_IMPACT * (10_000 / 1_000_000) ** 0.5
+    assert costs[0, 0] == pytest.approx(100 * (1 + impact) * (1 + 0.001 + 5 / 10_000))
+
+
+def test_effective_prices_evaluates_all_amounts_at_once():
+    """Test that costs come back per amount and exchange, and grow with the order size"""
+    costs = cost_engine.effective_prices(
+        np.array([100.0, 101.0, 100.0]), np.array([1e6, 1e9, 0.0]), np.zeros(3), np.zeros(3),
+        np.array([1e3, 1e5, 1e7]),
+    )
+
+    assert costs.shape == (3, 3)
+    assert np.all(np.diff(costs[:, :2], axis=0) > 0)
+    # An exchange without volume cannot fill any order
+    assert np.all(np.isinf(costs[:, 2]))
+
+
+def test_build_comparison_result_ranks_by_order_size():
+    """Test that the cheapest exchange for a large order can differ from the cheapest quote"""
+    prices = [
+        exchange_price("Thin", 100.0, volume=100_000, ask=100.0),
+        exchange_price("Deep", 100.5, volume=1_000_000_000, ask=100.5),
+        exchange_price("Unknown", 99.0),
+    ]
+
+    small = build_comparison_result("Bitcoin", prices, amount=10)
+    large = build_comparison_result("Bitcoin", prices, amount=1_000_000)
+
+    assert small.best_price.exchange_name == "Unknown"
+    assert small.best_for_large_orders.exchange_name == "Thin"
+    assert large.best_for_large_orders.exchange_name == "Deep"
+    assert large.amount == 1_000_000
+    assert {price.exchange_name: price.effective_price for price in large.exchanges}["Unknown"] is None
+    assert [quote.amount_usd for quote in large.best_by_order_size] == settings.ORDER_SIZE_BUCKETS_USD
+    assert large.best_by_order_size[-1].exchange_name == "Deep"
+
+
+def test_build_comparison_result_without_volume_falls_back():
+    """Test that best_for_large_orders is still set when no exchange has volume data"""
+    result = build_comparison_result("Bitcoin", [exchange_price("Binance", 100.0)])
+
+    assert result.best_for_large_orders.exchange_name == "Binance"
+    assert result.best_by_order_size == []
+
+
+def test_exchange_without_price_is_never_recommended():
+    """Test that a ticker without a price (ask and last price of 0) cannot win any order size"""
+    prices = [
+        exchange_price("Binance", 100.0, volume=1_000_000_000, ask=100.0),
+        exchange_price("NoPrice", 0.0, volume=1_000_000_000),
+    ]
+
+    result = build_comparison_result("Bitcoin", prices, amount=10_000)
+
+    assert result.best_for_large_orders.exchange_name == "Binance"
+    assert {quote.exchange_name for quote in result.best_by_order_size} == {"Binance"}
+    assert {price.exchange_name: price.effective_price for price in result.exchanges}["NoPrice"] is None
@@ -0,0 +1,191 @@
+import asyncio
+import pytest
+from sqlalchemy import inspect
+from unittest.mock import AsyncMock, patch
+
+from app.models.models import Coin, Exchange, Price
+from app.services import data_service
+from app.services.coingecko_processor import TickerRecord
+from app.services.db import coin_service, exchange_service
+
+MOCK_EXCHANGE_DATA = {
+    "Binance": TickerRecord("Binance", price=100.0, volume=1000.0, bid=99.0, ask=101.0),
+    "Unknown Exchange": TickerRecord("Unknown Exchange", price=100.0, volume=10.0),
+}
+
+@pytest.mark.asyncio
+async def test_update_prices_fetches_concurrently(test_db):
+    """Test that tickers are fetched for several coins at once and every row is written"""
+    test_db.add(Exchange(name="Binance"))
+    test_db.add_all(Coin(coingecko_id=f"coin-{i}", symbol=f"C{i}", name=f"Coin {i}") for i in range(6))
+    test_db.commit()
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def mock_fetch(coingecko_id, exchange_ids=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return MOCK_EXCHANGE_DATA
+
+    with patch.object(data_service, "fetch_exchange_data_for_coin", mock_fetch):
+        updated = await data_service.update_prices(test_db, concurrency=3)
+
+    # Only the tracked exchange is written, once per coin
+    assert updated == 6
+    assert test_db.query(Price).count() == 6
+    assert max_in_flight == 3
+
+@pytest.mark.asyncio
+async def test_update_prices_skips_failed_coins(test_db):
+    """Test that an upstream error for one coin does not abort the whole run"""
+    test_db.add(Exchange(name="Binance"))
+    test_db.add_all([
+        Coin(coingecko_id="good", symbol="GOOD", name="Good"),
+        Coin(coingecko_id="bad", symbol="BAD", name="Bad"),
+    ])
+    test_db.commit()
+
+    async def mock_fetch(coingecko_id, exchange_ids=None):
+        if coingecko_id == "bad":
+            raise RuntimeError("upstream error")
+        return MOCK_EXCHANGE_DATA
+
+    with patch.object(data_service, "fetch_exchange_data_for_coin", mock_fetch):
+        updated = await data_service.update_prices(test_db)
+
+    assert updated == 1
+
+@pytest.mark.asyncio
+async def test_update_prices_stops_fetching_when_writer_fails(test_db):
+    """Test that a failing writer aborts the run instead of leaving fetchers blocked on the full queue"""
+    test_db.add(Exchange(name="Binance"))
+    test_db.add_all(Coin(coingecko_id=f"coin-{i}", symbol=f"C{i}", name=f"Coin {i}") for i in range(10))
+    test_db.commit()
+
+    async def mock_fetch(coingecko_id, exchange_ids=None):
+        return MOCK_EXCHANGE_DATA
+
+    with patch.object(data_service, "fetch_exchange_data_for_coin", mock_fetch), \
+         patch.object(data_service, "write_prices_for_coin", AsyncMock(side_effect=RuntimeError("db down"))), \
+         patch.object(test_db, "rollback", side_effect=RuntimeError("connection lost")):
+        with pytest.raises(RuntimeError, match="connection lost"):
+            await asyncio.wait_for(data_service.update_prices(test_db, concurrency=1), timeout=5)
+
+@pytest.mark.asyncio
+async def test_update_coins_bulk_sync(test_db):
+    """Test that coin sync inserts new coins and only updates changed ones"""
+    test_db.add_all([
+        Coin(coingecko_id="bitcoin", symbol="BTC", name="Bitcoin"),
+        Coin(coingecko_id="ethereum", symbol="ETH", name="Ether"),
+    ])
+    test_db.commit()
+
+    async def mock_fetch_top_coins(*args, **kwargs):
+        return [
+            {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+            {"id": "ethereum", "symbol": "eth", "name": "Ethereum"},
+            {"id": "solana", "symbol": "sol", "name": "Solana"},
+        ]
+
+    with patch("app.services.coingecko_processor.fetch_top_coins", mock_fetch_top_coins):
+        updated, created = await data_service.update_coins(test_db)
+
+    assert (updated, created) == (1, 1)
+    names = {coin.coingecko_id: coin.name for coin in test_db.query(Coin).all()}
+    assert names == {"bitcoin": "Bitcoin", "ethereum": "Ethereum", "solana": "Solana"}
+
+@pytest.mark.asyncio
+async def test_update_coins_stores_market_data(test_db):
+    """Test that coin sync stores rank, market cap and price, and clears ranks of coins that dropped out"""
+    test_db.add(Coin(coingecko_id="terra-luna", symbol="LUNA", name="Terra", market_cap_rank=3))
+    test_db.commit()
+
+    async def mock_fetch_top_coins(*args, **kwargs):
+        return [
+            {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin",
+             "market_cap_rank": 1, "market_cap": 1.2e12, "current_price": 60000.0},
+            {"id": "ethereum", "symbol": "eth", "name": "Ethereum",
+             "market_cap_rank": 2, "market_cap": 4e11, "current_price": 3000.0},
+        ]
+
+    with patch("app.services.coingecko_processor.fetch_top_coins", mock_fetch_top_coins):
+        await data_service.update_coins(test_db)
+
+    coins = {coin.coingecko_id: coin for coin in test_db.query(Coin).all()}
+    assert coins["bitcoin"].market_cap_rank == 1
+    assert coins["bitcoin"].current_price == 60000.0
+    assert coins["ethereum"].market_cap == 4e11
+    assert coins["terra-luna"].market_cap_rank is None
+
+@pytest.mark.asyncio
+async def test_update_prices_invalidates_derived_views(test_db):
+    """Test that writing a coin's prices drops the cached views derived from them"""
+    binance = Exchange(name="Binance")
+    test_db.add(binance)
+    test_db.add(Coin(coingecko_id="bitcoin", symbol="BTC", name="Bitcoin"))
+    test_db.commit()
+
+    async def mock_fetch(coingecko_id, exchange_ids=None):
+        return MOCK_EXCHANGE_DATA
+
+    with patch.object(data_service, "fetch_exchange_data_for_coin", mock_fetch), \
+         patch("app.services.cache.ainvalidate_tags", new_callable=AsyncMock) as mock_invalidate:
+        await data_service.update_prices(test_db)
+
+    mock_invalidate.assert_awaited_once_with(["coin:bitcoin", f"exchange:{binance.id}"])
+
+@pytest.mark.asyncio
+async def test_fetch_exchange_data_streams_tickers_for_tracked_exchanges(test_db):
+    """Test that tickers are fetched for the stored exchanges only and reduced to the best per exchange"""
+    test_db.add_all([Exchange(name="Binance", coingecko_id="binance"), Exchange(name="Kraken", coingecko_id="kraken")])
+    test_db.commit()
+
+    async def fake_tickers(coin_id, exchange_ids=None, depth=False):
+        assert sorted(exchange_ids) == ["binance", "kraken"]
+        for name, volume in (("Binance", 10), ("Kraken", 5), ("Binance", 30), ("Binance", 20)):
+            yield {"market": {"name": name}, "converted_last": {"usd": volume}, "converted_volume": {"usd": volume}}
+
+    exchange_ids = exchange_service.get_ticker_filter(test_db)
+    with patch("app.services.coingecko.iter_coin_tickers", fake_tickers):
+        exchange_data = await data_service.fetch_exchange_data_for_coin("bitcoin", exchange_ids)
+
+    assert {name: record.volume for name, record in exchange_data.items()} == {"Binance": 30, "Kraken": 5}
+
+    # An exchange without a CoinGecko ID would be filtered out, so nothing is filtered
+    test_db.add(Exchange(name="Legacy"))
+    test_db.commit()
+    assert exchange_service.get_ticker_filter(test_db) is None
+
+def test_exchanges_are_matched_on_coingecko_id_before_name(test_db):
+    """Test that an exchange stored under another name is found and not inserted twice"""
+    gdax = Exchange(name="Coinbase Exchange", coingecko_id="gdax")
+    test_db.add(gdax)
+    test_db.commit()
+
+    assert exchange_service.resolve_ids(test_db, {"Coinbase": "gdax", "Kraken": None}) == {"Coinbase": gdax.id}
+
+    _, created = exchange_service.bulk_sync(test_db, [
+        {"name": "Coinbase", "coingecko_id": "gdax", "website": "https://coinbase.com"},
+    ])
+    assert created == []
+    assert test_db.query(Exchange).count() == 1
+    assert test_db.query(Exchange).one().website == "https://coinbase.com"
+
+def test_update_returns_records_without_reloading(test_db):
+    """Test that single-record updates keep the written values loaded instead of refreshing after commit"""
+    coin = Coin(coingecko_id="bitcoin", symbol="BTC", name="Bitcoin")
+    exchange = Exchange(name="Binance")
+    test_db.add_all([coin, exchange])
+    test_db.commit()
+
+    updated_coin = coin_service.update(test_db, coin.id, {"name": "Bitcoin Core"})
+    updated_exchange = exchange_service.update(test_db, exchange.id, {"has_trading_fees": False})
+
+    assert not inspect(updated_coin).expired_attributes
+    assert not inspect(updated_exchange).expired_attributes
+    assert (updated_coin.name, updated_exchange.has_trading_fees) == ("Bitcoin Core", False)
+    assert test_db.expire_on_commit
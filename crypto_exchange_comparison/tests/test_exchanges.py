@@ -1,8 +1,9 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
+from unittest.mock import patch
 
-from app.models.models import Exchange
+from app.models.models import Coin, Exchange, Price
 
 def test_get_exchanges_empty(client, test_db):
     """Test getting exchanges when there are none"""
@@ -10,6 +11,16 @@ def test_get_exchanges_empty(client, test_db):
     assert response.status_code == 200
     assert response.json() == []
 
+def test_get_exchanges_search(client, test_db):
+    """Test filtering exchanges by name, prefix matches first"""
+    test_db.add_all([Exchange(name="Binance US"), Exchange(name="Binance"), Exchange(name="Kraken"), Exchange(name="Bitbinance")])
+    test_db.commit()
+
+    response = client.get("/exchanges/", params={"q": "binance"})
+
+    assert response.status_code == 200
+    assert [exchange["name"] for exchange in response.json()] == ["Binance", "Binance US", "Bitbinance"]
+
 def test_create_exchange(client, test_db):
     """Test creating a new exchange"""
     exchange_data = {
@@ -57,4 +68,40 @@ def test_get_exchange_not_found(client, test_db):
     """Test getting a non-existent exchange"""
     response = client.get("/exchanges/999")
     assert response.status_code == 404
-    assert "not found" in response.json()["detail"].lower() 
\ No newline at end of file
+    assert "not found" in response.json()["detail"].lower() 
+
+@patch('app.services.coingecko.get_exchanges')
+def test_sync_exchanges_from_coingecko(mock_get_exchanges, client, test_db):
+    """Test that syncing creates only the exchanges that are missing"""
+    test_db.add(Exchange(name="Binance"))
+    test_db.commit()
+
+    async def mock_exchanges(*args, **kwargs):
+        return [
+            {"name": "Binance", "url": "https://binance.com"},
+            {"name": "Kraken", "url": "https://kraken.com", "image": "https://kraken.com/logo.png"},
+        ]
+
+    mock_get_exchanges.side_effect = mock_exchanges
+
+    response = client.get("/exchanges/sync/coingecko")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [exchange["name"] for exchange in data] == ["Kraken"]
+    assert data[0]["logo_url"] == "https://kraken.com/logo.png"
+    assert test_db.query(Exchange).count() == 2
+
+def test_get_exchange_coins(client, test_db):
+    """Test listing the coins priced on an exchange"""
+    exchange = Exchange(name="Binance")
+    bitcoin = Coin(coingecko_id="bitcoin", symbol="BTC", name="Bitcoin")
+    test_db.add_all([exchange, bitcoin, Coin(coingecko_id="ethereum", symbol="ETH", name="Ethereum")])
+    test_db.commit()
+    test_db.add(Price(exchange_id=exchange.id, coin_id=bitcoin.id, price_usd=50000))
+    test_db.commit()
+
+    response = client.get(f"/exchanges/{exchange.id}/coins")
+
+    assert response.status_code == 200
+    assert [coin["coingecko_id"] for coin in response.json()] == ["bitcoin"]
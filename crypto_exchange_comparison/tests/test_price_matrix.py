@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.models.models import Coin, Exchange, Price
+from app.services import price_matrix
+from app.services.db import price_service
+
+
+def test_apply_grows_grid_and_keeps_unwritten_columns():
+    """Test that rows land in their cells, the arrays grow, and absent columns are kept"""
+    matrix = price_matrix.PriceMatrix(coin_capacity=1, exchange_capacity=1)
+    matrix.apply([{"coin_id": 7, "exchange_id": 3, "price_usd": 10.0, "trading_fee": 0.1}])
+    matrix.apply([
+        {"coin_id": 7, "exchange_id": 3, "price_usd": 11.0},
+        {"coin_id": 8, "exchange_id": 4, "price_usd": 20.0},
+        {"coin_id": 9, "exchange_id": 3, "price_usd": None},
+    ])
+
+    assert matrix.shape == (3, 2)
+    assert matrix.cell(7, 3)["price_usd"] == 11.0
+    assert matrix.cell(7, 3)["trading_fee"] == 0.1
+    assert matrix.cell(8, 4)["price_usd"] == 20.0
+    assert np.isnan(matrix.cell(9, 3)["price_usd"])
+    assert np.isnan(matrix.cell(7, 4)["price_usd"])
+    assert matrix.cell(1, 3) is None
+    assert matrix.version == 2
+
+
+def test_snapshot_copies_occupied_grid():
+    """Test that snapshots are trimmed to the grid and not affected by later writes"""
+    updated = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    matrix = price_matrix.build([
+        {"coin_id": 1, "exchange_id": 1, "ask_price": 5.0, "last_updated": updated},
+        {"coin_id": 2, "exchange_id": 2, "ask_price": 6.0, "last_updated": updated.replace(tzinfo=None)},
+    ])
+
+    coin_ids, exchange_ids, columns = matrix.snapshot(["ask_price", "last_updated"])
+    matrix.apply([{"coin_id": 1, "exchange_id": 1, "ask_price": 7.0}])
+
+    assert (coin_ids, exchange_ids) == ([1, 2], [1, 2])
+    assert columns["ask_price"].shape == (2, 2)
+    assert columns["ask_price"][0, 0] == 5.0
+    # Naive datetimes are read as UTC
+    assert columns["last_updated"][1, 1] == updated.timestamp()
+
+
+def test_remove_coin_clears_its_row():
+    """Test that a removed coin has no prices left"""
+    matrix = price_matrix.build([{"coin_id": 1, "exchange_id": 1, "price_usd": 5.0}])
+
+    matrix.remove_coin(1)
+
+    assert np.isnan(matrix.cell(1, 1)["price_usd"])
+
+
+def test_bulk_upsert_updates_matrix_and_rebuild_matches(test_db):
+    """Test that committed upserts reach the matrix, and a rebuild from the table agrees"""
+    binance = Exchange(name="Binance")
+    bitcoin = Coin(coingecko_id="bitcoin", symbol="BTC", name="Bitcoin")
+    test_db.add_all([binance, bitcoin])
+    test_db.commit()
+    test_db.add(Price(exchange_id=binance.id, coin_id=bitcoin.id, price_usd=1, trading_fee=0.1))
+    test_db.commit()
+    price_matrix.rebuild(price_service.get_matrix_rows(test_db))
+
+    price_service.bulk_upsert(test_db, [
+        {"exchange_id": binance.id, "coin_id": bitcoin.id, "price_usd": 50000, "ask_price": 50010},
+    ])
+
+    cell = price_matrix.get_matrix().cell(bitcoin.id, binance.id)
+    assert cell["price_usd"] == 50000
+    assert cell["trading_fee"] == pytest.approx(0.1)
+    rebuilt = price_matrix.rebuild(price_service.get_matrix_rows(test_db))
+    assert rebuilt.cell(bitcoin.id, binance.id)["ask_price"] == 50010
+    assert rebuilt.cell(bitcoin.id, binance.id)["trading_fee"] == pytest.approx(0.1)
@@ -0,0 +1,45 @@
+import pytest
+
+from app.models.models import Coin, Exchange, Price
+from app.services.db import price_service
+
+@pytest.fixture
+def coin_and_exchanges(test_db):
+    """Seed a coin on two exchanges, with an existing fee-carrying price on the first"""
+    binance = Exchange(name="Binance")
+    kraken = Exchange(name="Kraken")
+    bitcoin = Coin(coingecko_id="bitcoin", symbol="BTC", name="Bitcoin")
+    test_db.add_all([binance, kraken, bitcoin])
+    test_db.commit()
+
+    test_db.add(Price(exchange_id=binance.id, coin_id=bitcoin.id, price_usd=1, trading_fee=0.1))
+    test_db.commit()
+    return bitcoin, binance, kraken
+
+def test_bulk_upsert_inserts_and_updates(test_db, coin_and_exchanges):
+    """Test that bulk_upsert updates existing pairs, inserts new ones and keeps fees"""
+    bitcoin, binance, kraken = coin_and_exchanges
+
+    written = price_service.bulk_upsert(test_db, [
+        {"exchange_id": binance.id, "coin_id": bitcoin.id, "price_usd": 50000, "volume_24h": 10},
+        {"exchange_id": kraken.id, "coin_id": bitcoin.id, "price_usd": 50100, "volume_24h": 5},
+    ])
+
+    assert written == 2
+    prices = price_service.get_for_coin_by_exchanges(test_db, bitcoin.id, [binance.id, kraken.id])
+    assert test_db.query(Price).count() == 2
+    assert prices[binance.id].price_usd == 50000
+    assert prices[binance.id].trading_fee == 0.1
+    assert prices[kraken.id].price_usd == 50100
+
+def test_bulk_upsert_batches(test_db, coin_and_exchanges):
+    """Test that rows split across several statements are all written"""
+    bitcoin, binance, kraken = coin_and_exchanges
+
+    written = price_service.bulk_upsert(test_db, [
+        {"exchange_id": binance.id, "coin_id": bitcoin.id, "price_usd": 2},
+        {"exchange_id": kraken.id, "coin_id": bitcoin.id, "price_usd": 3},
+    ], batch_size=1)
+
+    assert written == 2
+    assert sorted(price.price_usd for price in test_db.query(Price).all()) == [2, 3]
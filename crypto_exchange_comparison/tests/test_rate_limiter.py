@@ -0,0 +1,91 @@
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from redis.exceptions import ConnectionError
+
+from app.services.rate_limiter import RedisTokenBucket, TokenBucket
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst():
+    """Test that a full bucket hands out its capacity without waiting"""
+    bucket = TokenBucket(rate_per_minute=60, capacity=3)
+
+    start = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+
+    assert time.monotonic() - start < 0.05
+    assert bucket.available < 1
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_when_empty():
+    """Test that callers wait for a refill once the bucket is empty"""
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)  # One token every 0.1s
+
+    await bucket.acquire()
+    start = time.monotonic()
+    await bucket.acquire()
+
+    assert time.monotonic() - start >= 0.08
+
+@pytest.mark.asyncio
+async def test_token_bucket_honours_block():
+    """Test that a Retry-After block pauses the bucket even when tokens are left"""
+    bucket = TokenBucket(rate_per_minute=60, capacity=5)
+    bucket.block(0.1)
+
+    assert bucket.available == 0
+    start = time.monotonic()
+    await bucket.acquire()
+
+    assert time.monotonic() - start >= 0.08
+
+def make_redis_bucket(script_results):
+    """Build a Redis-backed bucket whose Lua script returns the given results in order"""
+    mock_redis = MagicMock()
+    mock_redis.register_script.return_value = AsyncMock(side_effect=script_results)
+    return RedisTokenBucket(mock_redis, "ratelimit:test", rate_per_minute=60, capacity=5)
+
+@pytest.mark.asyncio
+async def test_redis_bucket_waits_for_shared_token():
+    """Test that callers sleep for the wait time Redis reports and then retry"""
+    bucket = make_redis_bucket([[0, 50, "0"], [1, 0, "0.2"]])
+
+    start = time.monotonic()
+    await bucket.acquire()
+
+    assert time.monotonic() - start >= 0.04
+    assert bucket._script.await_count == 2
+
+@pytest.mark.asyncio
+async def test_redis_bucket_falls_back_to_local_bucket():
+    """Test that an unreachable Redis falls back to the in-process bucket"""
+    bucket = make_redis_bucket(ConnectionError("redis is down"))
+
+    await bucket.acquire()
+    await bucket.acquire()
+
+    # Redis is not retried until the retry interval has passed
+    assert bucket._script.await_count == 1
+    assert bucket.local.available < 4
+    assert (await bucket.get_budget())["backend"] == "local"
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("window_minute, used", [(28_333_333, 12), (28_333_332, 0)])
+async def test_redis_bucket_budget_uses_redis_minute(window_minute, used):
+    """Test that usage only counts when it was recorded in the Redis clock's current minute"""
+    bucket = make_redis_bucket([])
+    pipe = MagicMock()
+    # Server time 1_700_000_000.5s is in minute 28_333_333
+    pipe.execute = AsyncMock(return_value=[
+        [b"3", b"1700000000000"], [str(window_minute).encode(), b"12"], -2, (1_700_000_000, 500_000)
+    ])
+    bucket.redis.pipeline.return_value = pipe
+
+    budget = await bucket.get_budget()
+
+    pipe.hmget.assert_any_call("ratelimit:test:minute", "minute", "used")
+    assert budget["backend"] == "redis"
+    assert budget["used_this_minute"] == used
+    assert budget["remaining_this_minute"] == 60 - used
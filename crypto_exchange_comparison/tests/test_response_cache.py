@@ -0,0 +1,81 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from redis.exceptions import ConnectionError
+
+from app.models.models import Coin
+from app.services import cache
+
+@pytest.fixture
+def mock_redis():
+    """Fixture to mock the asyncio Redis client"""
+    with patch('app.services.cache.async_redis_client', new_callable=AsyncMock) as mock_redis:
+        mock_redis.hgetall.return_value = {}
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        mock_redis.pipeline = MagicMock(return_value=pipe)
+        yield mock_redis
+
+@pytest.fixture
+def seed_coins(test_db):
+    test_db.add_all(Coin(coingecko_id=f"coin-{i}", symbol=f"C{i}", name=f"Coin {i}") for i in range(30))
+    test_db.commit()
+
+def test_hit_is_served_from_rendered_bytes(client, seed_coins, mock_redis):
+    """Test that repeated listings return the stored body with the same ETag"""
+    first = client.get("/coins/")
+    second = client.get("/coins/")
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert len(second.json()) == 30
+    # The entry and its list tag were written in one pipeline
+    mock_redis.pipeline.return_value.zadd.assert_called_once()
+
+def test_matching_etag_returns_not_modified(client, seed_coins, mock_redis):
+    """Test that If-None-Match with the current ETag gets an empty 304"""
+    etag = client.get("/coins/").headers["ETag"]
+
+    response = client.get("/coins/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+def test_gzip_variant_is_served_when_accepted(client, seed_coins, mock_redis):
+    """Test that clients accepting gzip get the precompressed body"""
+    client.get("/coins/")
+
+    response = client.get("/coins/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()) == 30
+
+@pytest.mark.parametrize("accept_encoding, gzipped", [
+    ("gzip;q=0", False),
+    ("br, gzip; q=0.0", False),
+    ("identity", False),
+    ("*;q=0", False),
+    ("GZIP;q=0.5", True),
+    ("br, *;q=0.1", True),
+])
+def test_gzip_variant_honours_qvalues(client, seed_coins, mock_redis, accept_encoding, gzipped):
+    """Test that gzip is only sent when Accept-Encoding gives it a q-value above 0"""
+    client.get("/coins/")
+
+    response = client.get("/coins/", headers={"Accept-Encoding": accept_encoding})
+
+    assert response.headers["X-Cache"] == "HIT"
+    assert ("Content-Encoding" in response.headers) is gzipped
+    assert len(response.json()) == 30
+
+def test_redis_errors_fall_back_to_rendering(client, seed_coins, mock_redis):
+    """Test that the route still answers, uncached, when Redis is down"""
+    mock_redis.hgetall.side_effect = ConnectionError("down")
+    mock_redis.pipeline.return_value.execute.side_effect = ConnectionError("down")
+
+    response = client.get("/coins/")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 30
+    assert cache.local_cache.stats()["entries"] == 0
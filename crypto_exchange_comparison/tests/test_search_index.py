@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services import search_index
+from app.services.search_index import CoinSearchIndex
+
+COINS = [
+    {"id": "wrapped-bitcoin", "symbol": "wbtc", "name": "Wrapped Bitcoin"},
+    {"id": "bitcoin-cash", "symbol": "bch", "name": "Bitcoin Cash"},
+    {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+    {"id": "ethereum", "symbol": "eth", "name": "Ethereum"},
+    {"id": "tether", "symbol": "usdt", "name": "Tether"},
+]
+MARKETS = [
+    {"id": "bitcoin", "market_cap_rank": 1, "current_price": 50000, "market_cap": 10 ** 12},
+    {"id": "ethereum", "market_cap_rank": 2, "current_price": 3000, "market_cap": 4 * 10 ** 11},
+    {"id": "wrapped-bitcoin", "market_cap_rank": 15, "current_price": 50000, "market_cap": 10 ** 10},
+]
+
+def test_search_ranks_market_data_then_match_quality():
+    """Test that coins with market data come first, then exact, prefix and substring matches"""
+    index = CoinSearchIndex(COINS, MARKETS)
+
+    results = index.search("bitcoin")
+
+    assert [coin["id"] for coin in results] == ["bitcoin", "wrapped-bitcoin", "bitcoin-cash"]
+    assert results[0]["current_price"] == 50000
+    assert results[2]["has_market_data"] is False
+
+def test_search_matches_symbols_and_excludes_tracked_coins():
+    """Test two-character queries, symbol matches and exclusion of coins already in the database"""
+    index = CoinSearchIndex(COINS, MARKETS)
+
+    assert [coin["id"] for coin in index.search("ET")] == ["ethereum", "tether"]
+    assert [coin["id"] for coin in index.search("btc", exclude={"bitcoin"})] == ["wrapped-bitcoin"]
+    assert index.search("dogecoin") == []
+    assert len(index.search("bitcoin", limit=2)) == 2
+
+def test_fuzzy_search_tolerates_typos_and_ranks_by_distance():
+    """Test that misspelled queries match within the edit distance bound, closest first"""
+    index = CoinSearchIndex(COINS, MARKETS)
+
+    assert [coin["id"] for coin in index.fuzzy_search("etherium")] == ["ethereum"]
+    # "bitcoim" is one edit from every bitcoin term; market data and rank break the tie
+    assert [coin["id"] for coin in index.fuzzy_search("bitcoim")] == ["bitcoin", "wrapped-bitcoin", "bitcoin-cash"]
+    # Transpositions count as one edit
+    assert index.fuzzy_search("tetehr")[0]["id"] == "tether"
+    # Short queries get a tighter bound
+    assert [coin["id"] for coin in index.fuzzy_search("btx")] == ["bitcoin"]
+    assert index.fuzzy_search("bx") == []
+    assert index.fuzzy_search("bitcoim", exclude={"bitcoin"})[0]["id"] == "wrapped-bitcoin"
+    assert index.fuzzy_search("xyzzyx") == []
+
+def test_edit_distance_is_bounded():
+    """Test optimal string alignment distance and the early cut-off"""
+    assert search_index.edit_distance("ethereum", "etherium", 2) == 1
+    assert search_index.edit_distance("abcd", "acbd", 2) == 1
+    assert search_index.edit_distance("bitcoin", "tether", 2) == 3
+
+@pytest.mark.asyncio
+async def test_index_is_rebuilt_only_when_lists_change():
+    """Test that the shared index is reused until the coin list content changes"""
+    first = await search_index.get_coin_index(COINS, MARKETS)
+
+    # Equal content in new list objects (e.g. after a cache refresh) keeps the index
+    assert await search_index.get_coin_index(list(COINS), list(MARKETS)) is first
+
+    changed = COINS + [{"id": "dogecoin", "symbol": "doge", "name": "Dogecoin"}]
+    rebuilt = await search_index.get_coin_index(changed, MARKETS)
+    assert rebuilt is not first
+    assert rebuilt.search("doge")[0]["id"] == "dogecoin"
+
+def test_search_endpoint_uses_index(client):
+    """Test that /coins/search serves results from the index"""
+    with patch("app.services.coingecko.get_coins", AsyncMock(return_value=COINS)), \
+         patch("app.services.coingecko.get_coins_with_market_data", AsyncMock(return_value=MARKETS)):
+        response = client.get("/coins/search", params={"query": "bitcoin", "limit": 2})
+
+    assert response.status_code == 200
+    assert [coin["id"] for coin in response.json()] == ["bitcoin", "wrapped-bitcoin"]
+
+def test_search_endpoint_fuzzy_mode(client):
+    """Test that fuzzy=true serves typo-tolerant results"""
+    with patch("app.services.coingecko.get_coins", AsyncMock(return_value=COINS)), \
+         patch("app.services.coingecko.get_coins_with_market_data", AsyncMock(return_value=MARKETS)):
+        plain = client.get("/coins/search", params={"query": "etherium"})
+        fuzzy = client.get("/coins/search", params={"query": "etherium", "fuzzy": "true"})
+
+    assert plain.json() == []
+    assert [coin["id"] for coin in fuzzy.json()] == ["ethereum"]
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services import singleflight
+
+@pytest.fixture
+def mock_redis():
+    """Fixture to mock Redis client"""
+    with patch('app.services.cache.async_redis_client', new_callable=AsyncMock) as mock_redis:
+        mock_redis.get.return_value = None
+        mock_redis.set.return_value = True
+        mock_redis.register_script = MagicMock(return_value=AsyncMock(return_value=1))
+        yield mock_redis
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_computation(mock_redis):
+    """Test that simultaneous misses for the same key run the work exactly once"""
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"price": 100}
+
+    results = await asyncio.gather(*(singleflight.coalesce("tickers:bitcoin", compute) for _ in range(10)))
+
+    assert calls == 1
+    assert results == [{"price": 100}] * 10
+    # The leader took the cluster lock once and published its result for other workers
+    assert mock_redis.set.call_count == 1
+    mock_redis.setex.assert_called_once()
+    assert singleflight._in_flight == {}
+    # and released it atomically, only if it still held it
+    token = mock_redis.set.call_args.args[1]
+    mock_redis.register_script.return_value.assert_awaited_once_with(
+        keys=["singleflight:lock:tickers:bitcoin"], args=[token]
+    )
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_cached(mock_redis):
+    """Test that a failing leader propagates the error to all waiters"""
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream error")
+
+    results = await asyncio.gather(
+        *(singleflight.coalesce("tickers:bitcoin", compute) for _ in range(3)),
+        return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    mock_redis.setex.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_waits_for_result_from_another_worker(mock_redis):
+    """Test that a worker that loses the lock uses the leader's published result"""
+    mock_redis.set.return_value = None  # Another worker holds the lock
+    results = iter([None, json.dumps({"price": 42})])
+
+    async def get(key):
+        if key == "singleflight:lock:tickers:bitcoin":
+            return b"leader-token"
+        assert key == "singleflight:result:tickers:bitcoin:leader-token"
+        return next(results)
+
+    mock_redis.get.side_effect = get
+
+    async def compute():
+        raise AssertionError("should not compute while another worker is the leader")
+
+    result = await singleflight.coalesce("tickers:bitcoin", compute)
+
+    assert result == {"price": 42}
+
+@pytest.mark.asyncio
+async def test_ignores_result_of_previous_flight(mock_redis):
+    """Test that a follower only takes the result published by the current leader"""
+    mock_redis.set.return_value = None  # Another worker holds the lock
+    stored = {
+        "singleflight:lock:tickers:bitcoin": b"new-leader",
+        "singleflight:result:tickers:bitcoin:old-leader": json.dumps({"price": 1}),
+    }
+
+    async def get(key):
+        value = stored.get(key)
+        if key == "singleflight:lock:tickers:bitcoin":
+            # The new leader publishes and releases while the follower waits
+            stored["singleflight:result:tickers:bitcoin:new-leader"] = json.dumps({"price": 2})
+        return value
+
+    mock_redis.get.side_effect = get
+
+    async def compute():
+        raise AssertionError("should not compute while another worker is the leader")
+
+    assert await singleflight.coalesce("tickers:bitcoin", compute) == {"price": 2}